@@ -146,7 +146,8 @@ def create_assessment(grading_workflow_uuid, criterion_scores):
     # waiting on an AI assessment.
     # The signal receiver is responsible for catching and logging
     # all exceptions that may occur when updating the workflow.
-    from openassessment.assessment.signals import assessment_complete_signal
+    from openassessment.assessment.signals import assessment_changed_signal, assessment_complete_signal
+    assessment_changed_signal.send(sender=None, submission_uuids=[workflow.submission_uuid])
     assessment_complete_signal.send(sender=None, submission_uuid=workflow.submission_uuid)
 
 
@@ -5,13 +5,16 @@ the workflow for a given submission.
 
 """
 import logging
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Count, F, Q
 from dogapi import dog_stats_api
 
 from openassessment.assessment.models import (
     Assessment, AssessmentFeedback, AssessmentPart,
-    InvalidRubricSelection, PeerWorkflow, PeerWorkflowItem,
+    InvalidRubricSelection, PeerWorkflow, PeerWorkflowItem, PeerReviewQueueEntry,
 )
 from openassessment.assessment.serializers import (
     AssessmentFeedbackSerializer, RubricSerializer,
@@ -21,7 +24,9 @@ from openassessment.assessment.serializers import (
 from openassessment.assessment.errors import (
     PeerAssessmentRequestError, PeerAssessmentWorkflowError, PeerAssessmentInternalError
 )
+from openassessment.assessment.signals import assessment_changed_signal
 from submissions import api as sub_api
+from openassessment import cached_sub_api
 
 logger = logging.getLogger("openassessment.assessment.api.peer")
 
@@ -96,6 +101,84 @@ def assessment_is_finished(submission_uuid, peer_requirements):
     return scored_items.count() >= peer_requirements["must_be_graded_by"]
 
 
+def submitters_are_finished(submission_uuids, peer_requirements):
+    """
+    Batch version of `submitter_is_finished`: check which of the submitters
+    have made the required number of assessments, with a fixed number of queries.
+
+    Args:
+        submission_uuids (list): The UUIDs of the submissions being tracked.
+        peer_requirements (dict): Dictionary with the key "must_grade" indicating
+            the required number of submissions the student must grade.
+
+    Returns:
+        set of the submission UUIDs whose submitters are finished.
+
+    """
+    if peer_requirements is None:
+        return set()
+
+    try:
+        must_grade = peer_requirements["must_grade"]
+    except KeyError:
+        raise PeerAssessmentRequestError(u'Requirements dict must contain "must_grade" key')
+
+    workflows = PeerWorkflow.objects.filter(submission_uuid__in=submission_uuids)
+    finished = set(
+        workflows.filter(completed_at__isnull=False).values_list('submission_uuid', flat=True)
+    )
+
+    pending = dict(workflows.filter(completed_at__isnull=True).values_list('id', 'submission_uuid'))
+    num_graded = dict(
+        PeerWorkflowItem.objects.filter(
+            scorer__in=pending.keys(), assessment__isnull=False
+        ).values_list('scorer').annotate(Count('id'))
+    )
+    newly_finished = [
+        workflow_id for workflow_id in pending
+        if num_graded.get(workflow_id, 0) >= must_grade
+    ]
+    if newly_finished:
+        PeerWorkflow.objects.filter(id__in=newly_finished).update(completed_at=timezone.now())
+        finished.update(pending[workflow_id] for workflow_id in newly_finished)
+    return finished
+
+
+def assessments_are_finished(submission_uuids, peer_requirements):
+    """
+    Batch version of `assessment_is_finished`: check which of the submissions
+    have received enough assessments to get a score, with a fixed number of queries.
+
+    Args:
+        submission_uuids (list): The UUIDs of the submissions being tracked.
+        peer_requirements (dict): Dictionary with the key "must_be_graded_by"
+            indicating the required number of assessments the student
+            must receive to get a score.
+
+    Returns:
+        set of the submission UUIDs whose assessments are finished.
+
+    """
+    if not peer_requirements:
+        return set()
+
+    must_be_graded_by = peer_requirements["must_be_graded_by"]
+    num_scored = dict(
+        PeerWorkflowItem.objects.filter(
+            author__submission_uuid__in=submission_uuids,
+            assessment__submission_uuid=F('author__submission_uuid'),
+            assessment__score_type=PEER_TYPE,
+        ).values_list('author__submission_uuid').annotate(Count('id'))
+    )
+    workflow_uuids = PeerWorkflow.objects.filter(
+        submission_uuid__in=submission_uuids
+    ).values_list('submission_uuid', flat=True)
+    return set(
+        submission_uuid for submission_uuid in workflow_uuids
+        if num_scored.get(submission_uuid, 0) >= must_be_graded_by
+    )
+
+
 def on_start(submission_uuid):
     """Create a new peer workflow for a student item and submission.
 
@@ -116,7 +199,7 @@ def on_start(submission_uuid):
     """
     try:
         with transaction.atomic():
-            submission = sub_api.get_submission_and_student(submission_uuid)
+            submission = cached_sub_api.get_submission_and_student(submission_uuid)
             workflow, __ = PeerWorkflow.objects.get_or_create(
                 student_id=submission['student_item']['student_id'],
                 course_id=submission['student_item']['course_id'],
@@ -124,6 +207,7 @@ def on_start(submission_uuid):
                 submission_uuid=submission_uuid
             )
             workflow.save()
+            PeerReviewQueueEntry.enqueue(workflow)
     except IntegrityError:
         # If we get an integrity error, it means someone else has already
         # created a workflow for this submission, so we don't need to do anything.
@@ -167,32 +251,32 @@ def get_score(submission_uuid, peer_requirements):
 
     # Retrieve the assessments in ascending order by score date,
     # because we want to use the *first* one(s) for the score.
-    items = workflow.graded_by.filter(
-        assessment__submission_uuid=submission_uuid,
-        assessment__score_type=PEER_TYPE
-    ).order_by('-assessment')
+    items = list(
+        workflow.graded_by.filter(
+            assessment__submission_uuid=submission_uuid,
+            assessment__score_type=PEER_TYPE
+        ).select_related('assessment').order_by('-assessment')
+    )
 
-    submission_finished = items.count() >= peer_requirements["must_be_graded_by"]
+    must_be_graded_by = peer_requirements["must_be_graded_by"]
+    submission_finished = len(items) >= must_be_graded_by
     if not submission_finished:
         return None
 
-    # Unfortunately, we cannot use update() after taking a slice,
-    # so we need to update the and save the items individually.
-    # One might be tempted to first query for the first n assessments,
-    # then select items that have those assessments.
-    # However, this generates a SQL query with a LIMIT in a subquery,
-    # which is not supported by some versions of MySQL.
-    # Although this approach generates more database queries, the number is likely to
-    # be relatively small (at least 1 and very likely less than 5).
-    for scored_item in items[:peer_requirements["must_be_graded_by"]]:
-        scored_item.scored = True
-        scored_item.save()
+    # Mark the first n items as scored with a single update.
+    # We select the IDs in Python rather than updating a sliced queryset,
+    # because a LIMIT in a subquery is not supported by some versions of MySQL.
+    newly_scored_ids = [item.id for item in items[:must_be_graded_by] if not item.scored]
+    if newly_scored_ids:
+        PeerWorkflowItem.objects.filter(id__in=newly_scored_ids).update(scored=True)
+        for item in items[:must_be_graded_by]:
+            item.scored = True
+
     assessments = [item.assessment for item in items]
+    scored_assessments = [item.assessment for item in items if item.scored]
 
     return {
-        "points_earned": sum(
-            get_assessment_median_scores(submission_uuid).values()
-        ),
+        "points_earned": _materialize_median_scores(submission_uuid, scored_assessments)["points_earned"],
         "points_possible": assessments[0].points_possible,
         "contributing_assessments": [assessment.id for assessment in assessments],
         "staff_id": None,
@@ -207,7 +291,8 @@ def create_assessment(
     overall_feedback,
     rubric_dict,
     num_required_grades,
-    scored_at=None
+    scored_at=None,
+    rubric_hashes=None
 ):
     """Creates an assessment on the given submission.
 
@@ -236,6 +321,9 @@ def create_assessment(
         scored_at (datetime): Optional argument to override the time in which
             the assessment took place. If not specified, scored_at is set to
             now.
+        rubric_hashes (tuple): The `(content_hash, structure_hash)` of the
+            rubric, if the caller has already calculated them (see
+            `Rubric.hashes_from_dict`).
 
     Returns:
         dict: the Assessment model, serialized as a dict.
@@ -275,9 +363,13 @@ def create_assessment(
             scorer_workflow,
             overall_feedback,
             num_required_grades,
-            scored_at
+            scored_at,
+            rubric_hashes=rubric_hashes
         )
 
+        # The new assessment may change which assessments count towards the score
+        cache.delete(_median_scores_cache_key(peer_submission_uuid))
+
         _log_assessment(assessment, scorer_workflow)
         return full_assessment_dict(assessment)
     except PeerWorkflow.DoesNotExist:
@@ -312,7 +404,8 @@ def _complete_assessment(
         scorer_workflow,
         overall_feedback,
         num_required_grades,
-        scored_at
+        scored_at,
+        rubric_hashes=None
 ):
     """
     Internal function for atomic assessment creation. Creates a peer assessment
@@ -340,13 +433,16 @@ def _complete_assessment(
         scored_at (datetime): Optional argument to override the time in which
             the assessment took place. If not specified, scored_at is set to
             now.
+        rubric_hashes (tuple): The `(content_hash, structure_hash)` of the
+            rubric, if the caller has already calculated them (see
+            `Rubric.hashes_from_dict`).
 
     Returns:
         The Assessment model
 
     """
     # Get or create the rubric
-    rubric = rubric_from_dict(rubric_dict)
+    rubric = rubric_from_dict(rubric_dict, rubric_hashes=rubric_hashes)
 
     # Create the peer assessment
     assessment = Assessment.create(
@@ -365,6 +461,11 @@ def _complete_assessment(
 
     # Close the active assessment
     scorer_workflow.close_active_assessment(peer_submission_uuid, assessment, num_required_grades)
+
+    # Both the scorer's and the author's workflows may now move on
+    assessment_changed_signal.send(
+        sender=None, submission_uuids=[scorer_workflow.submission_uuid, peer_submission_uuid]
+    )
     return assessment
 
 
@@ -417,6 +518,10 @@ def get_assessment_median_scores(submission_uuid):
     values, the average of those two values is returned, rounded up to the
     greatest integer value.
 
+    The median scores are kept in the cache once any assessments count towards
+    the score, so this is usually a single cache read.  The cached scores are
+    discarded whenever the submission receives a new peer assessment.
+
     Args:
         submission_uuid (str): The submission uuid is used to get the
             assessments used to score this submission, and generate the
@@ -430,12 +535,15 @@ def get_assessment_median_scores(submission_uuid):
         PeerAssessmentInternalError: If any error occurs while retrieving
             information to form the median scores, an error is raised.
     """
+    median_scores = cache.get(_median_scores_cache_key(submission_uuid))
+    if median_scores is not None:
+        return median_scores["median_scores"]
+
     try:
         workflow = PeerWorkflow.objects.get(submission_uuid=submission_uuid)
-        items = workflow.graded_by.filter(scored=True)
+        items = workflow.graded_by.filter(scored=True).select_related('assessment')
         assessments = [item.assessment for item in items]
-        scores = Assessment.scores_by_criterion(assessments)
-        return Assessment.get_median_score_dict(scores)
+        return _materialize_median_scores(submission_uuid, assessments)["median_scores"]
     except DatabaseError:
         error_message = (
             u"Error getting assessment median scores for submission {uuid}"
@@ -444,6 +552,64 @@ def get_assessment_median_scores(submission_uuid):
         raise PeerAssessmentInternalError(error_message)
 
 
+def _median_scores_cache_key(submission_uuid):
+    """
+    Return the cache key for the median scores of a submission.
+
+    Args:
+        submission_uuid (str): The UUID of the submission.
+
+    Returns:
+        str
+
+    """
+    return u"assessment.peer.median_scores.{}".format(submission_uuid)
+
+
+def _materialize_median_scores(submission_uuid, scored_assessments):
+    """
+    Retrieve the median scores of a submission's scored peer assessments,
+    and keep them in the cache for `get_assessment_median_scores`.
+
+    The cached scores are reused as long as the set of scored assessments
+    stays the same; once assessments are marked as scored, they stay scored.
+    They don't expire unless `ORA2_PEER_MEDIAN_SCORES_CACHE_TIMEOUT` is set.
+    Nothing is cached until some assessments count towards the score,
+    so a submission that hasn't been scored yet is never cached as empty.
+
+    Args:
+        submission_uuid (str): The UUID of the submission.
+        scored_assessments (list of Assessment): The assessments that count
+            towards the submission's score.
+
+    Returns:
+        dict with keys 'scored_assessment_ids' (sorted list of int),
+        'median_scores' (dict of criterion names to median scores),
+        and 'points_earned' (int, the sum of the median scores).
+
+    """
+    cache_key = _median_scores_cache_key(submission_uuid)
+    scored_assessment_ids = sorted(assessment.id for assessment in scored_assessments)
+    median_scores = cache.get(cache_key)
+    if median_scores is not None and median_scores["scored_assessment_ids"] == scored_assessment_ids:
+        return median_scores
+
+    median_score_dict = Assessment.get_median_score_dict(
+        Assessment.scores_by_criterion(scored_assessments)
+    )
+    median_scores = {
+        "scored_assessment_ids": scored_assessment_ids,
+        "median_scores": median_score_dict,
+        "points_earned": sum(median_score_dict.values()),
+    }
+    if scored_assessment_ids:
+        cache.set(
+            cache_key, median_scores,
+            timeout=getattr(settings, 'ORA2_PEER_MEDIAN_SCORES_CACHE_TIMEOUT', None)
+        )
+    return median_scores
+
+
 def has_finished_required_evaluating(submission_uuid, required_assessments):
     """Check if a student still needs to evaluate more submissions
 
@@ -611,6 +777,88 @@ def get_submitted_assessments(submission_uuid, limit=None):
         raise PeerAssessmentInternalError(error_message)
 
 
+def get_submission_summary(submission_uuid, peer_requirements=None):
+    """Retrieve everything the staff area shows about a submission's peer assessments.
+
+    This combines `get_assessments`, `get_submitted_assessments`,
+    `get_score` and `get_rubric_max_scores`, but loads the received and
+    submitted assessments together, so the number of queries does not
+    depend on how many assessments the student gave or received.
+
+    Args:
+        submission_uuid (str): The UUID of the submission.
+
+    Keyword Arguments:
+        peer_requirements (dict): The peer requirements (see `get_score`).
+            If provided, the score is calculated, and the assessments
+            that count towards it are marked as scored.
+
+    Returns:
+        dict with keys:
+            'assessments' (list of dict): The assessments the submission
+                received, as returned by `get_assessments`.
+            'submitted_assessments' (list of dict): The assessments made by the
+                submission's author, as returned by `get_submitted_assessments`.
+            'scored_assessment_ids' (list of int): The IDs of the received
+                assessments that count towards the score.
+            'score' (dict): The score returned by `get_score`, or None.
+            'max_scores' (dict): The max scores returned by `get_rubric_max_scores`.
+
+    Raises:
+        PeerAssessmentInternalError: Raised when there is an internal error
+            while retrieving the assessments associated with this submission.
+
+    Examples:
+        >>> get_submission_summary("1", {"must_grade": 2, "must_be_graded_by": 2})
+        {
+            'assessments': [{'points_earned': 6, 'scorer_id': u"Tim", ...}],
+            'submitted_assessments': [{'points_earned': 11, 'scorer_id': u"Bob", ...}],
+            'scored_assessment_ids': [5],
+            'score': {'points_earned': 6, 'points_possible': 12, ...},
+            'max_scores': {u"Ideas": 6, u"Content": 6}
+        }
+
+    """
+    try:
+        score = get_score(submission_uuid, peer_requirements)
+
+        # Assessments received and made by the student, loaded together.
+        # Students can't assess their own submission, so an assessment
+        # is one or the other, depending on the submission it is for.
+        assessments = Assessment.objects.filter(
+            Q(submission_uuid=submission_uuid, score_type=PEER_TYPE) |
+            Q(peerworkflowitem__scorer__submission_uuid=submission_uuid)
+        ).distinct()
+        received, submitted = [], []
+        for assessment in serialize_assessments(assessments):
+            if assessment["submission_uuid"] == submission_uuid:
+                received.append(assessment)
+            else:
+                submitted.append(assessment)
+
+        scored_assessment_ids = list(
+            PeerWorkflowItem.objects.filter(
+                author__submission_uuid=submission_uuid,
+                scored=True,
+                assessment__isnull=False
+            ).order_by('assessment').values_list('assessment', flat=True)
+        )
+    except DatabaseError:
+        error_message = (
+            u"Error getting the peer assessment summary for submission {uuid}"
+        ).format(uuid=submission_uuid)
+        logger.exception(error_message)
+        raise PeerAssessmentInternalError(error_message)
+
+    return {
+        "assessments": received,
+        "submitted_assessments": submitted,
+        "scored_assessment_ids": scored_assessment_ids,
+        "score": score,
+        "max_scores": get_rubric_max_scores(submission_uuid),
+    }
+
+
 def get_submission_to_assess(submission_uuid, graded_by):
     """Get a submission to peer evaluate.
 
@@ -669,35 +917,38 @@ def get_submission_to_assess(submission_uuid, graded_by):
     open_item = workflow.find_active_assessments()
     peer_submission_uuid = open_item.submission_uuid if open_item else None
     # If there is an active assessment for this user, get that submission,
-    # otherwise, get the first assessment for review, otherwise,
+    # otherwise, claim the first assessment for review, otherwise,
     # get the first submission available for over grading ("over-grading").
-    if peer_submission_uuid is None:
-        peer_submission_uuid = workflow.get_submission_for_review(graded_by)
-    if peer_submission_uuid is None:
-        peer_submission_uuid = workflow.get_submission_for_over_grading()
-    if peer_submission_uuid:
-        try:
-            submission_data = sub_api.get_submission(peer_submission_uuid)
-            PeerWorkflow.create_item(workflow, peer_submission_uuid)
-            _log_workflow(peer_submission_uuid, workflow)
-            return submission_data
-        except sub_api.SubmissionNotFoundError:
-            error_message = (
-                u"Could not find a submission with the uuid {} for student {} "
-                u"in the peer workflow."
-            ).format(peer_submission_uuid, workflow.student_id)
-            logger.exception(error_message)
-            raise PeerAssessmentWorkflowError(error_message)
-    else:
-        logger.info(
-            u"No submission found for {} to assess ({}, {})"
-            .format(
-                workflow.student_id,
-                workflow.course_id,
-                workflow.item_id,
+    # The claim is committed together with the workflow item for the lease,
+    # so concurrent graders never see the slot as free in between.
+    with transaction.atomic():
+        if peer_submission_uuid is None:
+            peer_submission_uuid = workflow.claim_submission_for_review(graded_by)
+        if peer_submission_uuid is None:
+            peer_submission_uuid = workflow.get_submission_for_over_grading()
+        if peer_submission_uuid:
+            try:
+                submission_data = cached_sub_api.get_submission(peer_submission_uuid)
+                PeerWorkflow.create_item(workflow, peer_submission_uuid)
+                _log_workflow(peer_submission_uuid, workflow)
+                return submission_data
+            except sub_api.SubmissionNotFoundError:
+                error_message = (
+                    u"Could not find a submission with the uuid {} for student {} "
+                    u"in the peer workflow."
+                ).format(peer_submission_uuid, workflow.student_id)
+                logger.exception(error_message)
+                raise PeerAssessmentWorkflowError(error_message)
+        else:
+            logger.info(
+                u"No submission found for {} to assess ({}, {})"
+                .format(
+                    workflow.student_id,
+                    workflow.course_id,
+                    workflow.item_id,
+                )
             )
-        )
-        return None
+            return None
 
 
 def create_peer_workflow(submission_uuid):
@@ -723,7 +974,7 @@ def create_peer_workflow(submission_uuid):
     """
     try:
         with transaction.atomic():
-            submission = sub_api.get_submission_and_student(submission_uuid)
+            submission = cached_sub_api.get_submission_and_student(submission_uuid)
             workflow, __ = PeerWorkflow.objects.get_or_create(
                 student_id=submission['student_item']['student_id'],
                 course_id=submission['student_item']['course_id'],
@@ -731,6 +982,7 @@ def create_peer_workflow(submission_uuid):
                 submission_uuid=submission_uuid
             )
             workflow.save()
+            PeerReviewQueueEntry.enqueue(workflow)
     except IntegrityError:
         # If we get an integrity error, it means someone else has already
         # created a workflow for this submission, so we don't need to do anything.
@@ -984,6 +1236,7 @@ def on_cancel(submission_uuid):
         if workflow:
             workflow.cancelled_at = timezone.now()
             workflow.save()
+            PeerReviewQueueEntry.dequeue(workflow)
     except (PeerAssessmentWorkflowError, DatabaseError):
         error_message = (
             u"An internal error occurred while cancelling the peer"
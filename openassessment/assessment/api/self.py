@@ -15,6 +15,7 @@ from openassessment.assessment.models import (
 from openassessment.assessment.errors import (
     SelfAssessmentRequestError, SelfAssessmentInternalError
 )
+from openassessment.assessment.signals import assessment_changed_signal
 
 
 # Assessments are tagged as "self-evaluation"
@@ -62,6 +63,42 @@ def assessment_is_finished(submission_uuid, self_requirements):
     return submitter_is_finished(submission_uuid, self_requirements)
 
 
+def submitters_are_finished(submission_uuids, self_requirements):
+    """
+    Batch version of `submitter_is_finished`: check which of the submissions
+    have been self-assessed, with a single query.
+
+    Args:
+        submission_uuids (list): The unique identifiers of the submissions.
+        self_requirements (dict): Not used.
+
+    Returns:
+        set of the submission UUIDs that have been self-assessed.
+
+    """
+    return set(
+        Assessment.objects.filter(
+            score_type=SELF_TYPE, submission_uuid__in=submission_uuids
+        ).values_list('submission_uuid', flat=True)
+    )
+
+
+def assessments_are_finished(submission_uuids, self_requirements):
+    """
+    Batch version of `assessment_is_finished`. For self-assessment,
+    this function is synonymous with submitters_are_finished.
+
+    Args:
+        submission_uuids (list): The unique identifiers of the submissions.
+        self_requirements (dict): Not used.
+
+    Returns:
+        set of the submission UUIDs that have been self-assessed.
+
+    """
+    return submitters_are_finished(submission_uuids, self_requirements)
+
+
 def get_score(submission_uuid, self_requirements):
     """
     Get the score for this particular assessment.
@@ -98,7 +135,8 @@ def create_assessment(
     criterion_feedback,
     overall_feedback,
     rubric_dict,
-    scored_at=None
+    scored_at=None,
+    rubric_hashes=None
 ):
     """
     Create a self-assessment for a submission.
@@ -116,6 +154,9 @@ def create_assessment(
 
     Keyword Arguments:
         scored_at (datetime): The timestamp of the assessment; defaults to the current time.
+        rubric_hashes (tuple): The `(content_hash, structure_hash)` of the
+            rubric, if the caller has already calculated them (see
+            `Rubric.hashes_from_dict`).
 
     Returns:
         dict: serialized Assessment model
@@ -161,7 +202,8 @@ def create_assessment(
             criterion_feedback,
             overall_feedback,
             rubric_dict,
-            scored_at
+            scored_at,
+            rubric_hashes=rubric_hashes
         )
         _log_assessment(assessment, submission)
     except InvalidRubric as ex:
@@ -191,7 +233,8 @@ def _complete_assessment(
         criterion_feedback,
         overall_feedback,
         rubric_dict,
-        scored_at
+        scored_at,
+        rubric_hashes=None
 ):
     """
     Internal function for creating an assessment and its parts atomically.
@@ -210,13 +253,16 @@ def _complete_assessment(
         overall_feedback (unicode): Free-form text feedback on the submission overall.
         rubric_dict (dict): Serialized Rubric model.
         scored_at (datetime): The timestamp of the assessment.
+        rubric_hashes (tuple): The `(content_hash, structure_hash)` of the
+            rubric, if the caller has already calculated them (see
+            `Rubric.hashes_from_dict`).
 
     Returns:
         Assessment model
 
     """
     # Get or create the rubric
-    rubric = rubric_from_dict(rubric_dict)
+    rubric = rubric_from_dict(rubric_dict, rubric_hashes=rubric_hashes)
 
     # Create the self assessment
     assessment = Assessment.create(
@@ -230,6 +276,8 @@ def _complete_assessment(
 
     # This will raise an `InvalidRubricSelection` if the selected options do not match the rubric.
     AssessmentPart.create_from_option_names(assessment, options_selected, feedback=criterion_feedback)
+
+    assessment_changed_signal.send(sender=None, submission_uuids=[submission_uuid])
     return assessment
 
 
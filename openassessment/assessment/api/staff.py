@@ -1,13 +1,18 @@
 """
 Public interface for staff grading, used by students/course staff.
 """
+import hashlib
 import logging
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db import DatabaseError, transaction
 from django.utils.timezone import now
 from dogapi import dog_stats_api
 
 from submissions import api as submissions_api
 
+from openassessment import cached_sub_api
 from openassessment.assessment.models import (
     Assessment, AssessmentFeedback, AssessmentPart,
     InvalidRubricSelection, StaffWorkflow,
@@ -20,6 +25,7 @@ from openassessment.assessment.serializers import (
 from openassessment.assessment.errors import (
     StaffAssessmentRequestError, StaffAssessmentInternalError
 )
+from openassessment.assessment.signals import assessment_changed_signal
 
 logger = logging.getLogger("openassessment.assessment.api.staff")
 
@@ -64,6 +70,60 @@ def assessment_is_finished(submission_uuid, staff_requirements):
     return True
 
 
+def submitters_are_finished(submission_uuids, staff_requirements):
+    """
+    Batch version of `submitter_is_finished`. Always returns all of the submissions.
+
+    Args:
+        submission_uuids (list): The UUIDs of the submissions.
+        staff_requirements (dict): Not used.
+
+    Returns:
+        set of submission UUIDs
+
+    """
+    return set(submission_uuids)
+
+
+def assessments_are_finished(submission_uuids, staff_requirements):
+    """
+    Batch version of `assessment_is_finished`: check which of the submissions
+    have completed the staff assessment step, with at most one query.
+
+    Args:
+        submission_uuids (list): The UUIDs of the submissions being graded.
+        staff_requirements (dict): Any variables that may effect this state.
+
+    Returns:
+        set of the submission UUIDs that have a staff assessment, or all of
+        them if staff assessment is not required.
+
+    Raises:
+        StaffAssessmentInternalError if there are problems connecting to the database.
+
+    """
+    if staff_requirements is None:
+        return set()
+
+    if not staff_requirements.get('required', False):
+        return set(submission_uuids)
+
+    try:
+        return set(
+            Assessment.objects.filter(
+                submission_uuid__in=submission_uuids,
+                score_type=STAFF_TYPE,
+            ).values_list('submission_uuid', flat=True)
+        )
+    except DatabaseError as ex:
+        msg = (
+            u"An error occurred while retrieving staff assessments "
+            u"for {count} submissions: {ex}"
+        ).format(count=len(submission_uuids), ex=ex)
+        logger.exception(msg)
+        raise StaffAssessmentInternalError(msg)
+
+
 def on_init(submission_uuid):
     """
     Create a new staff workflow for a student item and submission.
@@ -87,7 +147,7 @@ def on_init(submission_uuid):
 
     """
     try:
-        submission = submissions_api.get_submission_and_student(submission_uuid)
+        submission = cached_sub_api.get_submission_and_student(submission_uuid)
         workflow, __ = StaffWorkflow.objects.get_or_create(
             course_id=submission['student_item']['course_id'],
             item_id=submission['student_item']['item_id'],
@@ -272,7 +332,7 @@ def get_submission_to_assess(course_id, item_id, scorer_id):
     student_submission_uuid = StaffWorkflow.get_submission_for_review(course_id, item_id, scorer_id)
     if student_submission_uuid:
         try:
-            submission_data = submissions_api.get_submission(student_submission_uuid)
+            submission_data = cached_sub_api.get_submission(student_submission_uuid)
             return submission_data
         except submissions_api.SubmissionNotFoundError:
             error_message = (
@@ -295,6 +355,9 @@ def get_staff_grading_statistics(course_id, item_id):
     """
     Returns the number of graded, ungraded, and in-progress submissions for staff grading.
 
+    If the `ORA2_STAFF_GRADING_STATISTICS_CACHE_TIMEOUT` setting is set,
+    the statistics are cached for that many seconds.
+
     Args:
         course_id (str): The course that this problem belongs to
         item_id (str): The student_item (problem) that we want to know statistics about.
@@ -302,7 +365,74 @@ def get_staff_grading_statistics(course_id, item_id):
     Returns:
         dict: a dictionary that contains the following keys: 'graded', 'ungraded', and 'in-progress'
     """
-    return StaffWorkflow.get_workflow_statistics(course_id, item_id)
+    return _cached_statistics(
+        'workflow', course_id, item_id, StaffWorkflow.get_workflow_statistics
+    )
+
+
+def get_staff_grader_statistics(course_id, item_id):
+    """
+    Returns how many submissions each staff member graded recently, and how long
+    they took on average, so the staff area can show the current grading velocity.
+
+    If the `ORA2_STAFF_GRADING_STATISTICS_CACHE_TIMEOUT` setting is set,
+    the statistics are cached for that many seconds.
+
+    Args:
+        course_id (str): The course that this problem belongs to
+        item_id (str): The student_item (problem) that we want to know statistics about.
+
+    Returns:
+        list of dict, ordered by scorer ID, with the keys 'scorer_id',
+        'graded' (within the last hour) and 'average_grading_time' (in seconds, or None).
+
+    Raises:
+        StaffAssessmentInternalError: Raised when there is an error
+            retrieving the statistics.
+
+    Example usage:
+        >>> get_staff_grader_statistics("ora2/1/1", "staff-assessment-problem")
+        [
+            {'scorer_id': u'staff_1', 'graded': 12, 'average_grading_time': 143.5},
+            {'scorer_id': u'staff_2', 'graded': 3, 'average_grading_time': None},
+        ]
+    """
+    try:
+        return _cached_statistics(
+            'scorers', course_id, item_id, StaffWorkflow.get_scorer_statistics
+        )
+    except DatabaseError:
+        error_message = (
+            u"Error getting staff grader statistics for course {course_id}, item {item_id}"
+        ).format(course_id=course_id, item_id=item_id)
+        logger.exception(error_message)
+        raise StaffAssessmentInternalError(error_message)
+
+
+def _cached_statistics(name, course_id, item_id, compute):
+    """
+    Compute staff grading statistics for an item, caching them briefly if configured.
+
+    Args:
+        name (str): Distinguishes the kinds of statistics stored for an item.
+        course_id (str): The course that this problem belongs to
+        item_id (str): The student_item (problem) that we want to know statistics about.
+        compute (callable): Called with the course and item IDs to compute the statistics.
+
+    Returns:
+        The statistics returned by `compute`.
+    """
+    cache_timeout = getattr(settings, 'ORA2_STAFF_GRADING_STATISTICS_CACHE_TIMEOUT', 0)
+    if not cache_timeout:
+        return compute(course_id, item_id)
+
+    item_hash = hashlib.sha1(u"{}|{}".format(course_id, item_id).encode('utf-8')).hexdigest()
+    cache_key = "staff.grading_statistics.{}.{}".format(name, item_hash)
+    statistics = cache.get(cache_key)
+    if statistics is None:
+        statistics = compute(course_id, item_id)
+        cache.set(cache_key, statistics, cache_timeout)
+    return statistics
 
 
 def create_assessment(
@@ -312,7 +442,8 @@ def create_assessment(
     criterion_feedback,
     overall_feedback,
     rubric_dict,
-    scored_at=None
+    scored_at=None,
+    rubric_hashes=None
 ):
     """Creates an assessment on the given submission.
 
@@ -342,6 +473,9 @@ def create_assessment(
         scored_at (datetime): Optional argument to override the time in which
             the assessment took place. If not specified, scored_at is set to
             now.
+        rubric_hashes (tuple): The `(content_hash, structure_hash)` of the
+            rubric, if the caller has already calculated them (see
+            `Rubric.hashes_from_dict`).
 
     Returns:
         dict: the Assessment model, serialized as a dict.
@@ -373,7 +507,8 @@ def create_assessment(
             overall_feedback,
             rubric_dict,
             scored_at,
-            scorer_workflow
+            scorer_workflow,
+            rubric_hashes=rubric_hashes
         )
         return full_assessment_dict(assessment)
 
@@ -402,7 +537,8 @@ def _complete_assessment(
         overall_feedback,
         rubric_dict,
         scored_at,
-        scorer_workflow
+        scorer_workflow,
+        rubric_hashes=None
 ):
     """
     Internal function for atomic assessment creation. Creates a staff assessment
@@ -424,13 +560,16 @@ def _complete_assessment(
         scored_at (datetime): Optional argument to override the time in which
             the assessment took place. If not specified, scored_at is set to
             now.
+        rubric_hashes (tuple): The `(content_hash, structure_hash)` of the
+            rubric, if the caller has already calculated them (see
+            `Rubric.hashes_from_dict`).
 
     Returns:
         The Assessment model
 
     """
     # Get or create the rubric
-    rubric = rubric_from_dict(rubric_dict)
+    rubric = rubric_from_dict(rubric_dict, rubric_hashes=rubric_hashes)
 
     # Create the staff assessment
     assessment = Assessment.create(
@@ -450,4 +589,6 @@ def _complete_assessment(
     # Close the active assessment
     if scorer_workflow is not None:
         scorer_workflow.close_active_assessment(assessment, scorer_id)
+
+    assessment_changed_signal.send(sender=None, submission_uuids=[submission_uuid])
     return assessment
@@ -9,8 +9,11 @@ Public interface for student training:
 import logging
 from django.utils.translation import ugettext as _
 from django.db import DatabaseError
+from django.db.models import Count
 from submissions import api as sub_api
-from openassessment.assessment.models import StudentTrainingWorkflow, InvalidRubricSelection
+from openassessment.assessment.models import (
+    StudentTrainingWorkflow, StudentTrainingWorkflowItem, InvalidRubricSelection
+)
 from openassessment.assessment.serializers import (
     deserialize_training_examples, serialize_training_example,
     validate_training_example_format,
@@ -19,6 +22,7 @@ from openassessment.assessment.serializers import (
 from openassessment.assessment.errors import (
     StudentTrainingRequestError, StudentTrainingInternalError
 )
+from openassessment.assessment.signals import assessment_changed_signal
 
 
 logger = logging.getLogger(__name__)
@@ -59,6 +63,48 @@ def submitter_is_finished(submission_uuid, training_requirements):   # pylint:di
         return workflow.num_completed >= num_required
 
 
+def submitters_are_finished(submission_uuids, training_requirements):
+    """
+    Batch version of `submitter_is_finished`: check which of the students
+    have correctly assessed all the training examples, with a fixed number of queries.
+
+    Args:
+        submission_uuids (list): The UUIDs of the students' submissions.
+        training_requirements (dict): Must contain "num_required" indicating
+            the number of examples the student must assess.
+
+    Returns:
+        set of the submission UUIDs whose students have finished training.
+
+    Raises:
+        StudentTrainingRequestError
+
+    """
+    if training_requirements is None:
+        return set()
+
+    try:
+        num_required = int(training_requirements['num_required'])
+    except KeyError:
+        raise StudentTrainingRequestError(u'Requirements dict must contain "num_required" key')
+    except ValueError:
+        raise StudentTrainingRequestError(u'Number of requirements must be an integer')
+
+    num_completed = dict(
+        StudentTrainingWorkflowItem.objects.filter(
+            workflow__submission_uuid__in=submission_uuids,
+            completed_at__isnull=False,
+        ).values_list('workflow__submission_uuid').annotate(Count('id'))
+    )
+    workflow_uuids = StudentTrainingWorkflow.objects.filter(
+        submission_uuid__in=submission_uuids
+    ).values_list('submission_uuid', flat=True)
+    return set(
+        submission_uuid for submission_uuid in workflow_uuids
+        if num_completed.get(submission_uuid, 0) >= num_required
+    )
+
+
 def on_start(submission_uuid):
     """
     Creates a new student training workflow.
@@ -460,6 +506,7 @@ def assess_training_example(submission_uuid, options_selected, update_workflow=T
         # matches the instructor's selection
         if update_workflow and len(corrections) == 0:
             item.mark_complete()
+            assessment_changed_signal.send(sender=None, submission_uuids=[submission_uuid])
         return corrections
     except StudentTrainingWorkflow.DoesNotExist:
         msg = u"Could not find learner training workflow for submission UUID {}".format(submission_uuid)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0002_staffworkflow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeerReviewQueueEntry',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('student_id', models.CharField(max_length=40)),
+                ('item_id', models.CharField(max_length=128)),
+                ('course_id', models.CharField(max_length=40)),
+                ('submission_uuid', models.CharField(max_length=128)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('leased_count', models.PositiveIntegerField(default=0)),
+                ('lease_expires_at', models.DateTimeField(null=True)),
+                ('author', models.OneToOneField(related_name='review_queue_entry', to='assessment.PeerWorkflow')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='peerreviewqueueentry',
+            index_together=set([('course_id', 'item_id', 'created_at')]),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import openassessment.assessment.models.peer
+
+
+# Number of workflows given random keys per UPDATE statement
+BACKFILL_BATCH_SIZE = 1000
+
+# A SQL expression for a random number in [0, 1), by database vendor
+RANDOM_SQL = {
+    'mysql': 'RAND()',
+    'postgresql': 'RANDOM()',
+    'sqlite': '(RANDOM() / 18446744073709551616.0 + 0.5)',
+}
+
+
+def assign_random_keys(apps, schema_editor):
+    """
+    Give each existing workflow its own random key; the field default
+    is evaluated only once when the column is added.
+
+    The keys are generated by the database, one range of IDs per UPDATE
+    statement, so large tables don't need a round trip per workflow.
+    """
+    PeerWorkflow = apps.get_model('assessment', 'PeerWorkflow')
+    connection = schema_editor.connection
+    random_sql = RANDOM_SQL.get(connection.vendor)
+    if random_sql is None:
+        # Unknown database: generate the keys here, still one workflow at a time
+        for workflow_id in PeerWorkflow.objects.values_list('id', flat=True).iterator():
+            PeerWorkflow.objects.filter(id=workflow_id).update(
+                random_key=openassessment.assessment.models.peer._random_key()
+            )
+        return
+
+    id_range = PeerWorkflow.objects.aggregate(models.Min('id'), models.Max('id'))
+    if id_range['id__min'] is None:
+        return
+
+    sql = 'UPDATE {table} SET {column} = {random} WHERE {pk} >= %s AND {pk} < %s'.format(
+        table=connection.ops.quote_name(PeerWorkflow._meta.db_table),
+        column=connection.ops.quote_name(PeerWorkflow._meta.get_field('random_key').column),
+        random=random_sql,
+        pk=connection.ops.quote_name(PeerWorkflow._meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        for start in range(id_range['id__min'], id_range['id__max'] + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(sql, [start, start + BACKFILL_BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0003_peerreviewqueueentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='peerworkflow',
+            name='random_key',
+            field=models.FloatField(default=openassessment.assessment.models.peer._random_key),
+        ),
+        migrations.RunPython(assign_random_keys, migrations.RunPython.noop),
+        migrations.AlterIndexTogether(
+            name='peerworkflow',
+            index_together=set([('course_id', 'item_id', 'random_key')]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0004_peerworkflow_random_key'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='peerworkflowitem',
+            index_together=set([('scorer', 'assessment', 'started_at')]),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.db import migrations
+import openassessment.assessment.models.peer
+
+
+# Number of workflows loaded into the queue per batch
+BACKFILL_BATCH_SIZE = 500
+
+
+def load_review_queue(apps, schema_editor):
+    """
+    Add every peer workflow that is still waiting for assessments to the
+    review queue, so submissions made before the queue existed can be
+    picked for review without waiting for their workflow to be touched.
+
+    Workflows are loaded in batches of IDs, with one query for the
+    workflows and one for their items per batch.
+    """
+    PeerWorkflow = apps.get_model('assessment', 'PeerWorkflow')
+    PeerWorkflowItem = apps.get_model('assessment', 'PeerWorkflowItem')
+    PeerReviewQueueEntry = apps.get_model('assessment', 'PeerReviewQueueEntry')
+    summarize_items = openassessment.assessment.models.peer.PeerReviewQueueEntry.summarize_items
+
+    workflows = PeerWorkflow.objects.filter(grading_completed_at=None, cancelled_at=None).order_by('id')
+    last_id = 0
+    while True:
+        batch = list(workflows.filter(id__gt=last_id)[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        # Workflows touched since the queue was created already have entries
+        queued_ids = set(
+            PeerReviewQueueEntry.objects.filter(author__in=batch).values_list('author_id', flat=True)
+        )
+        batch = [workflow for workflow in batch if workflow.id not in queued_ids]
+
+        items_by_author = defaultdict(list)
+        items = PeerWorkflowItem.objects.filter(author__in=batch).values_list(
+            'author_id', 'assessment_id', 'started_at'
+        )
+        for author_id, assessment_id, started_at in items:
+            items_by_author[author_id].append((assessment_id, started_at))
+
+        entries = []
+        for workflow in batch:
+            completed_count, leased_count, lease_expires_at = summarize_items(items_by_author[workflow.id])
+            entries.append(PeerReviewQueueEntry(
+                author=workflow,
+                student_id=workflow.student_id,
+                item_id=workflow.item_id,
+                course_id=workflow.course_id,
+                submission_uuid=workflow.submission_uuid,
+                created_at=workflow.created_at,
+                completed_count=completed_count,
+                leased_count=leased_count,
+                lease_expires_at=lease_expires_at,
+            ))
+        PeerReviewQueueEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0005_peerworkflowitem_open_lease_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(load_review_queue, migrations.RunPython.noop),
+    ]
@@ -12,7 +12,7 @@ from django.db import models, transaction, DatabaseError
 from django.utils.timezone import now
 from django_extensions.db.fields import UUIDField
 from dogapi import dog_stats_api
-from submissions import api as sub_api
+from openassessment import cached_sub_api
 from .base import Rubric, Criterion, Assessment, AssessmentPart
 from .training import TrainingExample
 
@@ -828,7 +828,7 @@ class AIGradingWorkflow(AIWorkflow):
 
         """
         # Retrieve info about the submission
-        submission = sub_api.get_submission_and_student(submission_uuid)
+        submission = cached_sub_api.get_submission_and_student(submission_uuid)
 
         # Get or create the rubric
         from openassessment.assessment.serializers import rubric_from_dict
@@ -13,13 +13,14 @@ need to then generate a matching migration for it using:
 
 """
 import math
-from collections import defaultdict
-from copy import deepcopy
+from collections import defaultdict, OrderedDict
 from hashlib import sha1
 import json
+import threading
 
+from django.conf import settings
 from django.core.cache import cache
-from django.db import models
+from django.db import models, transaction
 from django.utils.timezone import now
 from lazy import lazy
 
@@ -69,8 +70,7 @@ class Rubric(models.Model):
     @property
     def points_possible(self):
         """The total number of points that could be earned in this Rubric."""
-        criteria_points = [crit.points_possible for crit in self.criteria.all()]
-        return sum(criteria_points) if criteria_points else 0
+        return self.index.points_possible
 
     @lazy
     def index(self):
@@ -78,11 +78,21 @@ class Rubric(models.Model):
         Load the rubric's data and return an index that allows
         the user to query for specific criteria/options.
 
+        Since rubrics never change, the index is cached, so it is
+        only built once for all the processes sharing the cache.
+
         Returns:
             RubricIndex
 
         """
-        return RubricIndex(self)
+        cache_key = "assessment.rubric_index.{id}.{content_hash}".format(
+            id=self.id, content_hash=self.content_hash
+        )
+        index = cache.get(cache_key)
+        if index is None:
+            index = RubricIndex(self)
+            cache.set(cache_key, index)
+        return index
 
     @staticmethod
     def content_hash_from_dict(rubric_dict):
@@ -96,15 +106,7 @@ class Rubric(models.Model):
         database, the child object needs to have the ID of the parent, meaning
         that Rubric would have to have already been created and persisted.
         """
-        rubric_dict = deepcopy(rubric_dict)
-
-        # Neither "id" nor "content_hash" would count towards calculating the
-        # content_hash.
-        rubric_dict.pop("id", None)
-        rubric_dict.pop("content_hash", None)
-
-        canonical_form = json.dumps(rubric_dict, sort_keys=True)
-        return sha1(canonical_form).hexdigest()
+        return Rubric.hashes_from_dict(rubric_dict)[0]
 
     @staticmethod
     def structure_hash_from_dict(rubric_dict):
@@ -120,6 +122,32 @@ class Rubric(models.Model):
         criteria/options unique IDs -- when we do that, we will need to update
         this method and create a data migration for existing rubrics.
         """
+        return Rubric.hashes_from_dict(rubric_dict)[1]
+
+    @staticmethod
+    def hashes_from_dict(rubric_dict):
+        """
+        Calculate both the content hash and the structure hash of a rubric
+        (see `content_hash_from_dict` and `structure_hash_from_dict`),
+        without copying the rubric.
+
+        Callers that assess with the same rubric definition many times
+        (such as the XBlock) can calculate its hashes once and pass them
+        to `rubric_from_dict`.
+
+        Args:
+            rubric_dict (dict): The serialized rubric.
+
+        Returns:
+            tuple of (content_hash, structure_hash)
+
+        """
+        # Neither "id" nor "content_hash" would count towards calculating the
+        # content_hash.
+        content = {
+            key: value for key, value in rubric_dict.iteritems()
+            if key not in ("id", "content_hash")
+        }
         structure = [
             {
                 "criterion_name": criterion.get('name'),
@@ -135,8 +163,10 @@ class Rubric(models.Model):
             }
             for criterion in rubric_dict.get('criteria', [])
         ]
-        canonical_form = json.dumps(structure, sort_keys=True)
-        return sha1(canonical_form).hexdigest()
+        return (
+            sha1(json.dumps(content, sort_keys=True)).hexdigest(),
+            sha1(json.dumps(structure, sort_keys=True)).hexdigest(),
+        )
 
 
 class Criterion(models.Model):
@@ -227,6 +257,12 @@ class RubricIndex(object):
     """
     Loads a rubric's criteria and options into memory so that they
     can be repeatedly queried without hitting the database.
+
+    The index is a compact, picklable snapshot of the rubric: the criteria
+    and their options are packed into tuples in order, with dictionaries
+    mapping names and point values to positions in those tuples, and the
+    points possible are computed up front.  This lets `Rubric.index` store
+    the index in the cache and reuse it across processes.
     """
 
     def __init__(self, rubric):
@@ -240,41 +276,50 @@ class RubricIndex(object):
             RubricIndex
 
         """
-        self.rubric = rubric
-
-        # Load the rubric's criteria and options from the database
-        criteria = Criterion.objects.select_related().filter(rubric=rubric)
-        options = CriterionOption.objects.select_related().filter(
-            criterion__rubric=rubric
-        ).order_by("-order_num")
-
-        # Create dictionaries indexing the criteria/options
-        self._criteria_index = {
-            criterion.name: criterion
-            for criterion in criteria
-        }
-
-        # Finds the set of all criteria which have options by traversing through the options, and adding all of
-        # the options' associated criteria to an expanding set.
-        criteria_with_options = set()
-        option_index = {}
-        for option in options:
-            option_index[(option.criterion.name, option.name)] = option
-            criteria_with_options.add(option.criterion)
+        self.rubric_id = rubric.id
+        self.rubric_content_hash = rubric.content_hash
+
+        # Load the rubric's criteria and options from the database,
+        # both in ascending order by order number.
+        criteria = list(Criterion.objects.filter(rubric=rubric))
+        options_by_criterion = defaultdict(list)
+        for option in CriterionOption.objects.filter(criterion__rubric=rubric):
+            options_by_criterion[option.criterion_id].append(option)
+
+        self._criteria = tuple(criteria)
+        self._options = tuple(
+            tuple(options_by_criterion[criterion.id]) for criterion in criteria
+        )
 
-        # Anything not in the above mentioned set is a zero option criteria, and we save it here for future reference.
-        self._criteria_without_options = set(self._criteria_index.values()) - criteria_with_options
+        # Map names (and option points) to positions in the tuples above.
+        # By convention, if multiple options in the same criterion have the
+        # same point value, we return the *first* option, so the option with
+        # the lowest order number takes precedence.
+        self._criterion_positions = {}
+        self._option_positions = {}
+        self._option_points_positions = {}
+        for criterion_pos, criterion in enumerate(self._criteria):
+            self._criterion_positions[criterion.name] = criterion_pos
+            for option_pos, option in enumerate(self._options[criterion_pos]):
+                # Avoid a query when an option's criterion is accessed
+                option.criterion = criterion
+                self._option_positions.setdefault((criterion.name, option.name), (criterion_pos, option_pos))
+                self._option_points_positions.setdefault(
+                    (criterion.name, option.points), (criterion_pos, option_pos)
+                )
 
-        self._option_index = option_index
+        # Criteria with zero options have only written feedback.
+        self._criteria_without_options = set(
+            criterion
+            for criterion, options in zip(self._criteria, self._options)
+            if not options
+        )
 
-        # By convention, if multiple options in the same criterion have the
-        # same point value, we return the *first* option.
-        # Since the options are in descending order by order number,
-        # the option with the lowest order number takes precedence.
-        self._option_points_index = {
-            (option.criterion.name, option.points): option
-            for option in options
-        }
+        # By convention, criteria with 0 options (only feedback) have 0 points possible
+        self.points_possible = sum(
+            max(option.points for option in options)
+            for options in self._options if options
+        )
 
     def find_criterion(self, criterion_name):
         """
@@ -290,17 +335,17 @@ class RubricIndex(object):
             InvalidRubricSelection
 
         """
-        if criterion_name not in self._criteria_index:
+        if criterion_name not in self._criterion_positions:
             msg = (
                 u"Could not find criterion named \"{criterion}\" "
                 u"in the rubric with content hash \"{rubric_hash}\""
             ).format(
                 criterion=criterion_name,
-                rubric_hash=self.rubric.content_hash
+                rubric_hash=self.rubric_content_hash
             )
             raise InvalidRubricSelection(msg)
         else:
-            return self._criteria_index[criterion_name]
+            return self._criteria[self._criterion_positions[criterion_name]]
 
     def find_option(self, criterion_name, option_name):
         """
@@ -318,18 +363,19 @@ class RubricIndex(object):
 
         """
         key = (criterion_name, option_name)
-        if key not in self._option_index:
+        if key not in self._option_positions:
             msg = (
                 u"Option \"{option}\" not found in rubric "
                 u"with hash {rubric_hash} for criterion \"{criterion}\""
             ).format(
                 option=option_name,
                 criterion=criterion_name,
-                rubric_hash=self.rubric.content_hash
+                rubric_hash=self.rubric_content_hash
             )
             raise InvalidRubricSelection(msg)
         else:
-            return self._option_index[key]
+            criterion_pos, option_pos = self._option_positions[key]
+            return self._options[criterion_pos][option_pos]
 
     def find_option_for_points(self, criterion_name, option_points):
         """
@@ -349,20 +395,21 @@ class RubricIndex(object):
 
         """
         key = (criterion_name, option_points)
-        if key not in self._option_points_index:
+        if key not in self._option_points_positions:
             msg = (
                 u"Option with points {option_points} not found in rubric "
                 u"with hash {rubric_hash} for criterion {criterion}"
             ).format(
                 option_points=option_points,
                 criterion=criterion_name,
-                rubric_hash=self.rubric.content_hash
+                rubric_hash=self.rubric_content_hash
             )
             raise InvalidRubricSelection(msg)
         else:
             # Assume that we gave priority to options with lower
             # order numbers when we created the index.
-            return self._option_points_index[key]
+            criterion_pos, option_pos = self._option_points_positions[key]
+            return self._options[criterion_pos][option_pos]
 
     @property
     def criteria_names(self):
@@ -373,7 +420,7 @@ class RubricIndex(object):
             set of unicode
 
         """
-        return set(self._criteria_index.keys())
+        return set(self._criterion_positions.keys())
 
     def find_missing_criteria(self, criteria_names):
         """
@@ -401,6 +448,107 @@ class RubricIndex(object):
         return self._criteria_without_options
 
 
+class RubricRegistry(object):
+    """
+    A bounded, process-local registry of rubrics, keyed by content hash.
+
+    Rubrics are immutable, so once a rubric has been loaded, the same object
+    (with its `RubricIndex` already loaded) can be shared by every request
+    in the process.  The least recently used rubrics are dropped once the
+    registry is full.
+
+    A rubric registered inside a transaction may have been created by that
+    transaction, and disappear if it is rolled back.  Such a rubric is checked
+    against the database whenever it is retrieved, until it is retrieved
+    outside of any transaction, so the registry never returns a rubric
+    whose row no longer exists.
+    """
+
+    def __init__(self, max_size):
+        """
+        Create an empty registry.
+
+        Args:
+            max_size (int): The maximum number of rubrics to keep.
+
+        """
+        self.max_size = max_size
+        self._rubrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, content_hash):
+        """
+        Retrieve a registered rubric.
+
+        Args:
+            content_hash (str): The content hash of the rubric.
+
+        Returns:
+            Rubric or None
+
+        Raises:
+            DatabaseError
+
+        """
+        with self._lock:
+            entry = self._rubrics.pop(content_hash, None)
+            if entry is None:
+                return None
+            self._rubrics[content_hash] = entry
+
+        rubric, committed = entry
+        if not committed:
+            if not Rubric.objects.filter(pk=rubric.pk).exists():
+                self.discard(content_hash)
+                return None
+            if not transaction.get_connection().in_atomic_block:
+                with self._lock:
+                    if content_hash in self._rubrics:
+                        self._rubrics[content_hash] = (rubric, True)
+        return rubric
+
+    def add(self, rubric):
+        """
+        Load a rubric's index, and register it.
+
+        Args:
+            rubric (Rubric): The rubric to register, which must have been
+                read from the database.
+
+        Raises:
+            DatabaseError
+
+        """
+        rubric.index  # pylint: disable=pointless-statement
+        committed = not transaction.get_connection().in_atomic_block
+        with self._lock:
+            self._rubrics.pop(rubric.content_hash, None)
+            self._rubrics[rubric.content_hash] = (rubric, committed)
+            while len(self._rubrics) > self.max_size:
+                self._rubrics.popitem(last=False)
+
+    def discard(self, content_hash):
+        """
+        Remove a rubric from the registry, if it is registered.
+
+        Args:
+            content_hash (str): The content hash of the rubric.
+
+        """
+        with self._lock:
+            self._rubrics.pop(content_hash, None)
+
+    def clear(self):
+        """
+        Remove every rubric from the registry.
+        """
+        with self._lock:
+            self._rubrics.clear()
+
+
+RUBRIC_REGISTRY = RubricRegistry(getattr(settings, 'ORA2_RUBRIC_REGISTRY_SIZE', 100))
+
+
 class Assessment(models.Model):
     """An evaluation made against a particular Submission and Rubric.
 
@@ -555,9 +703,9 @@ class Assessment(models.Model):
         Create a key value in a dict with a list of values, for every criterion
         found in an assessment.
 
-        Iterate over every part of every assessment. Each part is associated with
-        a criterion name, which becomes a key in the score dictionary, with a list
-        of scores.
+        The parts of all the assessments are loaded in a single query. Each part
+        is associated with a criterion name, which becomes a key in the score
+        dictionary, with a list of scores.
 
         Args:
             assessments (list): List of assessments to sort scores by their
@@ -571,24 +719,33 @@ class Assessment(models.Model):
                 "bar": [6, 7, 8]
             }
         """
-        assessments = list(assessments)  # Force us to read it all
-        if not assessments:
+        assessment_ids = [assessment.id for assessment in assessments]
+        if not assessment_ids:
             return {}
 
         # Generate a cache key that represents all the assessments we're being
-        # asked to grab scores from (comma separated list of assessment IDs)
+        # asked to grab scores from.  The IDs are hashed so that the key has
+        # a fixed length no matter how many assessments there are.
         cache_key = "assessments.scores_by_criterion.{}".format(
-            ",".join(str(assessment.id) for assessment in assessments)
+            sha1(",".join(str(assessment_id) for assessment_id in assessment_ids)).hexdigest()
         )
         scores = cache.get(cache_key)
-        if scores:
+        if scores is not None:
             return scores
 
+        # Load the scores of every part of every assessment in a single query.
+        # Parts with no option (only feedback) earn 0 points.
+        points_by_assessment = defaultdict(list)
+        parts = AssessmentPart.objects.filter(
+            assessment_id__in=assessment_ids
+        ).order_by('id').values_list('assessment_id', 'criterion__name', 'option__points')
+        for assessment_id, criterion_name, points in parts:
+            points_by_assessment[assessment_id].append((criterion_name, points or 0))
+
         scores = defaultdict(list)
-        for assessment in assessments:
-            for part in assessment.parts.all().select_related():
-                criterion_name = part.criterion.name
-                scores[criterion_name].append(part.points_earned)
+        for assessment_id in assessment_ids:
+            for criterion_name, points in points_by_assessment[assessment_id]:
+                scores[criterion_name].append(points)
 
         cache.set(cache_key, scores)
         return scores
@@ -661,7 +818,114 @@ class AssessmentPart(models.Model):
         # without repeatedly hitting the database.
         # This will also validate our selections against the rubric.
         rubric_index = assessment.rubric.index
+        return cls.objects.bulk_create(
+            cls._parts_from_option_names(rubric_index, assessment, selected, feedback)
+        )
+
+    @classmethod
+    def create_from_option_points(cls, assessment, selected):
+        """
+        Create new assessment parts and add them to an assessment.
+
+        Args:
+            assessment (Assessment): The assessment we're adding parts to.
+            selected (dict): A dictionary mapping criterion names to option point values.
 
+        Returns:
+            list of `AssessmentPart`s
+
+        Raises:
+            InvalidRubricSelection
+            DatabaseError
+
+        """
+        rubric_index = assessment.rubric.index
+        return cls.objects.bulk_create(
+            cls._parts_from_option_points(rubric_index, assessment, selected)
+        )
+
+    @classmethod
+    def create_many_from_option_names(cls, rubric, selections):
+        """
+        Create the assessment parts for many assessments made with the same rubric.
+
+        Every selection is validated against the rubric before any part is
+        written, then all the parts are written with a single bulk insert.
+
+        Args:
+            rubric (Rubric): The rubric that all the assessments were made with.
+            selections (list of tuples): For each assessment, a tuple of
+                `(assessment, selected, feedback)`, where `selected` maps criterion
+                names to option names, and `feedback` maps criterion names to
+                written feedback for the criterion (or is None).
+
+        Returns:
+            list of `AssessmentPart`s
+
+        Raises:
+            InvalidRubricSelection
+            DatabaseError
+
+        """
+        rubric_index = rubric.index
+        parts = []
+        for assessment, selected, feedback in selections:
+            cls._check_assessment_rubric(rubric, assessment)
+            parts.extend(cls._parts_from_option_names(rubric_index, assessment, selected, feedback))
+
+        with transaction.atomic():
+            return cls.objects.bulk_create(parts)
+
+    @classmethod
+    def create_many_from_option_points(cls, rubric, selections):
+        """
+        Create the assessment parts for many assessments made with the same rubric.
+
+        Every selection is validated against the rubric before any part is
+        written, then all the parts are written with a single bulk insert.
+
+        Args:
+            rubric (Rubric): The rubric that all the assessments were made with.
+            selections (list of tuples): For each assessment, a tuple of
+                `(assessment, selected)`, where `selected` maps criterion
+                names to option point values.
+
+        Returns:
+            list of `AssessmentPart`s
+
+        Raises:
+            InvalidRubricSelection
+            DatabaseError
+
+        """
+        rubric_index = rubric.index
+        parts = []
+        for assessment, selected in selections:
+            cls._check_assessment_rubric(rubric, assessment)
+            parts.extend(cls._parts_from_option_points(rubric_index, assessment, selected))
+
+        with transaction.atomic():
+            return cls.objects.bulk_create(parts)
+
+    @classmethod
+    def _parts_from_option_names(cls, rubric_index, assessment, selected, feedback):
+        """
+        Build (but don't save) the parts of an assessment from the names of the selected options.
+
+        Args:
+            rubric_index (RubricIndex): The index of the assessment's rubric.
+            assessment (Assessment): The assessment we're adding parts to.
+            selected (dict): A dictionary mapping criterion names to option names.
+            feedback (dict or None): A dictionary mapping criterion names to written
+                feedback for the criterion.
+
+        Returns:
+            list of `AssessmentPart`s
+
+        Raises:
+            InvalidRubricSelection
+
+        """
         # If the assessment type doesn't explicitly provide feedback,
         # then fill in feedback-only criteria with an empty string for feedback.
         if feedback is None:
@@ -700,7 +964,7 @@ class AssessmentPart(models.Model):
         # Create assessment parts for each criterion and associate them with the assessment
         # We use the dictionary we created earlier, which may have null options
         # for feedback-only assessment parts.
-        return cls.objects.bulk_create([
+        return [
             cls(
                 assessment=assessment,
                 criterion=assessment_part['criterion'],
@@ -708,31 +972,25 @@ class AssessmentPart(models.Model):
                 feedback=assessment_part['feedback']
             )
             for assessment_part in assessment_parts
-        ])
+        ]
 
     @classmethod
-    def create_from_option_points(cls, assessment, selected):
+    def _parts_from_option_points(cls, rubric_index, assessment, selected):
         """
-        Create new assessment parts and add them to an assessment.
+        Build (but don't save) the parts of an assessment from the points of the selected options.
 
         Args:
+            rubric_index (RubricIndex): The index of the assessment's rubric.
             assessment (Assessment): The assessment we're adding parts to.
             selected (dict): A dictionary mapping criterion names to option point values.
 
-        Keyword Arguments:
-            feedback (dict): A dictionary mapping criterion names to written
-                feedback for the criterion.
-
         Returns:
             list of `AssessmentPart`s
 
         Raises:
             InvalidRubricSelection
-            DatabaseError
 
         """
-        rubric_index = assessment.rubric.index
-
         # Retrieve the criteria/option/feedback for criteria that have options.
         # Since we're using the rubric's index, we'll get an `InvalidRubricSelection` error
         # if we select an invalid criterion/option.
@@ -760,7 +1018,7 @@ class AssessmentPart(models.Model):
 
         # Create assessment parts for each criterion and associate them with the assessment
         # Since we're not accepting written feedback, set all feedback to an empty string.
-        return cls.objects.bulk_create([
+        return [
             cls(
                 assessment=assessment,
                 criterion=assessment_part['criterion'],
@@ -768,7 +1026,28 @@ class AssessmentPart(models.Model):
                 feedback=u""
             )
             for assessment_part in assessment_parts
-        ])
+        ]
+
+    @classmethod
+    def _check_assessment_rubric(cls, rubric, assessment):
+        """
+        Verify that an assessment was made with the given rubric.
+
+        Args:
+            rubric (Rubric): The rubric the assessment should have been made with.
+            assessment (Assessment): The assessment to check.
+
+        Returns:
+            None
+
+        Raises:
+            InvalidRubricSelection
+        """
+        if assessment.rubric_id != rubric.id:
+            msg = u"Assessment {assessment} was not made with rubric {rubric}".format(
+                assessment=assessment.id, rubric=rubric.id
+            )
+            raise InvalidRubricSelection(msg)
 
     @classmethod
     def _check_has_all_criteria(cls, rubric_index, selected_criteria):
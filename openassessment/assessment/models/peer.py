@@ -10,7 +10,8 @@ need to then generate a matching migration for it using:
 import random
 from datetime import timedelta
 
-from django.db import models, DatabaseError
+from django.db import connections, models, transaction, DatabaseError
+from django.db.models.functions import Coalesce
 from django.utils.timezone import now
 
 from openassessment.assessment.models.base import Assessment
@@ -20,6 +21,13 @@ import logging
 logger = logging.getLogger("openassessment.assessment.models")
 
 
+def _random_key():
+    """
+    Default value for `PeerWorkflow.random_key`.
+    """
+    return random.random()
+
+
 class AssessmentFeedbackOption(models.Model):
     """
     Option a student can select to provide feedback on the feedback they received.
@@ -107,6 +115,10 @@ class PeerWorkflow(models.Model):
     # Amount of time before a lease on a submission expires
     TIME_LIMIT = timedelta(hours=8)
 
+    # Number of times to rescan the review queue when other graders
+    # reserve every candidate before this learner can claim one.
+    MAX_CLAIM_ATTEMPTS = 3
+
     student_id = models.CharField(max_length=40, db_index=True)
     item_id = models.CharField(max_length=128, db_index=True)
     course_id = models.CharField(max_length=40, db_index=True)
@@ -116,8 +128,13 @@ class PeerWorkflow(models.Model):
     grading_completed_at = models.DateTimeField(null=True, db_index=True)
     cancelled_at = models.DateTimeField(null=True, db_index=True)
 
+    # Uniformly distributed sort key, used to pick a random workflow
+    # for over grading with an index seek.
+    random_key = models.FloatField(default=_random_key)
+
     class Meta:
         ordering = ["created_at", "id"]
+        index_together = [["course_id", "item_id", "random_key"]]
         app_label = "assessment"
 
     @property
@@ -203,6 +220,7 @@ class PeerWorkflow(models.Model):
                 )
             item.started_at = now()
             item.save()
+            PeerReviewQueueEntry.refresh_for(peer_workflow)
             return item
         except DatabaseError:
             error_message = (
@@ -233,23 +251,19 @@ class PeerWorkflow(models.Model):
 
         """
         oldest_acceptable = now() - self.TIME_LIMIT
-        items = list(self.graded.all().select_related('author').order_by("-started_at", "-id"))
-        valid_open_items = []
-        completed_sub_uuids = []
-        # First, remove all completed items.
-        for item in items:
-            if item.assessment is not None or item.author.is_cancelled:
-                completed_sub_uuids.append(item.submission_uuid)
-            else:
-                valid_open_items.append(item)
-
-        # Remove any open items which have a submission which has been completed.
-        for item in valid_open_items:
-            if (item.started_at < oldest_acceptable or
-                    item.submission_uuid in completed_sub_uuids):
-                valid_open_items.remove(item)
-
-        return valid_open_items[0] if valid_open_items else None
+        # An open item is one that has not been assessed, has not expired,
+        # and whose author has not cancelled.  Submissions that the scorer
+        # has already assessed under another item are not open either.
+        items = self.graded.filter(
+            assessment__isnull=True,
+            started_at__gte=oldest_acceptable,
+            author__cancelled_at__isnull=True,
+        ).exclude(
+            submission_uuid__in=self.graded.filter(assessment__isnull=False).values('submission_uuid')
+        ).order_by("-started_at", "-id")
+
+        open_items = list(items[:1])
+        return open_items[0] if open_items else None
 
     def get_submission_for_review(self, graded_by):
         """
@@ -258,7 +272,8 @@ class PeerWorkflow(models.Model):
         completely graded, or is actively being reviewed by other students.
 
         Args:
-            graded_by (unicode): Student ID of the scorer.
+            graded_by (int): The number of assessments a submission
+                requires before it has completed the peer assessment process.
 
         Returns:
             submission_uuid (str): The submission_uuid for the submission to review.
@@ -268,51 +283,12 @@ class PeerWorkflow(models.Model):
                 the workflows or workflow items for this request.
 
         """
-        timeout = (now() - self.TIME_LIMIT).strftime("%Y-%m-%d %H:%M:%S")
-        # The follow query behaves as the Peer Assessment Queue. This will
-        # find the next submission (via PeerWorkflow) in this course / question
-        # that:
-        #  1) Does not belong to you
-        #  2) Does not have enough completed assessments
-        #  3) Is not something you have already scored.
-        #  4) Does not have a combination of completed assessments or open
-        #     assessments equal to or more than the requirement.
-        #  5) Has not been cancelled.
+        current_time = now()
         try:
-            peer_workflows = list(PeerWorkflow.objects.raw(
-                "select pw.id, pw.submission_uuid "
-                "from assessment_peerworkflow pw "
-                "where pw.item_id=%s "
-                "and pw.course_id=%s "
-                "and pw.student_id<>%s "
-                "and pw.grading_completed_at is NULL "
-                "and pw.cancelled_at is NULL "
-                "and pw.id not in ("
-                "   select pwi.author_id "
-                "   from assessment_peerworkflowitem pwi "
-                "   where pwi.scorer_id=%s "
-                "   and pwi.assessment_id is not NULL "
-                ") "
-                "and ("
-                "   select count(pwi.id) as c "
-                "   from assessment_peerworkflowitem pwi "
-                "   where pwi.author_id=pw.id "
-                "   and (pwi.assessment_id is not NULL or pwi.started_at > %s) "
-                ") < %s "
-                "order by pw.created_at, pw.id "
-                "limit 10; ",
-                [
-                    self.item_id,
-                    self.course_id,
-                    self.student_id,
-                    self.id,
-                    timeout,
-                    graded_by
-                ]
-            ))
-            if not peer_workflows:
+            entries = self._review_candidates(self._review_queue(graded_by, current_time), current_time)
+            if not entries:
                 return None
-            return random.choice(peer_workflows).submission_uuid
+            return random.choice(entries).submission_uuid
         except DatabaseError:
             error_message = (
                 u"An internal error occurred while retrieving a peer submission "
@@ -321,6 +297,127 @@ class PeerWorkflow(models.Model):
             logger.exception(error_message)
             raise PeerAssessmentInternalError(error_message)
 
+    def claim_submission_for_review(self, graded_by):
+        """
+        Find a submission for peer assessment, as `get_submission_for_review`
+        does, and reserve one of its open review slots for this learner.
+
+        The reservation is a conditional update on the submission's queue
+        entry, so concurrent graders can never take more slots than the
+        submission has left.  Where the database supports it, the candidate
+        entries are also locked with SKIP LOCKED, so concurrent graders are
+        handed different submissions rather than racing for the same ones.
+
+        The reservation lasts until the caller's transaction creates the
+        workflow item for the lease (see `create_item`); call this inside
+        the same transaction so the two are committed together.
+
+        Args:
+            graded_by (int): The number of assessments a submission
+                requires before it has completed the peer assessment process.
+
+        Returns:
+            submission_uuid (str): The submission_uuid for the submission to
+                review, or None if no submission could be reserved.
+
+        Raises:
+            PeerAssessmentInternalError: Raised when there is an error retrieving
+                or updating the review queue for this request.
+
+        """
+        current_time = now()
+        try:
+            with transaction.atomic():
+                queue = self._review_queue(graded_by, current_time)
+                for __ in range(self.MAX_CLAIM_ATTEMPTS):
+                    entries = self._review_candidates(queue, current_time, lock=True)
+                    if not entries:
+                        return None
+
+                    # Prefer a random candidate, then fall back to the rest
+                    # if another grader takes its last slot first.
+                    first_choice = random.choice(entries)
+                    entries.remove(first_choice)
+                    for entry in [first_choice] + entries:
+                        if entry.claim(graded_by, current_time):
+                            return entry.submission_uuid
+                return None
+        except DatabaseError:
+            error_message = (
+                u"An internal error occurred while reserving a peer submission "
+                u"for learner {}"
+            ).format(self)
+            logger.exception(error_message)
+            raise PeerAssessmentInternalError(error_message)
+
+    def _review_queue(self, graded_by, current_time):
+        """
+        Build the query for the queue entries this learner could review.
+
+        Args:
+            graded_by (int): The number of assessments a submission
+                requires before it has completed the peer assessment process.
+            current_time (datetime): The time to check open leases against.
+
+        Returns:
+            QuerySet of PeerReviewQueueEntry
+
+        """
+        # The review queue behaves as the Peer Assessment Queue. This will
+        # find the next submission (via PeerReviewQueueEntry) in this course /
+        # question that:
+        #  1) Does not belong to you
+        #  2) Does not have enough completed assessments
+        #  3) Is not something you have already scored.
+        #  4) Does not have a combination of completed assessments or open
+        #     assessments equal to or more than the requirement.
+        #  5) Has not been cancelled.
+        # Workflows that have been fully graded or cancelled are removed
+        # from the queue, so (5) holds for every entry.
+        return PeerReviewQueueEntry.objects.filter(
+            models.Q(leased_count__lt=graded_by - models.F('completed_count')) |
+            models.Q(lease_expires_at__lte=current_time),
+            course_id=self.course_id,
+            item_id=self.item_id,
+            completed_count__lt=graded_by,
+        ).exclude(
+            student_id=self.student_id
+        ).exclude(
+            author__in=self.graded.filter(assessment__isnull=False).values('author')
+        )
+
+    @staticmethod
+    def _review_candidates(queue, current_time, lock=False):
+        """
+        Take the entries at the head of the review queue.
+
+        Args:
+            queue (QuerySet): The queue entries to choose from.
+            current_time (datetime): The time to check open leases against.
+
+        Kwargs:
+            lock (bool): Lock the returned entries (see
+                `PeerReviewQueueEntry.lock_entries`).
+
+        Returns:
+            list of PeerReviewQueueEntry
+
+        """
+        # Entries with an expired lease may be counting leases that are
+        # no longer open, so refresh them and look again.  Refreshed
+        # entries are no longer stale, and an entry whose refresh loses
+        # a race has been updated by another request, so this terminates.
+        while True:
+            if lock:
+                entries = PeerReviewQueueEntry.lock_entries(queue[:10])
+            else:
+                entries = list(queue[:10])
+            stale_entries = [entry for entry in entries if entry.is_stale(current_time)]
+            if not stale_entries:
+                return entries
+            for entry in stale_entries:
+                entry.refresh()
+
     def get_submission_for_over_grading(self):
         """
         Retrieve the next submission uuid for over grading in peer assessment.
@@ -331,31 +428,30 @@ class PeerWorkflow(models.Model):
         #  1) Does not belong to you
         #  2) Is not something you have already scored
         #  3) Has not been cancelled.
+        # Rather than counting the eligible workflows and skipping to a random
+        # offset, pick a random point in the range of `random_key` and seek to
+        # the first eligible workflow at or after it, wrapping around to the
+        # start of the range if there are none.
         try:
-            #query = list(PeerWorkflow.objects.raw(
-            #    "select pw.id, pw.submission_uuid "
-            #    "from assessment_peerworkflow pw "
-            #    "where course_id=%s "
-            #    "and item_id=%s "
-            #    "and student_id<>%s "
-            #    "and pw.cancelled_at is NULL "
-            #    "and pw.id not in ( "
-            #        "select pwi.author_id "
-            #        "from assessment_peerworkflowitem pwi "
-            #        "where pwi.scorer_id=%s); ",
-            #    [self.course_id, self.item_id, self.student_id, self.id]
-            #))
-            # Note: RawQuerySet doesn't have a count method, so replace it
-            query = PeerWorkflow.objects.filter(course_id=self.course_id, item_id=self.item_id, cancelled_at=None).exclude(student_id=self.student_id).exclude(graded_by__scorer_id=self.id).order_by()
-            #workflow_count = len(query)
-            workflow_count = query.count()
-            if workflow_count < 1:
-                return None
+            query = PeerWorkflow.objects.filter(
+                course_id=self.course_id,
+                item_id=self.item_id,
+                cancelled_at=None
+            ).exclude(
+                student_id=self.student_id
+            ).exclude(
+                graded_by__scorer_id=self.id
+            )
 
-            random_int = random.randint(0, workflow_count - 1)
-            random_workflow = query[random_int]
+            random_key = _random_key()
+            workflows = (
+                list(query.filter(random_key__gte=random_key).order_by('random_key')[:1]) or
+                list(query.filter(random_key__lt=random_key).order_by('random_key')[:1])
+            )
+            if not workflows:
+                return None
 
-            return random_workflow.submission_uuid
+            return workflows[0].submission_uuid
         except DatabaseError:
             error_message = (
                 u"An internal error occurred while retrieving a peer submission "
@@ -397,6 +493,8 @@ class PeerWorkflow(models.Model):
                     and item.author.graded_by.filter(assessment__isnull=False).count() >= num_required_grades):
                 item.author.grading_completed_at = now()
                 item.author.save()
+
+            PeerReviewQueueEntry.refresh_for(item.author)
         except (DatabaseError, PeerWorkflowItem.DoesNotExist):
             error_message = (
                 u"An internal error occurred while retrieving a workflow item for "
@@ -466,6 +564,7 @@ class PeerWorkflowItem(models.Model):
 
     class Meta:
         ordering = ["started_at", "id"]
+        index_together = [["scorer", "assessment", "started_at"]]
         app_label = "assessment"
 
     def __repr__(self):
@@ -478,3 +577,282 @@ class PeerWorkflowItem(models.Model):
 
     def __unicode__(self):
         return repr(self)
+
+
+class PeerReviewQueueEntry(models.Model):
+    """Denormalized entry in the peer assessment queue for an item.
+
+    There is one entry for each peer workflow whose submission still needs to
+    receive assessments.  The entry records how many assessments the author
+    has received and how many leases are currently open on the submission,
+    so that finding the next submission to review is an indexed range scan
+    over (course_id, item_id, created_at) instead of an aggregation over every
+    `PeerWorkflowItem` in the item.
+
+    Entries are updated whenever a workflow item is created or closed for the
+    author, and removed once the author has been fully graded or cancelled.
+    Workflows that existed before this table was introduced are loaded by a
+    data migration, and the entries can be rebuilt at any time with the
+    `backfill_peer_review_queue` management command.
+
+    """
+    author = models.OneToOneField(PeerWorkflow, related_name='review_queue_entry')
+
+    # Copied from the author's workflow, so the queue can be
+    # scanned without joining to the workflow table.
+    student_id = models.CharField(max_length=40)
+    item_id = models.CharField(max_length=128)
+    course_id = models.CharField(max_length=40)
+    submission_uuid = models.CharField(max_length=128)
+    created_at = models.DateTimeField(default=now)
+
+    # Number of assessments the author has received, and the number of
+    # leases open on the author's submission that have not yet expired.
+    completed_count = models.PositiveIntegerField(default=0)
+    leased_count = models.PositiveIntegerField(default=0)
+
+    # When the oldest open lease expires.  Until then `leased_count` is exact;
+    # afterwards the entry must be refreshed before its counts can be trusted.
+    lease_expires_at = models.DateTimeField(null=True)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        index_together = [["course_id", "item_id", "created_at"]]
+        app_label = "assessment"
+
+    @classmethod
+    def enqueue(cls, workflow):
+        """
+        Add a peer workflow to the review queue, if it isn't already queued.
+
+        Args:
+            workflow (PeerWorkflow): The workflow of the submission's author.
+
+        Returns:
+            PeerReviewQueueEntry
+
+        Raises:
+            DatabaseError
+
+        """
+        entry, __ = cls.objects.get_or_create(
+            author=workflow,
+            defaults={
+                'student_id': workflow.student_id,
+                'item_id': workflow.item_id,
+                'course_id': workflow.course_id,
+                'submission_uuid': workflow.submission_uuid,
+                'created_at': workflow.created_at,
+            }
+        )
+        return entry
+
+    @classmethod
+    def dequeue(cls, workflow):
+        """
+        Remove a peer workflow from the review queue.
+
+        Args:
+            workflow (PeerWorkflow): The workflow of the submission's author.
+
+        Raises:
+            DatabaseError
+
+        """
+        cls.objects.filter(author=workflow).delete()
+
+    @classmethod
+    def refresh_for(cls, workflow):
+        """
+        Bring the queue entry for a workflow up to date, creating it if
+        necessary.  Workflows that have been fully graded or cancelled are
+        removed from the queue.
+
+        Args:
+            workflow (PeerWorkflow): The workflow of the submission's author.
+
+        Returns:
+            None
+
+        Raises:
+            DatabaseError
+
+        """
+        if workflow.grading_completed_at is not None or workflow.is_cancelled:
+            cls.dequeue(workflow)
+            return None
+
+        # Workflows that were created before the queue existed
+        # are added the first time they are touched.
+        cls.enqueue(workflow).refresh()
+
+    @classmethod
+    def lock_entries(cls, queryset):
+        """
+        Evaluate a query for queue entries, locking the rows it returns until
+        the end of the current transaction.
+
+        Where the database supports it (PostgreSQL 9.5+, MySQL 8.0.1+), rows
+        that another transaction has already locked are skipped rather than
+        waited on.  Elsewhere the rows are read without locking, and
+        `claim` alone prevents a submission from being over-assigned.
+
+        Args:
+            queryset (QuerySet): The (sliced) queue entries to lock.
+
+        Returns:
+            list of PeerReviewQueueEntry
+
+        Raises:
+            DatabaseError
+
+        """
+        connection = connections[queryset.db]
+        if not _supports_skip_locked(connection):
+            return list(queryset)
+
+        # Django doesn't support SKIP LOCKED, so append it to the
+        # SELECT ... FOR UPDATE that it generates for this query.
+        locked_query = queryset.select_for_update().query
+        sql, params = locked_query.get_compiler(using=queryset.db).as_sql()
+        return list(cls.objects.db_manager(queryset.db).raw(sql + u" SKIP LOCKED", params))
+
+    def claim(self, graded_by, at_time):
+        """
+        Reserve one of the open review slots on this entry, if any are left.
+
+        The check and the reservation are a single conditional UPDATE, so
+        two graders can never both take the last slot, even when reading
+        from stale copies of the entry.  Entries whose oldest lease has
+        expired must be refreshed before they can be claimed.
+
+        Args:
+            graded_by (int): The number of assessments the submission requires.
+            at_time (datetime): The time the lease starts.
+
+        Returns:
+            bool: True if a slot was reserved.
+
+        Raises:
+            DatabaseError
+
+        """
+        lease_expires_at = at_time + PeerWorkflow.TIME_LIMIT
+        updated = PeerReviewQueueEntry.objects.filter(
+            models.Q(lease_expires_at=None) | models.Q(lease_expires_at__gt=at_time),
+            id=self.id,
+            leased_count__lt=graded_by - models.F('completed_count'),
+        ).update(
+            leased_count=models.F('leased_count') + 1,
+            lease_expires_at=Coalesce(
+                'lease_expires_at',
+                models.Value(lease_expires_at, output_field=models.DateTimeField())
+            ),
+        )
+        return updated == 1
+
+    def is_stale(self, at_time):
+        """
+        Check whether an open lease counted by this entry has expired.
+
+        Args:
+            at_time (datetime): The time to check the leases against.
+
+        Returns:
+            bool
+
+        """
+        return self.lease_expires_at is not None and self.lease_expires_at <= at_time
+
+    def refresh(self):
+        """
+        Recount the completed assessments and open leases for this entry
+        from the author's workflow items, and save the counts.
+
+        A claim reserves its slot before the workflow item for the lease is
+        committed, so the entry is locked before the items are counted: a
+        claim still in progress holds the lock until its item is committed.
+        The counts are then written only if they haven't changed since the
+        entry was read, so a claim is never overwritten on databases that
+        don't lock rows (SQLite).
+
+        Returns:
+            bool: True if the entry was updated, False if it changed
+                concurrently or has been removed from the queue.
+
+        Raises:
+            DatabaseError
+
+        """
+        with transaction.atomic():
+            current = list(PeerReviewQueueEntry.objects.select_for_update().filter(id=self.id))
+            if not current:
+                return False
+            current = current[0]
+
+            items = PeerWorkflowItem.objects.filter(author_id=self.author_id).values_list(
+                'assessment_id', 'started_at'
+            )
+            completed_count, leased_count, lease_expires_at = self.summarize_items(items)
+            updated = PeerReviewQueueEntry.objects.filter(
+                id=self.id,
+                completed_count=current.completed_count,
+                leased_count=current.leased_count,
+                lease_expires_at=current.lease_expires_at,
+            ).update(
+                completed_count=completed_count,
+                leased_count=leased_count,
+                lease_expires_at=lease_expires_at,
+            )
+
+        if updated == 1:
+            self.completed_count, self.leased_count, self.lease_expires_at = (
+                completed_count, leased_count, lease_expires_at
+            )
+        return updated == 1
+
+    @staticmethod
+    def summarize_items(items):
+        """
+        Summarize an author's workflow items for the review queue.
+
+        Args:
+            items (iterable): `(assessment_id, started_at)` tuples for each
+                workflow item whose author is the queued workflow.
+
+        Returns:
+            tuple of (completed_count, leased_count, lease_expires_at)
+
+        """
+        timeout = now() - PeerWorkflow.TIME_LIMIT
+        completed_count = 0
+        open_leases = []
+        for assessment_id, started_at in items:
+            if assessment_id is not None:
+                completed_count += 1
+            elif started_at > timeout:
+                open_leases.append(started_at)
+
+        lease_expires_at = min(open_leases) + PeerWorkflow.TIME_LIMIT if open_leases else None
+        return completed_count, len(open_leases), lease_expires_at
+
+    def __repr__(self):
+        return (
+            "PeerReviewQueueEntry(author={0.author_id}, item_id={0.item_id}, "
+            "course_id={0.course_id}, completed_count={0.completed_count}, "
+            "leased_count={0.leased_count}, lease_expires_at={0.lease_expires_at})"
+        ).format(self)
+
+    def __unicode__(self):
+        return repr(self)
+
+
+def _supports_skip_locked(connection):
+    """
+    Check whether a database connection supports SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    if connection.vendor == 'postgresql':
+        return connection.pg_version >= 90500
+    if connection.vendor == 'mysql':
+        return connection.mysql_version >= (8, 0, 1)
+    return False
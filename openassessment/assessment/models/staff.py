@@ -1,6 +1,7 @@
 """
 Models for managing staff assessments.
 """
+from collections import defaultdict
 from datetime import timedelta
 
 from django.db import models, DatabaseError
@@ -9,6 +10,28 @@ from django.utils.timezone import now
 from openassessment.assessment.models.base import Assessment
 from openassessment.assessment.errors import StaffAssessmentInternalError
 
+import logging
+logger = logging.getLogger("openassessment.assessment.models")
+
+
+def _count_where(condition):
+    """
+    Aggregate that counts the rows matching a condition.
+
+    Args:
+        condition (Q): The condition to check for each row.
+
+    Returns:
+        Sum
+    """
+    return models.Sum(
+        models.Case(
+            models.When(condition, then=models.Value(1)),
+            default=models.Value(0),
+            output_field=models.IntegerField(),
+        )
+    )
+
 
 class StaffWorkflow(models.Model):
     """
@@ -26,6 +49,16 @@ class StaffWorkflow(models.Model):
     # Amount of time before a lease on a submission expires
     TIME_LIMIT = timedelta(hours=8)
 
+    # Amount of recent grading activity included in the per-scorer statistics
+    THROUGHPUT_WINDOW = timedelta(hours=1)
+
+    # Number of candidate workflows read from the head of the queue at once
+    CLAIM_BATCH_SIZE = 10
+
+    # Number of times to re-read the queue when other staff members
+    # claim every candidate before we do
+    MAX_CLAIM_ATTEMPTS = 3
+
     scorer_id = models.CharField(max_length=40, db_index=True)
     course_id = models.CharField(max_length=40, db_index=True)
     item_id = models.CharField(max_length=128, db_index=True)
@@ -55,6 +88,8 @@ class StaffWorkflow(models.Model):
         """
         Returns the number of graded, ungraded, and in-progress submissions for staff grading.
 
+        The three counts are computed with a single aggregate query.
+
         Args:
             course_id (str): The course that this problem belongs to
             item_id (str): The student_item (problem) that we want to know statistics about.
@@ -63,21 +98,71 @@ class StaffWorkflow(models.Model):
             dict: a dictionary that contains the following keys: 'graded', 'ungraded', and 'in-progress'
         """
         timeout = now() - cls.TIME_LIMIT
-        ungraded = cls.objects.filter(
-            models.Q(grading_started_at=None) | models.Q(grading_started_at__lte=timeout),
-            course_id=course_id, item_id=item_id, grading_completed_at=None, cancelled_at=None
-        ).count()
+        not_graded = models.Q(grading_completed_at=None)
+        counts = cls.objects.filter(
+            course_id=course_id, item_id=item_id, cancelled_at=None
+        ).aggregate(
+            ungraded=_count_where(
+                not_graded & (models.Q(grading_started_at=None) | models.Q(grading_started_at__lte=timeout))
+            ),
+            in_progress=_count_where(not_graded & models.Q(grading_started_at__gt=timeout)),
+            graded=_count_where(~not_graded),
+        )
 
-        in_progress = cls.objects.filter(
-            course_id=course_id, item_id=item_id, grading_completed_at=None, cancelled_at=None,
-            grading_started_at__gt=timeout
-        ).count()
+        # The sums are NULL when there are no workflows at all
+        return {
+            'ungraded': counts['ungraded'] or 0,
+            'in-progress': counts['in_progress'] or 0,
+            'graded': counts['graded'] or 0,
+        }
 
-        graded = cls.objects.filter(
-            course_id=course_id, item_id=item_id, cancelled_at=None
-        ).exclude(grading_completed_at=None).count()
+    @classmethod
+    def get_scorer_statistics(cls, course_id, item_id):
+        """
+        Returns how quickly each staff member has been grading submissions recently.
 
-        return {'ungraded': ungraded, 'in-progress': in_progress, 'graded': graded}
+        Only the workflows graded within the last `THROUGHPUT_WINDOW` are read,
+        so the cost of this query depends on the recent grading activity rather
+        than on the total number of submissions.
+
+        Args:
+            course_id (str): The course that this problem belongs to
+            item_id (str): The student_item (problem) that we want to know statistics about.
+
+        Returns:
+            list of dict, ordered by scorer ID, each with the keys:
+                'scorer_id' (str): The user id of the staff member.
+                'graded' (int): The number of submissions graded within the window.
+                'average_grading_time' (float or None): The average number of seconds
+                    between checking out and grading a submission, or None if no
+                    submissions were checked out before being graded.
+        """
+        since = now() - cls.THROUGHPUT_WINDOW
+        workflows = cls.objects.filter(
+            course_id=course_id, item_id=item_id, cancelled_at=None, grading_completed_at__gt=since
+        ).values_list('scorer_id', 'grading_started_at', 'grading_completed_at')
+
+        graded = defaultdict(int)
+        grading_times = defaultdict(list)
+        for scorer_id, grading_started_at, grading_completed_at in workflows:
+            graded[scorer_id] += 1
+            # Staff can grade a submission without checking it out first (overrides)
+            if grading_started_at is not None and grading_started_at <= grading_completed_at:
+                grading_times[scorer_id].append(
+                    (grading_completed_at - grading_started_at).total_seconds()
+                )
+
+        return [
+            {
+                'scorer_id': scorer_id,
+                'graded': graded[scorer_id],
+                'average_grading_time': (
+                    sum(grading_times[scorer_id]) / len(grading_times[scorer_id])
+                    if grading_times[scorer_id] else None
+                ),
+            }
+            for scorer_id in sorted(graded)
+        ]
 
     @classmethod
     def get_submission_for_review(cls, course_id, item_id, scorer_id):
@@ -86,50 +171,58 @@ class StaffWorkflow(models.Model):
         submission that requires assessment, excluding any submission that has been
         completely graded, or is actively being reviewed by other staff members.
 
+        Workflows are handed out oldest first.  Claiming a workflow is a
+        conditional update, so concurrent staff members are never given
+        the same submission.
+
         Args:
-            submission_uuid (str): The submission UUID from the student
-                requesting a submission for assessment. This is used to explicitly
-                avoid giving the student their own submission, and determines the
-                associated Peer Workflow.
+            course_id (str): The course that we would like to retrieve submissions for.
             item_id (str): The student_item that we would like to retrieve submissions for.
             scorer_id (str): The user id of the staff member scoring this submission
 
         Returns:
-            submission_uuid (str): The submission_uuid for the submission to review.
+            submission_uuid (str): The submission_uuid for the submission to review,
+                or None if no submission is available.
 
         Raises:
             StaffAssessmentInternalError: Raised when there is an error retrieving
                 the workflows for this request.
 
         """
-        timeout = now() - cls.TIME_LIMIT
+        current_time = now()
         try:
-            # Search for existing submissions that the scorer has worked on.
-            staff_workflows = StaffWorkflow.objects.filter(
+            # Search for existing submissions that the scorer has worked on,
+            # and renew the scorer's lease on the oldest one.
+            active_workflows = cls.objects.filter(
                 course_id=course_id,
                 item_id=item_id,
                 scorer_id=scorer_id,
                 grading_completed_at=None,
                 cancelled_at=None,
-            )
-            # If no existing submissions exist, then get any other
-            # available workflows.
-            if not staff_workflows:
-                staff_workflows = StaffWorkflow.objects.filter(
-                    models.Q(scorer_id='') | models.Q(grading_started_at__lte=timeout),
-                    course_id=course_id,
-                    item_id=item_id,
-                    grading_completed_at=None,
-                    cancelled_at=None,
-                )
-            if not staff_workflows:
-                return None
-
-            workflow = staff_workflows[0]
-            workflow.scorer_id = scorer_id
-            workflow.grading_started_at = now()
-            workflow.save()
-            return workflow.submission_uuid
+            ).order_by('created_at', 'id').values_list('id', 'submission_uuid')
+            for workflow_id, submission_uuid in active_workflows[:1]:
+                updated = cls.objects.filter(
+                    id=workflow_id, scorer_id=scorer_id
+                ).update(grading_started_at=current_time)
+                if updated:
+                    return submission_uuid
+
+            # If no existing submissions exist, then claim the oldest
+            # available workflow.
+            available_workflows = cls._available_workflows(current_time).filter(
+                course_id=course_id, item_id=item_id
+            ).order_by('created_at', 'id').values_list('id', 'submission_uuid')
+            for __ in range(cls.MAX_CLAIM_ATTEMPTS):
+                candidates = list(available_workflows[:cls.CLAIM_BATCH_SIZE])
+                if not candidates:
+                    return None
+
+                # Another staff member may claim a candidate after we read it,
+                # in which case we move on to the next one.
+                for workflow_id, submission_uuid in candidates:
+                    if cls._claim(workflow_id, scorer_id, current_time):
+                        return submission_uuid
+            return None
         except DatabaseError:
             error_message = (
                 u"An internal error occurred while retrieving a submission for staff grading"
@@ -137,6 +230,51 @@ class StaffWorkflow(models.Model):
             logger.exception(error_message)
             raise StaffAssessmentInternalError(error_message)
 
+    @classmethod
+    def _available_workflows(cls, current_time):
+        """
+        Build the query for the workflows that no staff member is actively grading.
+
+        Args:
+            current_time (datetime): The time to check leases against.
+
+        Returns:
+            QuerySet of StaffWorkflow
+
+        """
+        timeout = current_time - cls.TIME_LIMIT
+        return cls.objects.filter(
+            models.Q(scorer_id='') | models.Q(grading_started_at__lte=timeout),
+            grading_completed_at=None,
+            cancelled_at=None,
+        )
+
+    @classmethod
+    def _claim(cls, workflow_id, scorer_id, current_time):
+        """
+        Assign a workflow to a staff member, if it is still available.
+
+        The check and the assignment are a single conditional UPDATE, so
+        two staff members can never both claim the same workflow, even
+        when they read the same candidates from the queue.
+
+        Args:
+            workflow_id (int): The ID of the workflow to claim.
+            scorer_id (str): The user id of the staff member scoring this submission.
+            current_time (datetime): The time the lease starts.
+
+        Returns:
+            bool: True if the workflow was claimed.
+
+        Raises:
+            DatabaseError
+
+        """
+        updated = cls._available_workflows(current_time).filter(id=workflow_id).update(
+            scorer_id=scorer_id, grading_started_at=current_time
+        )
+        return updated == 1
+
     def close_active_assessment(self, assessment, scorer_id):
         """
         Assign assessment to workflow, and mark the grading as complete.
@@ -3,7 +3,7 @@ Django models specific to the student training assessment type.
 """
 from django.db import models, transaction, IntegrityError
 from django.utils import timezone
-from submissions import api as sub_api
+from openassessment import cached_sub_api
 from .training import TrainingExample
 
 
@@ -43,7 +43,7 @@ class StudentTrainingWorkflow(models.Model):
 
         """
         # Retrieve the student item info
-        submission = sub_api.get_submission_and_student(submission_uuid)
+        submission = cached_sub_api.get_submission_and_student(submission_uuid)
         student_item = submission['student_item']
 
         # Create the workflow
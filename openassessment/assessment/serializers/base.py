@@ -6,15 +6,21 @@ from copy import deepcopy
 import logging
 
 from django.core.cache import cache
+from django.db.models import Prefetch
+from django.db.models.query import prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.fields import IntegerField, DateTimeField
+from openassessment import request_cache
 from openassessment.assessment.models import (
-    Assessment, AssessmentPart, Criterion, CriterionOption, Rubric,
+    Assessment, AssessmentPart, Criterion, CriterionOption, Rubric, RUBRIC_REGISTRY,
 )
 
 
 logger = logging.getLogger(__name__)
 
+# Name of the request cache holding serialized assessments
+FULL_ASSESSMENT_DICT_CACHE = "assessment.full_assessment_dict"
+
 
 class InvalidRubric(Exception):
     """This can be raised during the deserialization process."""
@@ -161,18 +167,55 @@ class AssessmentSerializer(serializers.ModelSerializer):
 
 
 def serialize_assessments(assessments_qset):
-    assessments = list(assessments_qset.select_related("rubric"))
-    rubric_cache = {}
+    """
+    Serialize a set of assessments, as `full_assessment_dict` does for each one.
 
-    return [
-        full_assessment_dict(
-            assessment,
-            RubricSerializer.serialized_from_cache(
-                assessment.rubric, rubric_cache
-            )
-        )
-        for assessment in assessments
+    The serialized assessments are looked up in the cache all at once, and the
+    parts of any assessments that are not cached are loaded with a single query.
+    Serialized assessments are also kept for the rest of the current request,
+    and callers receive their own copy, so they can modify it.
+
+    Args:
+        assessments_qset (QuerySet): The assessments to serialize.
+
+    Returns:
+        list of dicts, in the same order as the assessments.
+    """
+    assessments = list(assessments_qset.select_related("rubric"))
+    cache_keys = [_full_assessment_dict_cache_key(assessment) for assessment in assessments]
+
+    # Check the request cache, then the external cache (e.g. memcached)
+    local_cache = request_cache.get_cache(FULL_ASSESSMENT_DICT_CACHE)
+    if local_cache is None:
+        local_cache = {}
+    assessment_dicts = {
+        cache_key: local_cache[cache_key]
+        for cache_key in cache_keys if cache_key in local_cache
+    }
+    missing_keys = [cache_key for cache_key in cache_keys if cache_key not in assessment_dicts]
+    if missing_keys:
+        assessment_dicts.update(cache.get_many(missing_keys))
+
+    # Serialize the rest from the database
+    missing = [
+        assessment for cache_key, assessment in zip(cache_keys, assessments)
+        if not assessment_dicts.get(cache_key)
     ]
+    if missing:
+        _prefetch_parts(missing)
+        rubric_cache = {}
+        serialized = {
+            _full_assessment_dict_cache_key(assessment): _build_full_assessment_dict(
+                assessment,
+                RubricSerializer.serialized_from_cache(assessment.rubric, rubric_cache)
+            )
+            for assessment in missing
+        }
+        cache.set_many(serialized)
+        assessment_dicts.update(serialized)
+
+    local_cache.update(assessment_dicts)
+    return deepcopy([assessment_dicts[cache_key] for cache_key in cache_keys])
 
 
 def full_assessment_dict(assessment, rubric_dict=None):
@@ -184,23 +227,78 @@ def full_assessment_dict(assessment, rubric_dict=None):
     follow all the DB relations from assessment -> assessment part -> option ->
     criterion.
 
+    Serialized assessments are kept for the rest of the current request,
+    and callers receive their own copy, so they can modify it.
+
     Args:
         assessment (Assessment): The Assessment model to serialize
 
     Returns:
         dict with keys 'rubric' (serialized Rubric model) and 'parts' (serialized assessment parts)
     """
-    assessment_cache_key = "assessment.full_assessment_dict.{}.{}.{}".format(
-        assessment.id, assessment.submission_uuid, assessment.scored_at.isoformat()
-    )
-    assessment_dict = cache.get(assessment_cache_key)
+    assessment_cache_key = _full_assessment_dict_cache_key(assessment)
+    local_cache = request_cache.get_cache(FULL_ASSESSMENT_DICT_CACHE)
+    if local_cache is None:
+        local_cache = {}
+    assessment_dict = local_cache.get(assessment_cache_key) or cache.get(assessment_cache_key)
     if assessment_dict:
-        return assessment_dict
+        local_cache[assessment_cache_key] = assessment_dict
+        return deepcopy(assessment_dict)
 
-    assessment_dict = AssessmentSerializer(assessment).data
     if not rubric_dict:
         rubric_dict = RubricSerializer.serialized_from_cache(assessment.rubric)
 
+    _prefetch_parts([assessment])
+    assessment_dict = _build_full_assessment_dict(assessment, rubric_dict)
+    cache.set(assessment_cache_key, assessment_dict)
+    local_cache[assessment_cache_key] = assessment_dict
+
+    return deepcopy(assessment_dict)
+
+
+def _full_assessment_dict_cache_key(assessment):
+    """
+    Return the cache key for the serialized form of an assessment.
+
+    Args:
+        assessment (Assessment): The assessment.
+
+    Returns:
+        str
+    """
+    return "assessment.full_assessment_dict.{}.{}.{}".format(
+        assessment.id, assessment.submission_uuid, assessment.scored_at.isoformat()
+    )
+
+
+def _prefetch_parts(assessments):
+    """
+    Load the parts of assessments, with their criteria and options, in a single query.
+
+    Args:
+        assessments (list of Assessment): The assessments to load parts for.
+
+    Returns:
+        None
+    """
+    prefetch_related_objects(assessments, [
+        Prefetch("parts", queryset=AssessmentPart.objects.select_related("criterion", "option"))
+    ])
+
+
+def _build_full_assessment_dict(assessment, rubric_dict):
+    """
+    Serialize an assessment (see `full_assessment_dict`) without using the cache.
+
+    Args:
+        assessment (Assessment): The Assessment model to serialize, with its parts
+            already loaded (see `_prefetch_parts`).
+        rubric_dict (dict): The serialized rubric of the assessment.
+
+    Returns:
+        dict
+    """
+    assessment_dict = AssessmentSerializer(assessment).data
     assessment_dict["rubric"] = rubric_dict
 
     # This part looks a little goofy, but it's in the name of saving dozens of
@@ -211,7 +309,7 @@ def full_assessment_dict(assessment, rubric_dict=None):
     # `CriterionOption` again, we simply index into the places we expect them to
     # be from the big, saved `Rubric` serialization.
     parts = []
-    for part in assessment.parts.all().select_related("criterion", "option"):
+    for part in assessment.parts.all():
         criterion_dict = rubric_dict["criteria"][part.criterion.order_num]
         options_dict = None
         if part.option is not None:
@@ -234,12 +332,10 @@ def full_assessment_dict(assessment, rubric_dict=None):
     assessment_dict["points_possible"] = rubric_dict["points_possible"]
     assessment_dict["id"] = assessment.id
 
-    cache.set(assessment_cache_key, assessment_dict)
-
     return assessment_dict
 
 
-def rubric_from_dict(rubric_dict):
+def rubric_from_dict(rubric_dict, rubric_hashes=None):
     """Given a dict of rubric information, return the corresponding Rubric
 
     This will create the Rubric and its children if it does not exist already.
@@ -271,17 +367,40 @@ def rubric_from_dict(rubric_dict):
           ]
         }
 
-    """
-    rubric_dict = deepcopy(rubric_dict)
+    Rubrics that already exist are kept in a process-local registry
+    (see `RubricRegistry`), so repeated calls with the same rubric
+    don't query the database.
+
+    Args:
+        rubric_dict (dict): The serialized rubric.
+
+    Keyword Arguments:
+        rubric_hashes (tuple): The `(content_hash, structure_hash)` of the
+            rubric, if the caller has already calculated them (see
+            `Rubric.hashes_from_dict`).  Otherwise they are calculated here.
+
+    Returns:
+        Rubric
 
+    Raises:
+        InvalidRubric
+
+    """
     # Calculate the hash based on the rubric content...
-    content_hash = Rubric.content_hash_from_dict(rubric_dict)
+    if rubric_hashes is None:
+        rubric_hashes = Rubric.hashes_from_dict(rubric_dict)
+    content_hash, structure_hash = rubric_hashes
+    rubric = RUBRIC_REGISTRY.get(content_hash)
+    if rubric is not None:
+        return rubric
 
     try:
         rubric = Rubric.objects.get(content_hash=content_hash)
+        RUBRIC_REGISTRY.add(rubric)
     except Rubric.DoesNotExist:
+        rubric_dict = deepcopy(rubric_dict)
         rubric_dict["content_hash"] = content_hash
-        rubric_dict["structure_hash"] = Rubric.structure_hash_from_dict(rubric_dict)
+        rubric_dict["structure_hash"] = structure_hash
         for crit_idx, criterion in enumerate(rubric_dict.get("criteria", {})):
             if "order_num" not in criterion:
                 criterion["order_num"] = crit_idx
@@ -9,3 +9,7 @@ import django.dispatch
 # You can fire this signal from asynchronous processes (such as AI grading)
 # to notify receivers that an assessment is available.
 assessment_complete_signal = django.dispatch.Signal(providing_args=['submission_uuid'])    # pylint: disable=C0103
+
+# Indicate that an assessment API has recorded something that may change
+# the workflow status of these submissions (for example, a new assessment).
+assessment_changed_signal = django.dispatch.Signal(providing_args=['submission_uuids'])    # pylint: disable=C0103
@@ -133,6 +133,93 @@ class AssessmentTest(CacheResetTest):
         with self.assertRaises(InvalidRubricSelection):
             AssessmentPart.create_from_option_names(assessment, selected, feedback=feedback)
 
+    def test_scores_by_criterion(self):
+        rubric = self._rubric_with_one_feedback_only_criterion()
+        assessments = []
+        for scorer_id, option in ((u"Bob", u"𝒑𝒐𝒐𝒓"), (u"Sue", u"𝓰𝓸𝓸𝓭"), (u"Tim", u"єχ¢єℓℓєηт")):
+            assessment = Assessment.create(rubric, scorer_id, "submission UUID", "PE")
+            AssessmentPart.create_from_option_names(
+                assessment,
+                {u"vøȼȺƀᵾłȺɍɏ": option, u"ﻭɼค๓๓คɼ": u"єχ¢єℓℓєηт"},
+                feedback={u"feedback": u"𝕿𝖍𝖎𝖘 𝖎𝖘 𝖘𝖔𝖒𝖊 𝖋𝖊𝖊𝖉𝖇𝖆𝖈𝖐."}
+            )
+            assessments.append(assessment)
+
+        # All the parts are loaded with a single query, then cached
+        with self.assertNumQueries(1):
+            scores = Assessment.scores_by_criterion(assessments)
+        with self.assertNumQueries(0):
+            self.assertEqual(Assessment.scores_by_criterion(assessments), scores)
+
+        self.assertEqual(scores[u"vøȼȺƀᵾłȺɍɏ"], [0, 1, 2])
+        self.assertEqual(scores[u"ﻭɼค๓๓คɼ"], [2, 2, 2])
+        self.assertEqual(scores[u"feedback"], [0, 0, 0])
+        self.assertEqual(
+            Assessment.get_median_score_dict(scores),
+            {u"vøȼȺƀᵾłȺɍɏ": 1, u"ﻭɼค๓๓คɼ": 2, u"feedback": 0}
+        )
+        self.assertEqual(Assessment.scores_by_criterion([]), {})
+
+    def test_create_many_from_option_names(self):
+        rubric = self._rubric_with_one_feedback_only_criterion()
+        selections = [
+            (
+                Assessment.create(rubric, scorer_id, "submission UUID", "PE"),
+                {u"vøȼȺƀᵾłȺɍɏ": option, u"ﻭɼค๓๓คɼ": u"𝒑𝒐𝒐𝒓"},
+                {u"feedback": u"𝕿𝖍𝖎𝖘 𝖎𝖘 𝖘𝖔𝖒𝖊 𝖋𝖊𝖊𝖉𝖇𝖆𝖈𝖐."},
+            )
+            for scorer_id, option in ((u"Bob", u"𝓰𝓸𝓸𝓭"), (u"Sue", u"єχ¢єℓℓєηт"))
+        ]
+        rubric.index  # pylint: disable=pointless-statement
+
+        # All the parts are written at once
+        with self.assertNumQueries(3):
+            parts = AssessmentPart.create_many_from_option_names(rubric, selections)
+        self.assertEqual(len(parts), 6)
+
+        self.assertEqual(selections[0][0].points_earned, 1)
+        self.assertEqual(selections[1][0].points_earned, 2)
+        self.assertEqual(selections[1][0].parts.get(criterion__name=u"feedback").feedback, u"𝕿𝖍𝖎𝖘 𝖎𝖘 𝖘𝖔𝖒𝖊 𝖋𝖊𝖊𝖉𝖇𝖆𝖈𝖐.")
+
+    def test_create_many_from_option_names_invalid_selection(self):
+        rubric = self._rubric_with_one_feedback_only_criterion()
+        valid = (
+            Assessment.create(rubric, u"Bob", "submission UUID", "PE"),
+            {u"vøȼȺƀᵾłȺɍɏ": u"𝓰𝓸𝓸𝓭", u"ﻭɼค๓๓คɼ": u"𝒑𝒐𝒐𝒓"},
+            None,
+        )
+        invalid = (
+            Assessment.create(rubric, u"Sue", "submission UUID", "PE"),
+            {u"vøȼȺƀᵾłȺɍɏ": u"𝓰𝓸𝓸𝓭", u"ﻭɼค๓๓คɼ": u"not an option"},
+            None,
+        )
+
+        # Nothing is written unless every selection is valid
+        with self.assertRaises(InvalidRubricSelection):
+            AssessmentPart.create_many_from_option_names(rubric, [valid, invalid])
+        self.assertFalse(AssessmentPart.objects.exists())
+
+        # Every assessment must have been made with the rubric
+        other_rubric = self._rubric_with_all_feedback_only_criteria()
+        with self.assertRaises(InvalidRubricSelection):
+            AssessmentPart.create_many_from_option_names(other_rubric, [valid])
+
+    def test_create_many_from_option_points(self):
+        rubric = self._rubric_with_one_feedback_only_criterion()
+        selections = [
+            (
+                Assessment.create(rubric, scorer_id, "submission UUID", "AI"),
+                {u"vøȼȺƀᵾłȺɍɏ": points, u"ﻭɼค๓๓คɼ": 0},
+            )
+            for scorer_id, points in ((u"Bob", 1), (u"Sue", 2))
+        ]
+        parts = AssessmentPart.create_many_from_option_points(rubric, selections)
+
+        # Feedback-only criteria get a part with no option
+        self.assertEqual(len(parts), 6)
+        self.assertEqual(selections[0][0].points_earned, 1)
+        self.assertEqual(selections[1][0].points_earned, 2)
+
     def _rubric_with_one_feedback_only_criterion(self):
         """Create a rubric with one feedback-only criterion."""
         rubric_dict = copy.deepcopy(RUBRIC)
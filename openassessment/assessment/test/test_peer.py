@@ -3,7 +3,9 @@ import datetime
 import pytz
 import copy
 
-from django.db import DatabaseError, IntegrityError
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from ddt import ddt, file_data
 from mock import Mock, patch
@@ -13,7 +15,7 @@ from openassessment.test_utils import CacheResetTest
 from openassessment.assessment.api import peer as peer_api
 from openassessment.assessment.models import (
     Assessment, AssessmentPart, AssessmentFeedback, AssessmentFeedbackOption,
-    PeerWorkflow, PeerWorkflowItem
+    PeerWorkflow, PeerWorkflowItem, PeerReviewQueueEntry
 )
 from openassessment.workflow import api as workflow_api
 from submissions import api as sub_api
@@ -159,7 +161,7 @@ class TestPeerApi(CacheResetTest):
     Tests for the peer assessment API functions.
     """
 
-    CREATE_ASSESSMENT_NUM_QUERIES = 54
+    CREATE_ASSESSMENT_NUM_QUERIES = 46
 
     def setUp(self):
         super(TestPeerApi, self).setUp()
@@ -910,6 +912,40 @@ class TestPeerApi(CacheResetTest):
         item = buffy_workflow.find_active_assessments()
         self.assertIsNone(item)
 
+    def test_find_active_assessments_skips_closed_items(self):
+        buffy_answer, _ = self._create_student_and_submission("Buffy", "Buffy's answer")
+        xander_answer, _ = self._create_student_and_submission("Xander", "Xander's answer")
+        willow_answer, _ = self._create_student_and_submission("Willow", "Willow's answer")
+        buffy_workflow = PeerWorkflow.get_by_submission_uuid(buffy_answer['uuid'])
+        xander_workflow = PeerWorkflow.get_by_submission_uuid(xander_answer['uuid'])
+
+        # Buffy assesses Xander, then ends up with a second open item for him
+        PeerWorkflow.create_item(buffy_workflow, xander_answer["uuid"])
+        peer_api.create_assessment(
+            buffy_answer['uuid'], "Buffy",
+            ASSESSMENT_DICT['options_selected'],
+            ASSESSMENT_DICT['criterion_feedback'],
+            ASSESSMENT_DICT['overall_feedback'],
+            RUBRIC_DICT,
+            REQUIRED_GRADED_BY,
+        )
+        PeerWorkflowItem.objects.create(
+            scorer=buffy_workflow, author=xander_workflow, submission_uuid=xander_answer["uuid"]
+        )
+
+        # Buffy's lease on Willow's submission has expired
+        willow_item = PeerWorkflow.create_item(buffy_workflow, willow_answer["uuid"])
+        willow_item.started_at = timezone.now() - PeerWorkflow.TIME_LIMIT - datetime.timedelta(minutes=1)
+        willow_item.save()
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(buffy_workflow.find_active_assessments())
+
+        # Renewing the lease makes Willow's submission active again
+        PeerWorkflow.create_item(buffy_workflow, willow_answer["uuid"])
+        with self.assertNumQueries(1):
+            self.assertEqual(buffy_workflow.find_active_assessments(), willow_item)
+
     def test_submission_cancelled_while_being_assessed(self):
         # Test that if student pulls the submission for review and the
         # submission is cancelled their assessment will not be accepted.
@@ -1042,6 +1078,25 @@ class TestPeerApi(CacheResetTest):
         if not (buffy_answer["uuid"] == submission_uuid or willow_answer["uuid"] == submission_uuid):
             self.fail("Submission was not Buffy or Willow's.")
 
+    def test_get_submission_for_over_grading_wraps_around(self):
+        buffy_answer, _ = self._create_student_and_submission("Buffy", "Buffy's answer")
+        xander_answer, _ = self._create_student_and_submission("Xander", "Xander's answer")
+        willow_answer, _ = self._create_student_and_submission("Willow", "Willow's answer")
+        PeerWorkflow.objects.filter(submission_uuid=buffy_answer['uuid']).update(random_key=0.2)
+        PeerWorkflow.objects.filter(submission_uuid=willow_answer['uuid']).update(random_key=0.6)
+        xander_workflow = PeerWorkflow.get_by_submission_uuid(xander_answer['uuid'])
+
+        random_key_path = 'openassessment.assessment.models.peer._random_key'
+        with patch(random_key_path, Mock(return_value=0.5)):
+            self.assertEqual(xander_workflow.get_submission_for_over_grading(), willow_answer['uuid'])
+        with patch(random_key_path, Mock(return_value=0.9)):
+            self.assertEqual(xander_workflow.get_submission_for_over_grading(), buffy_answer['uuid'])
+
+        # Once Xander has scored Buffy, only Willow is left
+        PeerWorkflow.create_item(xander_workflow, buffy_answer['uuid'])
+        with patch(random_key_path, Mock(return_value=0.1)):
+            self.assertEqual(xander_workflow.get_submission_for_over_grading(), willow_answer['uuid'])
+
     def test_create_feedback_on_an_assessment(self):
         tim_sub, tim = self._create_student_and_submission("Tim", "Tim's answer")
         bob_sub, bob = self._create_student_and_submission("Bob", "Bob's answer")
@@ -1133,7 +1188,7 @@ class TestPeerApi(CacheResetTest):
         submitted_assessments = peer_api.get_submitted_assessments(bob_sub["uuid"])
         self.assertEqual(1, len(submitted_assessments))
 
-    @patch.object(PeerWorkflow.objects, 'raw')
+    @patch.object(PeerReviewQueueEntry.objects, 'filter')
     @raises(peer_api.PeerAssessmentInternalError)
     def test_failure_to_get_review_submission(self, mock_filter):
         tim_answer, _ = self._create_student_and_submission("Tim", "Tim's answer", MONDAY)
@@ -1469,7 +1524,7 @@ class TestPeerApi(CacheResetTest):
         tim_sub, tim = self._create_student_and_submission('Tim', 'Tim submission')
 
         # Bob assesses someone else, satisfying his requirements
-        peer_api.get_submission_to_assess(bob_sub['uuid'], bob['student_id'])
+        peer_api.get_submission_to_assess(bob_sub['uuid'], required_graded_by)
         peer_api.create_assessment(
             bob_sub['uuid'],
             bob['student_id'],
@@ -1481,7 +1536,7 @@ class TestPeerApi(CacheResetTest):
         )
 
         # Tim grades Bob, so now Bob has one assessment with a good grade
-        peer_api.get_submission_to_assess(tim_sub['uuid'], tim['student_id'])
+        peer_api.get_submission_to_assess(tim_sub['uuid'], required_graded_by)
         peer_api.create_assessment(
             tim_sub['uuid'],
             tim['student_id'],
@@ -1503,7 +1558,7 @@ class TestPeerApi(CacheResetTest):
         sue_sub, sue = self._create_student_and_submission('Sue', 'Sue submission')
 
         # Sue grades the only person in the queue, who is Tim because Tim still needs an assessment
-        peer_api.get_submission_to_assess(sue_sub['uuid'], sue['student_id'])
+        peer_api.get_submission_to_assess(sue_sub['uuid'], required_graded_by)
         peer_api.create_assessment(
             sue_sub['uuid'],
             sue['student_id'],
@@ -1515,7 +1570,7 @@ class TestPeerApi(CacheResetTest):
         )
 
         # Sue grades the only person she hasn't graded yet (Bob), with a failing grade
-        peer_api.get_submission_to_assess(sue_sub['uuid'], sue['student_id'])
+        peer_api.get_submission_to_assess(sue_sub['uuid'], required_graded_by)
         peer_api.create_assessment(
             sue_sub['uuid'],
             sue['student_id'],
@@ -1533,6 +1588,173 @@ class TestPeerApi(CacheResetTest):
         # Verify that only the first assessment was used to generate the score
         self.assertEqual(score['points_earned'], 14)
 
+    def test_get_score_num_queries(self):
+        tim_sub, tim = self._create_student_and_submission("Tim", "Tim's answer")
+        for name in ("Bob", "Sally", "Jim"):
+            scorer_sub, scorer = self._create_student_and_submission(name, name + "'s answer")
+            peer_api.create_peer_workflow_item(scorer_sub['uuid'], tim_sub['uuid'])
+            peer_api.create_assessment(
+                scorer_sub['uuid'],
+                scorer['student_id'],
+                ASSESSMENT_DICT['options_selected'],
+                ASSESSMENT_DICT['criterion_feedback'],
+                ASSESSMENT_DICT['overall_feedback'],
+                RUBRIC_DICT,
+                1
+            )
+        peer_api.get_submission_to_assess(tim_sub['uuid'], 1)
+        peer_api.create_assessment(
+            tim_sub['uuid'],
+            tim['student_id'],
+            ASSESSMENT_DICT['options_selected'],
+            ASSESSMENT_DICT['criterion_feedback'],
+            ASSESSMENT_DICT['overall_feedback'],
+            RUBRIC_DICT,
+            1
+        )
+
+        # The first call also records that Tim finished grading peers
+        tim_scored = PeerWorkflowItem.objects.filter(submission_uuid=tim_sub['uuid'], scored=True)
+        peer_api.get_score(tim_sub['uuid'], {'must_grade': 1, 'must_be_graded_by': 1})
+        self.assertEqual(tim_scored.count(), 1)
+
+        # The number of queries doesn't depend on the number of required grades
+        PeerWorkflowItem.objects.update(scored=False)
+        cache.clear()
+        with CaptureQueriesContext(connection) as one_grader:
+            peer_api.get_score(tim_sub['uuid'], {'must_grade': 1, 'must_be_graded_by': 1})
+
+        PeerWorkflowItem.objects.update(scored=False)
+        cache.clear()
+        with CaptureQueriesContext(connection) as three_graders:
+            score = peer_api.get_score(tim_sub['uuid'], {'must_grade': 1, 'must_be_graded_by': 3})
+        self.assertEqual(len(three_graders), len(one_grader))
+        self.assertEqual(tim_scored.count(), 3)
+        self.assertEqual(score['points_earned'], 6)
+        self.assertEqual(score['points_possible'], 14)
+        self.assertEqual(len(score['contributing_assessments']), 3)
+
+    def test_median_scores_materialized(self):
+        tim_sub, tim = self._create_student_and_submission("Tim", "Tim's answer")
+        bob_sub, bob = self._create_student_and_submission("Bob", "Bob's answer")
+        sally_sub, sally = self._create_student_and_submission("Sally", "Sally's answer")
+        self._assess_peer(tim_sub, tim, bob_sub)
+        self._assess_peer(bob_sub, bob, tim_sub)
+        self._assess_peer(sally_sub, sally, tim_sub)
+
+        # Finalizing the score stores the median scores
+        score = peer_api.get_score(tim_sub['uuid'], {'must_grade': 1, 'must_be_graded_by': 1})
+        with self.assertNumQueries(0):
+            median_scores = peer_api.get_assessment_median_scores(tim_sub['uuid'])
+        self.assertEqual(sum(median_scores.values()), score['points_earned'])
+
+        # They are only recalculated when more assessments count towards the score
+        with patch.object(Assessment, 'scores_by_criterion') as mock_scores:
+            peer_api.get_score(tim_sub['uuid'], {'must_grade': 1, 'must_be_graded_by': 1})
+            self.assertFalse(mock_scores.called)
+
+        score = peer_api.get_score(tim_sub['uuid'], {'must_grade': 1, 'must_be_graded_by': 2})
+        self.assertEqual(len(score['contributing_assessments']), 2)
+        with self.assertNumQueries(0):
+            median_scores = peer_api.get_assessment_median_scores(tim_sub['uuid'])
+        self.assertEqual(sum(median_scores.values()), score['points_earned'])
+
+        # Without a cached value, the median scores are calculated from the database
+        cache.clear()
+        self.assertEqual(peer_api.get_assessment_median_scores(tim_sub['uuid']), median_scores)
+
+    def test_median_scores_cache(self):
+        tim_sub, tim = self._create_student_and_submission("Tim", "Tim's answer")
+        bob_sub, bob = self._create_student_and_submission("Bob", "Bob's answer")
+        sally_sub, sally = self._create_student_and_submission("Sally", "Sally's answer")
+        self._assess_peer(tim_sub, tim, bob_sub)
+        self._assess_peer(bob_sub, bob, tim_sub)
+        cache_key = peer_api._median_scores_cache_key(tim_sub['uuid'])  # pylint: disable=protected-access
+
+        # Before the score is finalized, there are no median scores to keep
+        self.assertEqual(peer_api.get_assessment_median_scores(tim_sub['uuid']), {})
+        self.assertIsNone(cache.get(cache_key))
+
+        # Once finalized, the median scores are kept without expiring
+        with patch('openassessment.assessment.api.peer.cache', wraps=cache) as mock_cache:
+            score = peer_api.get_score(tim_sub['uuid'], {'must_grade': 1, 'must_be_graded_by': 1})
+            self.assertEqual(mock_cache.set.call_args[1]['timeout'], None)
+        self.assertEqual(sum(peer_api.get_assessment_median_scores(tim_sub['uuid']).values()), score['points_earned'])
+
+        # A new assessment discards them
+        self._assess_peer(sally_sub, sally, tim_sub)
+        self.assertIsNone(cache.get(cache_key))
+        self.assertEqual(sum(peer_api.get_assessment_median_scores(tim_sub['uuid']).values()), score['points_earned'])
+
+    def _assess_peer(self, scorer_sub, scorer, submission):
+        peer_api.create_peer_workflow_item(scorer_sub['uuid'], submission['uuid'])
+        return peer_api.create_assessment(
+            scorer_sub['uuid'],
+            scorer['student_id'],
+            ASSESSMENT_DICT['options_selected'],
+            ASSESSMENT_DICT['criterion_feedback'],
+            ASSESSMENT_DICT['overall_feedback'],
+            RUBRIC_DICT,
+            1
+        )
+
+    def test_get_submission_summary(self):
+        tim_sub, tim = self._create_student_and_submission("Tim", "Tim's answer")
+        bob_sub, bob = self._create_student_and_submission("Bob", "Bob's answer")
+        sally_sub, sally = self._create_student_and_submission("Sally", "Sally's answer")
+        jim_sub, jim = self._create_student_and_submission("Jim", "Jim's answer")
+        self._assess_peer(bob_sub, bob, tim_sub)
+        self._assess_peer(tim_sub, tim, bob_sub)
+
+        # The first call also records that Tim finished grading peers
+        requirements = {'must_grade': 1, 'must_be_graded_by': 1}
+        peer_api.get_submission_summary(tim_sub['uuid'], requirements)
+        PeerWorkflowItem.objects.update(scored=False)
+        cache.clear()
+        with CaptureQueriesContext(connection) as few_assessments:
+            summary = peer_api.get_submission_summary(tim_sub['uuid'], requirements)
+
+        def _ids(assessments):
+            return [assessment['id'] for assessment in assessments]
+
+        self.assertEqual(_ids(summary['assessments']), _ids(peer_api.get_assessments(tim_sub['uuid'])))
+        self.assertEqual(
+            _ids(summary['submitted_assessments']),
+            _ids(peer_api.get_submitted_assessments(tim_sub['uuid']))
+        )
+        self.assertEqual(summary['score'], peer_api.get_score(tim_sub['uuid'], requirements))
+        self.assertEqual(summary['max_scores'], peer_api.get_rubric_max_scores(tim_sub['uuid']))
+        self.assertEqual(summary['scored_assessment_ids'], [summary['assessments'][0]['id']])
+
+        # The number of queries doesn't depend on the number of assessments
+        self._assess_peer(sally_sub, sally, tim_sub)
+        self._assess_peer(jim_sub, jim, tim_sub)
+        self._assess_peer(tim_sub, tim, sally_sub)
+        self._assess_peer(tim_sub, tim, jim_sub)
+        PeerWorkflowItem.objects.update(scored=False)
+        cache.clear()
+        with CaptureQueriesContext(connection) as more_assessments:
+            summary = peer_api.get_submission_summary(tim_sub['uuid'], requirements)
+        self.assertEqual(len(more_assessments), len(few_assessments))
+        self.assertEqual(len(summary['assessments']), 3)
+        self.assertEqual(len(summary['submitted_assessments']), 3)
+        self.assertEqual(
+            [assessment['scorer_id'] for assessment in summary['submitted_assessments']],
+            [u"Tim"] * 3
+        )
+
+        # Without requirements, the score is not calculated
+        summary = peer_api.get_submission_summary(tim_sub['uuid'])
+        self.assertIs(summary['score'], None)
+        self.assertEqual(len(summary['scored_assessment_ids']), 1)
+
+    @patch.object(PeerWorkflowItem.objects, 'filter')
+    @raises(peer_api.PeerAssessmentInternalError)
+    def test_get_submission_summary_database_error(self, mock_filter):
+        mock_filter.side_effect = DatabaseError("Bad things happened")
+        submission, __ = self._create_student_and_submission("Tim", "Tim's answer")
+        peer_api.get_submission_summary(submission['uuid'])
+
     @raises(peer_api.PeerAssessmentInternalError)
     def test_create_assessment_database_error(self):
         self._create_student_and_submission("Bob", "Bob's answer")
@@ -1622,6 +1844,166 @@ class PeerWorkflowTest(CacheResetTest):
         PeerWorkflow.create_item(scorer_workflow, submitter_sub['uuid'])
 
 
+class PeerReviewQueueTest(CacheResetTest):
+    """
+    Tests for the denormalized peer review queue.
+    """
+
+    def setUp(self):
+        super(PeerReviewQueueTest, self).setUp()
+        self.tim_sub, self.tim = TestPeerApi._create_student_and_submission("Tim", "Tim's answer")
+        self.bob_sub, self.bob = TestPeerApi._create_student_and_submission("Bob", "Bob's answer")
+
+    def _entry(self, submission):
+        return PeerReviewQueueEntry.objects.get(submission_uuid=submission['uuid'])
+
+    def _assess(self, scorer_sub, scorer, num_required_grades):
+        peer_api.create_assessment(
+            scorer_sub['uuid'], scorer['student_id'],
+            ASSESSMENT_DICT['options_selected'],
+            ASSESSMENT_DICT['criterion_feedback'],
+            ASSESSMENT_DICT['overall_feedback'],
+            RUBRIC_DICT,
+            num_required_grades,
+        )
+
+    def test_enqueued_on_start(self):
+        entry = self._entry(self.bob_sub)
+        self.assertEqual(entry.student_id, "Bob")
+        self.assertEqual(entry.course_id, STUDENT_ITEM['course_id'])
+        self.assertEqual(entry.item_id, STUDENT_ITEM['item_id'])
+        self.assertEqual(entry.completed_count, 0)
+        self.assertEqual(entry.leased_count, 0)
+        self.assertIsNone(entry.lease_expires_at)
+
+    def test_lease_and_close_update_counts(self):
+        sub = peer_api.get_submission_to_assess(self.tim_sub['uuid'], 2)
+        self.assertEqual(sub['uuid'], self.bob_sub['uuid'])
+        entry = self._entry(self.bob_sub)
+        self.assertEqual(entry.completed_count, 0)
+        self.assertEqual(entry.leased_count, 1)
+        self.assertIsNotNone(entry.lease_expires_at)
+
+        self._assess(self.tim_sub, self.tim, 2)
+        entry = self._entry(self.bob_sub)
+        self.assertEqual(entry.completed_count, 1)
+        self.assertEqual(entry.leased_count, 0)
+        self.assertIsNone(entry.lease_expires_at)
+
+    def test_fully_graded_removed_from_queue(self):
+        peer_api.get_submission_to_assess(self.tim_sub['uuid'], 1)
+        self._assess(self.tim_sub, self.tim, 1)
+        self.assertFalse(PeerReviewQueueEntry.objects.filter(submission_uuid=self.bob_sub['uuid']).exists())
+
+        # Sally can only over-grade Bob now
+        sally_sub, __ = TestPeerApi._create_student_and_submission("Sally", "Sally's answer")
+        sally_workflow = PeerWorkflow.get_by_submission_uuid(sally_sub['uuid'])
+        self.assertEqual(sally_workflow.get_submission_for_review(1), self.tim_sub['uuid'])
+
+    def test_cancelled_removed_from_queue(self):
+        peer_api.on_cancel(self.bob_sub['uuid'])
+        self.assertFalse(PeerReviewQueueEntry.objects.filter(submission_uuid=self.bob_sub['uuid']).exists())
+        tim_workflow = PeerWorkflow.get_by_submission_uuid(self.tim_sub['uuid'])
+        self.assertIsNone(tim_workflow.get_submission_for_review(1))
+
+    def test_expired_lease_refreshed(self):
+        peer_api.get_submission_to_assess(self.tim_sub['uuid'], 1)
+
+        # Bob's only review slot is leased to Tim
+        sally_sub, __ = TestPeerApi._create_student_and_submission("Sally", "Sally's answer")
+        sally_workflow = PeerWorkflow.get_by_submission_uuid(sally_sub['uuid'])
+        self.assertEqual(sally_workflow.get_submission_for_review(1), self.tim_sub['uuid'])
+
+        # Expire Tim's lease, and the queue entry that counts it
+        yesterday = timezone.now() - datetime.timedelta(days=1)
+        PeerWorkflowItem.objects.filter(submission_uuid=self.bob_sub['uuid']).update(started_at=yesterday)
+        PeerReviewQueueEntry.objects.filter(submission_uuid=self.bob_sub['uuid']).update(
+            lease_expires_at=yesterday + PeerWorkflow.TIME_LIMIT
+        )
+
+        # Sally's request refreshes the stale entry, and Bob is available again
+        with patch('random.choice', Mock(side_effect=lambda seq: seq[-1])):
+            self.assertEqual(sally_workflow.get_submission_for_review(1), self.bob_sub['uuid'])
+        entry = self._entry(self.bob_sub)
+        self.assertEqual(entry.leased_count, 0)
+        self.assertIsNone(entry.lease_expires_at)
+
+    def test_refresh_keeps_concurrent_claim(self):
+        entry = self._entry(self.bob_sub)
+        summarize_items = PeerReviewQueueEntry.summarize_items
+
+        def _claim_while_counting(items):  # pylint: disable=missing-docstring
+            # Another grader claims a slot after the entry was read, before the counts are written
+            self.assertTrue(self._entry(self.bob_sub).claim(1, timezone.now()))
+            return summarize_items(items)
+
+        with patch.object(PeerReviewQueueEntry, 'summarize_items', Mock(side_effect=_claim_while_counting)):
+            self.assertFalse(entry.refresh())
+        self.assertEqual(self._entry(self.bob_sub).leased_count, 1)
+
+        # Otherwise the counts are recounted from the workflow items
+        PeerReviewQueueEntry.objects.filter(id=entry.id).update(leased_count=2)
+        self.assertTrue(entry.refresh())
+        self.assertEqual(entry.leased_count, 0)
+        self.assertEqual(self._entry(self.bob_sub).leased_count, 0)
+
+    def test_refresh_dequeued_entry(self):
+        entry = self._entry(self.bob_sub)
+        peer_api.on_cancel(self.bob_sub['uuid'])
+        self.assertFalse(entry.refresh())
+
+    def test_claim_reserves_slot(self):
+        entry = self._entry(self.bob_sub)
+        current_time = timezone.now()
+        self.assertTrue(entry.claim(1, current_time))
+
+        # A second grader holding the same (stale) copy of the entry loses the race
+        self.assertFalse(entry.claim(1, current_time))
+        entry = self._entry(self.bob_sub)
+        self.assertEqual(entry.leased_count, 1)
+        self.assertEqual(entry.lease_expires_at, current_time + PeerWorkflow.TIME_LIMIT)
+
+    def test_claim_expired_entry(self):
+        yesterday = timezone.now() - datetime.timedelta(days=1)
+        PeerReviewQueueEntry.objects.filter(submission_uuid=self.bob_sub['uuid']).update(
+            leased_count=1, lease_expires_at=yesterday
+        )
+        self.assertFalse(self._entry(self.bob_sub).claim(2, timezone.now()))
+
+    @patch('random.choice', Mock(side_effect=lambda seq: seq[0]))
+    def test_claim_submission_for_review(self):
+        sally_sub, __ = TestPeerApi._create_student_and_submission("Sally", "Sally's answer")
+        sally_workflow = PeerWorkflow.get_by_submission_uuid(sally_sub['uuid'])
+        self.assertEqual(sally_workflow.claim_submission_for_review(1), self.tim_sub['uuid'])
+
+        # Tim's only slot has been reserved, even though no workflow item exists yet
+        self.assertEqual(self._entry(self.tim_sub).leased_count, 1)
+        self.assertEqual(sally_workflow.claim_submission_for_review(1), self.bob_sub['uuid'])
+        self.assertIsNone(sally_workflow.claim_submission_for_review(1))
+
+    @patch('random.choice', Mock(side_effect=lambda seq: seq[0]))
+    def test_claim_falls_back_to_next_candidate(self):
+        sally_sub, __ = TestPeerApi._create_student_and_submission("Sally", "Sally's answer")
+        sally_workflow = PeerWorkflow.get_by_submission_uuid(sally_sub['uuid'])
+
+        # Another grader takes Tim's slot between the scan and the claim
+        with patch.object(PeerReviewQueueEntry, 'claim', Mock(side_effect=[False, True])):
+            self.assertEqual(sally_workflow.claim_submission_for_review(1), self.bob_sub['uuid'])
+
+    def test_claim_and_item_committed_together(self):
+        peer_api.get_submission_to_assess(self.tim_sub['uuid'], 1)
+        entry = self._entry(self.bob_sub)
+        self.assertEqual(entry.leased_count, 1)
+        self.assertEqual(PeerWorkflowItem.objects.filter(submission_uuid=self.bob_sub['uuid']).count(), 1)
+
+    @patch.object(PeerWorkflow, 'create_item')
+    def test_claim_rolled_back_on_error(self, mock_create_item):
+        mock_create_item.side_effect = peer_api.PeerAssessmentInternalError("Oh no!")
+        with self.assertRaises(peer_api.PeerAssessmentInternalError):
+            peer_api.get_submission_to_assess(self.tim_sub['uuid'], 1)
+        self.assertEqual(self._entry(self.bob_sub).leased_count, 0)
+
+
 class AssessmentFeedbackTest(CacheResetTest):
     """
     Tests for assessment feedback.
@@ -4,10 +4,17 @@ Tests for assessment models.
 """
 
 import copy
-from openassessment.test_utils import CacheResetTest
+from hashlib import sha1
+import json
+import pickle
+
+import mock
+from django.db import transaction
+from openassessment.test_utils import CacheResetTest, TransactionCacheResetTest
 from openassessment.assessment.models import (
-    Rubric, Criterion, CriterionOption, InvalidRubricSelection
+    Rubric, RubricRegistry, Criterion, CriterionOption, InvalidRubricSelection
 )
+from openassessment.assessment.serializers import rubric_from_dict
 from openassessment.assessment.test.constants import RUBRIC
 
 
@@ -63,6 +70,25 @@ class RubricIndexTest(CacheResetTest):
             self.options["test criterion 3"][0]
         )
 
+    def test_index_is_cached(self):
+        # The index is stored in the cache, so loading the rubric
+        # again doesn't reload its criteria and options
+        self.assertEqual(self.rubric.points_possible, 2 * self.NUM_CRITERIA)
+        rubric = Rubric.objects.get(id=self.rubric.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(rubric.points_possible, 2 * self.NUM_CRITERIA)
+            option = rubric.index.find_option("test criterion 1", "test option 2")
+            self.assertEqual(option.criterion.name, "test criterion 1")
+
+    def test_index_is_picklable(self):
+        index = pickle.loads(pickle.dumps(self.rubric.index, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(index.points_possible, self.rubric.points_possible)
+        self.assertEqual(index.criteria_names, self.rubric.index.criteria_names)
+        self.assertEqual(
+            index.find_option_for_points("test criterion 0", 1),
+            self.options["test criterion 0"][1]
+        )
+
     def test_find_missing_criteria(self):
         missing = self.rubric.index.find_missing_criteria([
             'test criterion 0', 'test criterion 1', 'test criterion 3'
@@ -218,3 +244,116 @@ class RubricHashTest(CacheResetTest):
         altered_rubric['criteria'][0]['options'][0]['points'] = 'altered!'
         second_hash = Rubric.structure_hash_from_dict(altered_rubric)
         self.assertNotEqual(first_hash, second_hash)
+
+    def test_content_hash_unchanged(self):
+        # Hashes of existing rubrics are stored in the database,
+        # so they must not change with the way they are calculated
+        rubric_dict = copy.deepcopy(RUBRIC)
+        rubric_dict['id'] = 1
+        rubric_dict['content_hash'] = 'ignored'
+        expected_content_hash = sha1(json.dumps(RUBRIC, sort_keys=True)).hexdigest()
+        self.assertEqual(Rubric.content_hash_from_dict(rubric_dict), expected_content_hash)
+        self.assertEqual(Rubric.hashes_from_dict(RUBRIC)[0], expected_content_hash)
+
+    def test_rubric_from_dict_with_hashes(self):
+        content_hash, structure_hash = Rubric.hashes_from_dict(RUBRIC)
+
+        # Hashes calculated by the caller are used instead of hashing the rubric again
+        with mock.patch.object(Rubric, 'hashes_from_dict') as mock_hashes:
+            rubric = rubric_from_dict(RUBRIC, rubric_hashes=(content_hash, structure_hash))
+            self.assertFalse(mock_hashes.called)
+        self.assertEqual(rubric.content_hash, content_hash)
+        self.assertEqual(rubric.structure_hash, structure_hash)
+        self.assertEqual(rubric_from_dict(RUBRIC).id, rubric.id)
+
+
+class RubricRegistryTest(CacheResetTest):
+    """
+    Test the process-local rubric registry.
+    """
+
+    def setUp(self):
+        super(RubricRegistryTest, self).setUp()
+        self.registry = RubricRegistry(max_size=2)
+        self.rubrics = [
+            Rubric.objects.create(content_hash=str(num), structure_hash=str(num))
+            for num in range(3)
+        ]
+
+    def test_registered_rubric_is_loaded(self):
+        rubric = self.rubrics[0]
+        Criterion.objects.create(rubric=rubric, name="clarity", order_num=0, prompt="How clear?")
+        self.registry.add(rubric)
+
+        # The rubric was registered inside the test's transaction,
+        # so it is checked against the database, but not loaded again.
+        with self.assertNumQueries(1):
+            registered = self.registry.get(rubric.content_hash)
+            self.assertEqual(registered.points_possible, 0)
+            self.assertEqual(registered.index.find_criterion("clarity").name, "clarity")
+
+    def test_least_recently_used_rubric_is_dropped(self):
+        self.registry.add(self.rubrics[0])
+        self.registry.add(self.rubrics[1])
+
+        # Using the first rubric makes the second the least recently used
+        self.assertEqual(self.registry.get("0"), self.rubrics[0])
+        self.registry.add(self.rubrics[2])
+
+        self.assertEqual(self.registry.get("0"), self.rubrics[0])
+        self.assertIsNone(self.registry.get("1"))
+        self.assertEqual(self.registry.get("2"), self.rubrics[2])
+
+    def test_clear(self):
+        self.registry.add(self.rubrics[0])
+        self.registry.clear()
+        self.assertIsNone(self.registry.get("0"))
+
+    def test_rolled_back_rubric_is_dropped(self):
+        try:
+            with transaction.atomic():
+                rubric = Rubric.objects.create(content_hash="rolled back", structure_hash="rolled back")
+                self.registry.add(rubric)
+                self.assertEqual(self.registry.get("rolled back"), rubric)
+                raise _RollbackError()
+        except _RollbackError:
+            pass
+
+        self.assertIsNone(self.registry.get("rolled back"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.registry.get("rolled back"))
+
+
+class RubricRegistryTransactionTest(TransactionCacheResetTest):
+    """
+    Test the rubric registry outside of a transaction.
+    """
+
+    def test_committed_rubric_is_not_checked(self):
+        registry = RubricRegistry(max_size=2)
+        rubric = Rubric.objects.create(content_hash="0", structure_hash="0")
+        registry.add(rubric)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.get("0"), rubric)
+
+    def test_rubric_checked_until_committed(self):
+        registry = RubricRegistry(max_size=2)
+        with transaction.atomic():
+            rubric = Rubric.objects.create(content_hash="0", structure_hash="0")
+            registry.add(rubric)
+            with self.assertNumQueries(1):
+                self.assertEqual(registry.get("0"), rubric)
+
+        # Once the transaction has committed, the rubric is checked one last time
+        with self.assertNumQueries(1):
+            self.assertEqual(registry.get("0"), rubric)
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.get("0"), rubric)
+
+
+class _RollbackError(Exception):
+    """
+    Raised to roll back a transaction in a test.
+    """
+    pass
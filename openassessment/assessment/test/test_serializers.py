@@ -7,13 +7,17 @@ import json
 import os.path
 import copy
 
+import mock
+from django.core.cache import cache
+
+from openassessment import request_cache
 from openassessment.test_utils import CacheResetTest
 from openassessment.assessment.models import (
     Assessment, AssessmentPart, AssessmentFeedback
 )
 from openassessment.assessment.serializers import (
-    rubric_from_dict, full_assessment_dict,
-    AssessmentFeedbackSerializer, InvalidRubric
+    rubric_from_dict, full_assessment_dict, serialize_assessments,
+    AssessmentFeedbackSerializer, InvalidRubric, RubricSerializer
 )
 from .constants import RUBRIC
 
@@ -33,11 +37,18 @@ class RubricDeserializationTest(CacheResetTest):
 
         r1 = rubric_from_dict(rubric_data)
 
-        with self.assertNumQueries(1):
-            # Just the select -- shouldn't need the create queries
+        # The select, then loading the rubric's index
+        # into the rubric registry -- shouldn't need the create queries
+        with self.assertNumQueries(3):
             r2 = rubric_from_dict(rubric_data)
 
+        # The rubric is now in the registry.  It was registered inside
+        # the test's transaction, so it is only checked against the database.
+        with self.assertNumQueries(1):
+            r3 = rubric_from_dict(rubric_data)
+
         self.assertEqual(r1.id, r2.id)
+        self.assertEqual(r1.id, r3.id)
         r1.delete()
 
     def test_rubric_requires_positive_score(self):
@@ -153,3 +164,59 @@ class AssessmentSerializerTest(CacheResetTest):
         # Verify that the assessment dict correctly serialized the criterion with no options.
         self.assertIs(serialized['parts'][2]['option'], None)
         self.assertEqual(serialized['parts'][2]['criterion']['name'], u"feedback only")
+
+    def test_serialize_assessments(self):
+        rubric = rubric_from_dict(RUBRIC)
+        for scorer_id, option in ((u"Bob", u"𝒑𝒐𝒐𝒓"), (u"Sue", u"𝓰𝓸𝓸𝓭"), (u"Tim", u"єχ¢єℓℓєηт")):
+            assessment = Assessment.create(rubric, scorer_id, "submission UUID", "PE")
+            AssessmentPart.create_from_option_names(
+                assessment, {u"vøȼȺƀᵾłȺɍɏ": option, u"ﻭɼค๓๓คɼ": option}
+            )
+        assessments = Assessment.objects.filter(submission_uuid="submission UUID")
+        RubricSerializer.serialized_from_cache(rubric)
+
+        # One query for the assessments, and one for all of their parts
+        with self.assertNumQueries(2):
+            serialized = serialize_assessments(assessments)
+        self.assertEqual([assessment['scorer_id'] for assessment in serialized], [u"Tim", u"Sue", u"Bob"])
+        self.assertEqual([assessment['points_earned'] for assessment in serialized], [4, 2, 0])
+        self.assertEqual(full_assessment_dict(assessments[2])['points_earned'], 0)
+
+        # The serialized assessments are now cached, and retrieved all at once
+        with mock.patch('openassessment.assessment.serializers.base.cache') as mock_cache:
+            mock_cache.get_many.side_effect = cache.get_many
+            with self.assertNumQueries(1):
+                cached = serialize_assessments(assessments)
+            self.assertEqual(
+                [assessment['id'] for assessment in cached],
+                [assessment['id'] for assessment in serialized]
+            )
+            self.assertEqual(mock_cache.get_many.call_count, 1)
+            self.assertFalse(mock_cache.get.called)
+
+    def test_serialize_assessments_request_cache(self):
+        rubric = rubric_from_dict(RUBRIC)
+        assessment = Assessment.create(rubric, u"Bob", "submission UUID", "PE")
+        AssessmentPart.create_from_option_names(
+            assessment, {u"vøȼȺƀᵾłȺɍɏ": u"𝓰𝓸𝓸𝓭", u"ﻭɼค๓๓คɼ": u"𝓰𝓸𝓸𝓭"}
+        )
+        assessments = Assessment.objects.filter(submission_uuid="submission UUID")
+
+        request_cache.start_request()
+        self.addCleanup(request_cache.finish_request)
+        serialized = serialize_assessments(assessments)
+
+        # Callers can modify their copy, as the grade and peer assessment mixins do
+        serialized[0]['scored_at'] = u"modified"
+        serialized[0]['parts'][0]['criterion']['title'] = u"modified"
+
+        # Within the same request, the shared cache isn't consulted again
+        with mock.patch('openassessment.assessment.serializers.base.cache') as mock_cache:
+            for cached in (serialize_assessments(assessments)[0], full_assessment_dict(assessment)):
+                self.assertIsNot(cached, serialized[0])
+                self.assertEqual(cached['id'], serialized[0]['id'])
+                self.assertEqual(cached['points_earned'], serialized[0]['points_earned'])
+                self.assertEqual(cached['scored_at'], assessment.scored_at)
+                self.assertNotIn('title', cached['parts'][0]['criterion'])
+            self.assertFalse(mock_cache.get_many.called)
+            self.assertFalse(mock_cache.get.called)
@@ -409,6 +409,25 @@ class TestStaffAssessment(CacheResetTest):
         self.assertEqual(bob_sub, tim_to_grade)
         self.assertEqual(tim_sub, bob_to_grade)
 
+    def test_fetch_submission_claimed_concurrently(self):
+        bob_sub, bob = self._create_student_and_submission("bob", "bob's answer")
+        tim_sub, tim = self._create_student_and_submission("Tim", "Tim's answer")
+        claim = StaffWorkflow._claim
+
+        # Simulate Sue claiming Bob's submission after Tim has read the queue,
+        # but before Tim's own claim.
+        def _claim_after_sue(workflow_id, scorer_id, current_time):
+            if not StaffWorkflow.objects.filter(scorer_id="Sue").exists():
+                claim(workflow_id, "Sue", current_time)
+            return claim(workflow_id, scorer_id, current_time)
+
+        with mock.patch.object(StaffWorkflow, '_claim', side_effect=_claim_after_sue):
+            tim_to_grade = staff_api.get_submission_to_assess(tim['course_id'], tim['item_id'], "Tim")
+
+        self.assertEqual(tim_sub, tim_to_grade)
+        self.assertEqual(StaffWorkflow.objects.get(submission_uuid=bob_sub['uuid']).scorer_id, "Sue")
+        self.assertEqual(StaffWorkflow.objects.get(submission_uuid=tim_sub['uuid']).scorer_id, "Tim")
+
     @data('America/New_York', 'Asia/Tokyo')
     def test_fetch_submission_delayed(self, time_zone):
         with override_settings(TIME_ZONE=time_zone):
@@ -492,6 +511,68 @@ class TestStaffAssessment(CacheResetTest):
             stats = staff_api.get_staff_grading_statistics(course_id, item_id)
             self.assertEqual(stats, {'graded': 1, 'ungraded': 1, 'in-progress': 0})
 
+    def test_grading_statistics_num_queries(self):
+        bob_sub, bob = self._create_student_and_submission("bob", "bob's answer")
+        with self.assertNumQueries(1):
+            stats = staff_api.get_staff_grading_statistics(bob['course_id'], bob['item_id'])
+        self.assertEqual(stats, {'graded': 0, 'ungraded': 1, 'in-progress': 0})
+
+        # No workflows at all
+        stats = staff_api.get_staff_grading_statistics('test_course_id', 'test_item_id')
+        self.assertEqual(stats, {'graded': 0, 'ungraded': 0, 'in-progress': 0})
+
+    @override_settings(ORA2_STAFF_GRADING_STATISTICS_CACHE_TIMEOUT=60)
+    def test_grading_statistics_cached(self):
+        bob_sub, bob = self._create_student_and_submission("bob", "bob's answer")
+        staff_api.get_staff_grading_statistics(bob['course_id'], bob['item_id'])
+        staff_api.get_staff_grader_statistics(bob['course_id'], bob['item_id'])
+        with self.assertNumQueries(0):
+            stats = staff_api.get_staff_grading_statistics(bob['course_id'], bob['item_id'])
+            grader_stats = staff_api.get_staff_grader_statistics(bob['course_id'], bob['item_id'])
+        self.assertEqual(stats, {'graded': 0, 'ungraded': 1, 'in-progress': 0})
+        self.assertEqual(grader_stats, [])
+
+    def test_grader_statistics(self):
+        bob_sub, bob = self._create_student_and_submission("bob", "bob's answer")
+        tim_sub, tim = self._create_student_and_submission("Tim", "Tim's answer")
+        sue_sub, sue = self._create_student_and_submission("Sue", "Sue's answer")
+        course_id = bob['course_id']
+        item_id = bob['item_id']
+
+        # Staff check out and grade Bob's and Tim's submissions
+        for staff_id in ("Dumbledore", "Snape"):
+            submission = staff_api.get_submission_to_assess(course_id, item_id, staff_id)
+            staff_api.create_assessment(
+                submission["uuid"], staff_id,
+                OPTIONS_SELECTED_DICT["all"]["options"], dict(), "",
+                RUBRIC,
+            )
+
+        # Pretend Dumbledore took ten minutes to grade
+        workflow = StaffWorkflow.objects.get(scorer_id="Dumbledore")
+        workflow.grading_started_at = workflow.grading_completed_at - timedelta(minutes=10)
+        workflow.save()
+
+        # Override Sue's grade without checking out her submission,
+        # and pretend Snape's grade is too old to count
+        staff_api.create_assessment(
+            sue_sub["uuid"], "Dumbledore",
+            OPTIONS_SELECTED_DICT["all"]["options"], dict(), "",
+            RUBRIC,
+        )
+        StaffWorkflow.objects.filter(scorer_id="Snape").update(
+            grading_completed_at=now() - timedelta(hours=2)
+        )
+
+        stats = staff_api.get_staff_grader_statistics(course_id, item_id)
+        self.assertEqual(stats, [{'scorer_id': 'Dumbledore', 'graded': 2, 'average_grading_time': 600.0}])
+
+    @mock.patch.object(StaffWorkflow, 'get_scorer_statistics')
+    def test_grader_statistics_database_error(self, mock_statistics):
+        mock_statistics.side_effect = DatabaseError("Oh no!")
+        with self.assertRaises(StaffAssessmentInternalError):
+            staff_api.get_staff_grader_statistics('test_course_id', 'test_item_id')
+
     @staticmethod
     def _create_student_and_submission(student, answer, date=None, problem_steps=None):
         """
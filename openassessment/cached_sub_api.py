@@ -0,0 +1,161 @@
+"""
+Request-scoped memoization of the submissions API calls that ORA makes
+many times while handling a single request.
+
+Reads are remembered for the rest of the request (see `request_cache`),
+and are forgotten when ORA changes scores through this module.
+Outside of a request, every call goes straight to the submissions API.
+
+Callers receive their own copy of each result, so they can modify it
+without affecting other callers.
+"""
+import copy
+
+from submissions import api as sub_api
+
+from openassessment import request_cache
+
+
+# Names of the request caches used by this module
+SUBMISSION_CACHE = "submissions.submission"
+SUBMISSION_AND_STUDENT_CACHE = "submissions.submission_and_student"
+LATEST_SCORE_CACHE = "submissions.latest_score"
+
+
+def get_submission(submission_uuid):
+    """
+    Retrieve a submission (see `submissions.api.get_submission`).
+
+    Args:
+        submission_uuid (str): The UUID of the submission.
+
+    Returns:
+        dict
+
+    Raises:
+        SubmissionNotFoundError
+        SubmissionRequestError
+        SubmissionInternalError
+
+    """
+    return _memoized(SUBMISSION_CACHE, submission_uuid, sub_api.get_submission)
+
+
+def get_submission_and_student(submission_uuid):
+    """
+    Retrieve a submission with its student item
+    (see `submissions.api.get_submission_and_student`).
+
+    Args:
+        submission_uuid (str): The UUID of the submission.
+
+    Returns:
+        dict
+
+    Raises:
+        SubmissionNotFoundError
+        SubmissionRequestError
+        SubmissionInternalError
+
+    """
+    return _memoized(SUBMISSION_AND_STUDENT_CACHE, submission_uuid, sub_api.get_submission_and_student)
+
+
+def get_latest_score_for_submission(submission_uuid):
+    """
+    Retrieve the latest score for a submission
+    (see `submissions.api.get_latest_score_for_submission`).
+
+    Args:
+        submission_uuid (str): The UUID of the submission.
+
+    Returns:
+        dict or None
+
+    """
+    return _memoized(LATEST_SCORE_CACHE, submission_uuid, sub_api.get_latest_score_for_submission)
+
+
+def set_score(submission_uuid, points_earned, points_possible, **kwargs):
+    """
+    Set a score for a submission (see `submissions.api.set_score`),
+    and forget its previously retrieved score.
+
+    Args:
+        submission_uuid (str): The UUID of the submission.
+        points_earned (int): The points earned.
+        points_possible (int): The points possible.
+
+    Kwargs:
+        Passed on to `submissions.api.set_score`.
+
+    Returns:
+        None
+
+    Raises:
+        SubmissionNotFoundError
+        SubmissionRequestError
+        SubmissionInternalError
+
+    """
+    try:
+        sub_api.set_score(submission_uuid, points_earned, points_possible, **kwargs)
+    finally:
+        latest_scores = request_cache.get_cache(LATEST_SCORE_CACHE)
+        if latest_scores is not None:
+            latest_scores.pop(submission_uuid, None)
+
+
+def reset_score(student_id, course_id, item_id, **kwargs):
+    """
+    Reset the scores of a student item (see `submissions.api.reset_score`),
+    and forget every previously retrieved submission and score, since
+    resetting may also clear the student's submissions.
+
+    Args:
+        student_id (unicode): The ID of the student.
+        course_id (unicode): The ID of the course.
+        item_id (unicode): The ID of the item.
+
+    Kwargs:
+        Passed on to `submissions.api.reset_score`.
+
+    Returns:
+        None
+
+    Raises:
+        SubmissionInternalError
+
+    """
+    try:
+        sub_api.reset_score(student_id, course_id, item_id, **kwargs)
+    finally:
+        for name in (SUBMISSION_CACHE, SUBMISSION_AND_STUDENT_CACHE, LATEST_SCORE_CACHE):
+            cached = request_cache.get_cache(name)
+            if cached is not None:
+                cached.clear()
+
+
+def _memoized(name, submission_uuid, retrieve):
+    """
+    Retrieve a value for a submission, using the request cache if possible.
+
+    Errors are not remembered, so a failed call is retried the next time.
+
+    Args:
+        name (str): The name of the request cache to use.
+        submission_uuid (str): The UUID of the submission.
+        retrieve (callable): Called with the submission UUID to
+            retrieve the value if it isn't cached.
+
+    Returns:
+        A copy of the value.
+
+    """
+    cached = request_cache.get_cache(name)
+    if cached is None:
+        return retrieve(submission_uuid)
+
+    if submission_uuid not in cached:
+        cached[submission_uuid] = retrieve(submission_uuid)
+    return copy.deepcopy(cached[submission_uuid])
@@ -1,13 +1,19 @@
 """
 Aggregate data for openassessment.
 """
+from collections import defaultdict
 import csv
 import json
 
 from django.conf import settings
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
 from submissions import api as sub_api
+from submissions.models import Score, Submission
 from openassessment.workflow.models import AssessmentWorkflow
-from openassessment.assessment.models import Assessment, AssessmentPart, AssessmentFeedback
+from openassessment.assessment.models import (
+    Assessment, AssessmentPart, AssessmentFeedback, AssessmentFeedbackOption
+)
 
 
 class CsvWriter(object):
@@ -54,7 +60,7 @@ class CsvWriter(object):
     # to avoid loading thousands of records into memory at once.
     QUERY_INTERVAL = 100
 
-    def __init__(self, output_streams, progress_callback=None):
+    def __init__(self, output_streams, progress_callback=None, page_size=None):
         """
         Configure where the writer will write data.
 
@@ -71,6 +77,8 @@ class CsvWriter(object):
             progress_callback (callable): Callable that accepts
                 no arguments.  Called once per submission loaded
                 from the database.
+            page_size (int): Number of submissions to load from the
+                database at a time.  Defaults to `QUERY_INTERVAL`.
 
         Example usage:
             >>> output_streams = {
@@ -80,63 +88,170 @@ class CsvWriter(object):
             >>> writer = AssessmentsCsvWriter(output_streams)
             >>> writer.write_to_csv()
 
+        """
+        self.writers = dict()
+        self.set_output_streams(output_streams)
+        self._progress_callback = progress_callback
+        self._page_size = page_size or self.QUERY_INTERVAL
+
+    def set_output_streams(self, output_streams):
+        """
+        Change where the writer will write data, for example
+        to write each chunk of submissions to a separate file.
+
+        Args:
+            output_streams (dictionary): The file handles to write
+                CSV data to (see `__init__`).
+
+        Returns:
+            None
+
         """
         self.writers = {
             key: csv.writer(file_handle)
             for key, file_handle in output_streams.iteritems()
             if key in self.MODELS
         }
-        self._progress_callback = progress_callback
 
-    def write_to_csv(self, course_id):
+    def write_to_csv(self, course_id, checkpoint=None, checkpoint_callback=None):
         """
         Write assessment and submission data for a course to CSV files.
 
-        NOTE: The current implementation optimizes for memory usage,
-        but not for the number of database queries.  All the queries
-        use indexed fields (the submission uuid), so they should be
-        relatively quick.
+        Submissions are processed in chunks of `page_size`.  The submissions,
+        scores, assessment parts and feedback for each chunk are loaded with
+        one query each, so the number of queries grows with the number of
+        chunks rather than the number of submissions, and only one chunk
+        is held in memory at a time.
 
         Args:
             course_id (unicode): The course ID from which to pull data.
 
+        Keyword Arguments:
+            checkpoint (dict): Resume writing from a checkpoint passed to
+                `checkpoint_callback` by an earlier call, or write one of the
+                shards returned by `shard_checkpoints`.  The headers, and
+                the chunks written before the checkpoint, are not written again.
+            checkpoint_callback (callable): Called with a checkpoint (a
+                JSON-serializable dict) after each chunk has been written.
+
         Returns:
             None
 
         """
-        self._write_csv_headers()
+        if checkpoint is None:
+            checkpoint = self._start_checkpoint(course_id)
 
-        rubric_points_cache = dict()
-        feedback_option_set = set()
-        for submission_uuid in self._submission_uuids(course_id):
-            self._write_submission_to_csv(submission_uuid)
-
-            # Django 1.4 doesn't follow reverse relations when using select_related,
-            # so we select AssessmentPart and follow the foreign key to the Assessment.
-            parts = self._use_read_replica(
-                AssessmentPart.objects.select_related('assessment', 'option', 'option__criterion')
-                .filter(assessment__submission_uuid=submission_uuid)
-                .order_by('assessment__pk')
-            )
-            self._write_assessment_to_csv(parts, rubric_points_cache)
+        if not checkpoint.get('headers_written', True):
+            self._write_csv_headers()
+            checkpoint = dict(checkpoint, headers_written=True)
+
+        start_after, stop_at = None, None
+        if checkpoint['workflow_id'] is not None:
+            start_after = (parse_datetime(checkpoint['created']), checkpoint['workflow_id'])
+        if checkpoint.get('stop_workflow_id') is not None:
+            stop_at = (parse_datetime(checkpoint['stop_created']), checkpoint['stop_workflow_id'])
 
-            feedback_query = self._use_read_replica(
-                AssessmentFeedback.objects
-                .filter(submission_uuid=submission_uuid)
-                .prefetch_related('options')
+        rubric_points_cache = dict()
+        feedback_option_ids = set(checkpoint['feedback_option_ids'])
+        for workflows in self._workflow_pages(course_id, checkpoint['last_workflow_id'], start_after, stop_at):
+            submission_uuids = [submission_uuid for __, __, submission_uuid in workflows]
+            self._write_submissions_to_csv(submission_uuids)
+            self._write_assessments_to_csv(submission_uuids, rubric_points_cache)
+            feedback_option_ids.update(
+                option.id for option in self._write_assessment_feedbacks_to_csv(submission_uuids)
             )
-            for assessment_feedback in feedback_query:
-                self._write_assessment_feedback_to_csv(assessment_feedback)
-                feedback_option_set.update(set(
-                    option for option in assessment_feedback.options.all()
-                ))
 
             if self._progress_callback is not None:
-                self._progress_callback()
+                for __ in submission_uuids:
+                    self._progress_callback()
+
+            if checkpoint_callback is not None:
+                last_created, last_id, __ = workflows[-1]
+                checkpoint = dict(
+                    checkpoint,
+                    created=last_created.isoformat(),
+                    workflow_id=last_id,
+                    feedback_option_ids=sorted(feedback_option_ids),
+                )
+                checkpoint_callback(checkpoint)
 
         # The set of available options should be relatively small,
         # since they're not (currently) user-defined.
-        self._write_feedback_options_to_csv(feedback_option_set)
+        self._write_feedback_options_to_csv(
+            self._use_read_replica(
+                AssessmentFeedbackOption.objects.filter(id__in=feedback_option_ids).order_by('id')
+            )
+        )
+
+    def shard_checkpoints(self, course_id, num_shards):
+        """
+        Split the export of a course into shards of roughly equal size.
+
+        Each shard is a checkpoint covering a consecutive range of the course's
+        submissions, which can be passed to `write_to_csv`.  The shards can be
+        written independently (for example, by separate processes), and the
+        output of the shards concatenated in order is the same as the output
+        of a single export, except that each shard lists the feedback
+        options it has seen.  Only the first shard writes headers.
+
+        Args:
+            course_id (unicode): The course ID from which to pull data.
+            num_shards (int): The number of shards to split the export into.
+
+        Returns:
+            list of dict: At most `num_shards` checkpoints.
+
+        """
+        start = self._start_checkpoint(course_id)
+        if start['last_workflow_id'] is None:
+            return [start]
+
+        workflows = self._workflows(course_id, start['last_workflow_id'])
+        total = workflows.count()
+
+        # Find the last workflow of each shard, except the last one
+        bounds = []
+        for index in range(1, num_shards):
+            offset = index * total // num_shards
+            if offset > 0 and (not bounds or bounds[-1][1] != offset):
+                bounds.append((workflows.values_list('created', 'id')[offset - 1], offset))
+
+        shards = []
+        previous = None
+        for bound in [bound for bound, __ in bounds] + [None]:
+            shards.append(dict(
+                start,
+                headers_written=previous is not None,
+                created=previous[0].isoformat() if previous is not None else None,
+                workflow_id=previous[1] if previous is not None else None,
+                stop_created=bound[0].isoformat() if bound is not None else None,
+                stop_workflow_id=bound[1] if bound is not None else None,
+            ))
+            previous = bound
+        return shards
+
+    def _start_checkpoint(self, course_id):
+        """
+        Create the checkpoint for the start of an export.
+
+        Args:
+            course_id (unicode): The course ID from which to pull data.
+
+        Returns:
+            dict
+
+        """
+        return {
+            'last_workflow_id': self._use_read_replica(
+                AssessmentWorkflow.objects.filter(course_id=course_id)
+            ).aggregate(Max('id'))['id__max'],
+            'headers_written': False,
+            'created': None,
+            'workflow_id': None,
+            'stop_created': None,
+            'stop_workflow_id': None,
+            'feedback_option_ids': [],
+        }
 
     def _submission_uuids(self, course_id):
         """
@@ -151,29 +266,77 @@ class CsvWriter(object):
             submission_uuid (unicode)
 
         """
-        num_results = 0
-        start = 0
-        total_results = self._use_read_replica(
-            AssessmentWorkflow.objects.filter(course_id=course_id)
-        ).count()
+        checkpoint = self._start_checkpoint(course_id)
+        for workflows in self._workflow_pages(course_id, checkpoint['last_workflow_id']):
+            for __, __, submission_uuid in workflows:
+                yield submission_uuid
 
-        while num_results < total_results:
-            # Load a subset of the submission UUIDs
-            # We're assuming that peer workflows are immutable,
-            # so if we counted N at the start of the loop,
-            # there should be >= N for us to process.
-            end = start + self.QUERY_INTERVAL
-            query = self._use_read_replica(
-                AssessmentWorkflow.objects
-                .filter(course_id=course_id)
-                .order_by('created')
-            ).values('submission_uuid')[start:end]
+    def _workflows(self, course_id, last_workflow_id):
+        """
+        Retrieve the workflows of a course that existed when an export started,
+        ordered by creation time.
 
-            for workflow_dict in query:
-                num_results += 1
-                yield workflow_dict['submission_uuid']
+        Args:
+            course_id (unicode): The ID of the course to retrieve workflows from.
+            last_workflow_id (int): The ID of the last workflow to include.
 
-            start += self.QUERY_INTERVAL
+        Returns:
+            QuerySet
+
+        """
+        return self._use_read_replica(
+            AssessmentWorkflow.objects.filter(course_id=course_id, id__lte=last_workflow_id)
+        ).order_by('created', 'id')
+
+    def _workflow_pages(self, course_id, last_workflow_id, start_after=None, stop_at=None):
+        """
+        Iterate over pages of at most `page_size` workflows, ordered by
+        creation time.
+
+        Workflows are paginated by seeking past the (created, id) of the last
+        workflow on the previous page, rather than with an offset, so every
+        page costs the same.  Only workflows up to `last_workflow_id` (the
+        last workflow when the export started) are included, so workflows
+        created during an export don't shift the pages.
+
+        Args:
+            course_id (unicode): The ID of the course to retrieve workflows from.
+            last_workflow_id (int): The ID of the last workflow to include, or None
+                if there are no workflows to include.
+
+        Keyword Arguments:
+            start_after (tuple): The (created, id) of the workflow to start after.
+            stop_at (tuple): The (created, id) of the last workflow to include.
+
+        Yields:
+            list of (created, id, submission_uuid) tuples
+
+        """
+        if last_workflow_id is None:
+            return
+
+        workflows = self._workflows(course_id, last_workflow_id)
+        if stop_at is not None:
+            stop_created, stop_id = stop_at
+            workflows = workflows.filter(
+                Q(created__lt=stop_created) | Q(created=stop_created, id__lte=stop_id)
+            )
+
+        while True:
+            page = workflows
+            if start_after is not None:
+                last_created, last_id = start_after
+                page = workflows.filter(
+                    Q(created__gt=last_created) | Q(created=last_created, id__gt=last_id)
+                )
+
+            results = list(page.values_list('created', 'id', 'submission_uuid')[:self._page_size])
+            if results:
+                yield results
+
+            if len(results) < self._page_size:
+                break
+            start_after = results[-1][:2]
 
     def _write_csv_headers(self):
         """
@@ -182,35 +345,116 @@ class CsvWriter(object):
         for name, writer in self.writers.iteritems():
             writer.writerow(self.HEADERS[name])
 
-    def _write_submission_to_csv(self, submission_uuid):
+    def _write_submissions_to_csv(self, submission_uuids):
         """
-        Write submission data to CSV.
+        Write submission data, and the latest score of each submission, to CSV.
 
         Args:
-            submission_uuid (unicode): The UUID of the submission to write.
+            submission_uuids (list of unicode): The UUIDs of the submissions to write.
 
         Returns:
             None
 
         """
-        submission = sub_api.get_submission_and_student(submission_uuid, read_replica=True)
-        self._write_unicode('submission', [
-            submission['uuid'],
-            submission['student_item']['student_id'],
-            submission['student_item']['item_id'],
-            submission['submitted_at'],
-            submission['created_at'],
-            json.dumps(submission['answer'])
-        ])
+        if 'submission' in self.writers:
+            submissions = self._use_read_replica(
+                Submission.objects.select_related('student_item').filter(uuid__in=submission_uuids)
+            )
+            submissions_by_uuid = {submission.uuid: submission for submission in submissions}
+            for submission_uuid in submission_uuids:
+                submission = submissions_by_uuid.get(submission_uuid)
+                if submission is not None:
+                    self._write_unicode('submission', [
+                        submission.uuid,
+                        submission.student_item.student_id,
+                        submission.student_item.item_id,
+                        submission.submitted_at,
+                        submission.created_at,
+                        json.dumps(submission.answer)
+                    ])
+
+        if 'score' in self.writers:
+            # Scores are loaded newest first, so the first score
+            # we see for a submission is its latest score.
+            scores = self._use_read_replica(
+                Score.objects.select_related('submission')
+                .filter(submission__uuid__in=submission_uuids)
+                .exclude(submission__status=Submission.DELETED)
+                .order_by('-id')
+            )
+            latest_scores = {}
+            for score in scores:
+                latest_scores.setdefault(score.submission.uuid, score)
+            for submission_uuid in submission_uuids:
+                score = latest_scores.get(submission_uuid)
+                if score is not None and not score.is_hidden():
+                    self._write_unicode('score', [
+                        score.submission.uuid,
+                        score.points_earned,
+                        score.points_possible,
+                        score.created_at
+                    ])
+
+    def _write_assessments_to_csv(self, submission_uuids, rubric_points_cache):
+        """
+        Write the assessments and assessment parts of submissions to CSV.
 
-        score = sub_api.get_latest_score_for_submission(submission_uuid, read_replica=True)
-        if score is not None:
-            self._write_unicode('score', [
-                score['submission_uuid'],
-                score['points_earned'],
-                score['points_possible'],
-                score['created_at']
-            ])
+        Args:
+            submission_uuids (list of unicode): The UUIDs of the assessed submissions.
+            rubric_points_cache (dict): in-memory cache of points possible by rubric ID.
+
+        Returns:
+            None
+
+        """
+        if 'assessment' not in self.writers and 'assessment_part' not in self.writers:
+            return
+
+        # Django 1.4 doesn't follow reverse relations when using select_related,
+        # so we select AssessmentPart and follow the foreign key to the Assessment.
+        parts = self._use_read_replica(
+            AssessmentPart.objects.select_related('assessment', 'criterion', 'option', 'option__criterion')
+            .filter(assessment__submission_uuid__in=submission_uuids)
+            .order_by('assessment__pk', 'pk')
+        )
+        parts_by_submission = defaultdict(list)
+        for part in parts:
+            parts_by_submission[part.assessment.submission_uuid].append(part)
+
+        for submission_uuid in submission_uuids:
+            self._write_assessment_to_csv(parts_by_submission[submission_uuid], rubric_points_cache)
+
+    def _write_assessment_feedbacks_to_csv(self, submission_uuids):
+        """
+        Write the feedback on the assessments of submissions to CSV.
+
+        Args:
+            submission_uuids (list of unicode): The UUIDs of the assessed submissions.
+
+        Returns:
+            set of AssessmentFeedbackOption: The options selected in the feedback.
+
+        """
+        if 'assessment_feedback' not in self.writers and 'assessment_feedback_option' not in self.writers:
+            return set()
+
+        feedback_query = self._use_read_replica(
+            AssessmentFeedback.objects
+            .filter(submission_uuid__in=submission_uuids)
+            .prefetch_related('options')
+        )
+        feedback_by_submission = {
+            assessment_feedback.submission_uuid: assessment_feedback
+            for assessment_feedback in feedback_query
+        }
+
+        feedback_options = set()
+        for submission_uuid in submission_uuids:
+            assessment_feedback = feedback_by_submission.get(submission_uuid)
+            if assessment_feedback is not None:
+                self._write_assessment_feedback_to_csv(assessment_feedback)
+                feedback_options.update(assessment_feedback.options.all())
+        return feedback_options
 
     def _write_assessment_to_csv(self, assessment_parts, rubric_points_cache):
         """
@@ -342,6 +586,21 @@ class OraAggregateData(object):
     Aggregate all the ORA data into a single table-like data structure.
     """
 
+    HEADER = [
+        'Submission ID',
+        'Item ID',
+        'Anonymized Student ID',
+        'Date/Time Response Submitted',
+        'Response',
+        'Assessment Details',
+        'Assessment Scores',
+        'Date/Time Final Score Given',
+        'Final Score Points Earned',
+        'Final Score Points Possible',
+        'Feedback Statements Selected',
+        'Feedback on Peer Assessments'
+    ]
+
     @classmethod
     def _use_read_replica(cls, queryset):
         """
@@ -367,15 +626,15 @@ class OraAggregateData(object):
         Returns:
             string that should be included in the 'assessments' column for this set of assessments' row
         """
-        returned_string = u""
+        lines = []
         for assessment in assessments:
-            returned_string += u"Assessment #{}\n".format(assessment.id)
-            returned_string += u"-- scored_at: {}\n".format(assessment.scored_at)
-            returned_string += u"-- type: {}\n".format(assessment.score_type)
-            returned_string += u"-- scorer_id: {}\n".format(assessment.scorer_id)
+            lines.append(u"Assessment #{}\n".format(assessment.id))
+            lines.append(u"-- scored_at: {}\n".format(assessment.scored_at))
+            lines.append(u"-- type: {}\n".format(assessment.score_type))
+            lines.append(u"-- scorer_id: {}\n".format(assessment.scorer_id))
             if assessment.feedback != u"":
-                returned_string += u"-- overall_feedback: {}\n".format(assessment.feedback)
-        return returned_string
+                lines.append(u"-- overall_feedback: {}\n".format(assessment.feedback))
+        return u"".join(lines)
 
     @classmethod
     def _build_assessments_parts_cell(cls, assessments):
@@ -385,19 +644,20 @@ class OraAggregateData(object):
         Returns:
             string that should be included in the relevant 'assessments_parts' column for this set of assessments' row
         """
-        returned_string = u""
+        lines = []
         for assessment in assessments:
-            returned_string += u"Assessment #{}\n".format(assessment.id)
-            for part in assessment.parts.order_by('criterion__order_num'):
-                returned_string += u"-- {}".format(part.criterion.label)
+            lines.append(u"Assessment #{}\n".format(assessment.id))
+            # Sort the parts in memory, so that prefetched parts are used
+            for part in sorted(assessment.parts.all(), key=lambda part: part.criterion.order_num):
+                lines.append(u"-- {}".format(part.criterion.label))
                 if part.option is not None and part.option.label is not None:
                     option_label = part.option.label
-                    returned_string += u": {option_label} ({option_points})\n".format(
+                    lines.append(u": {option_label} ({option_points})\n".format(
                         option_label=option_label, option_points=part.option.points
-                    )
+                    ))
                 if part.feedback != u"":
-                    returned_string += u"-- feedback: {}\n".format(part.feedback)
-        return returned_string
+                    lines.append(u"-- feedback: {}\n".format(part.feedback))
+        return u"".join(lines)
 
     @classmethod
     def _build_feedback_options_cell(cls, assessments):
@@ -408,13 +668,13 @@ class OraAggregateData(object):
             string that should be included in the relevant 'feedback_options' column for this set of assessments' row
         """
 
-        returned_string = u""
+        lines = []
         for assessment in assessments:
             for feedback in assessment.assessment_feedback.all():
                 for option in feedback.options.all():
-                    returned_string += option.text + u"\n"
+                    lines.append(option.text + u"\n")
 
-        return returned_string
+        return u"".join(lines)
 
     @classmethod
     def _build_feedback_cell(cls, submission_uuid):
@@ -435,6 +695,9 @@ class OraAggregateData(object):
         """
         Query database for aggregated ora2 response data.
 
+        This loads every row into memory; use `iter_ora2_data` to process
+        the rows one at a time.
+
         Args:
             course_id (string) - the course id of the course whose data we would like to return
 
@@ -446,25 +709,43 @@ class OraAggregateData(object):
                 for this course.
 
         """
+        return list(cls.HEADER), list(cls.iter_ora2_data(course_id))
+
+    @classmethod
+    def iter_ora2_data(cls, course_id):
+        """
+        Query database for aggregated ora2 response data, one submission at a time.
 
+        The rows are the same as those returned by `collect_ora2_data`,
+        with the columns described by `HEADER`.
+
+        Args:
+            course_id (string) - the course id of the course whose data we would like to return
+
+        Yields:
+            list: a row in the table of all the data for this course.
+
+        """
         all_submission_information = sub_api.get_all_course_submission_information(course_id, 'openassessment')
 
-        rows = []
         for student_item, submission, score in all_submission_information:
-            row = []
-            assessments = cls._use_read_replica(
-                Assessment.objects.prefetch_related('parts').
+            assessments = list(cls._use_read_replica(
+                Assessment.objects.prefetch_related(
+                    'parts__criterion',
+                    'parts__option',
+                    'assessment_feedback__options',
+                ).
                 prefetch_related('rubric').
                 filter(
                     submission_uuid=submission['uuid']
                 )
-            )
+            ))
             assessments_cell = cls._build_assessments_cell(assessments)
             assessments_parts_cell = cls._build_assessments_parts_cell(assessments)
             feedback_options_cell = cls._build_feedback_options_cell(assessments)
             feedback_cell = cls._build_feedback_cell(submission['uuid'])
 
-            row = [
+            yield [
                 submission['uuid'],
                 submission['student_item'],
                 student_item['student_id'],
@@ -478,20 +759,3 @@ class OraAggregateData(object):
                 feedback_options_cell,
                 feedback_cell
             ]
-            rows.append(row)
-
-        header = [
-            'Submission ID',
-            'Item ID',
-            'Anonymized Student ID',
-            'Date/Time Response Submitted',
-            'Response',
-            'Assessment Details',
-            'Assessment Scores',
-            'Date/Time Final Score Given',
-            'Final Score Points Earned',
-            'Final Score Points Possible',
-            'Feedback Statements Selected',
-            'Feedback on Peer Assessments'
-        ]
-        return header, rows
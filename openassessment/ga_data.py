@@ -1,6 +1,7 @@
 
 from collections import OrderedDict
 
+from openassessment import cached_sub_api
 from openassessment.assessment.api.peer import PEER_TYPE
 from openassessment.assessment.api.staff import STAFF_TYPE
 from openassessment.assessment.models import Assessment, PeerWorkflow, PeerWorkflowItem
@@ -116,7 +117,7 @@ class OraAggregateData(object):
             # Note: 'parts' is added as top-level domain of 'raw_answer' since Cypress
             # Currently, get only the first text from a list of answer parts
             answer_text = raw_answer['parts'][0]['text'] if 'parts' in raw_answer else raw_answer['text']
-            latest_score = sub_api.get_latest_score_for_submission(submission['uuid'])
+            latest_score = cached_sub_api.get_latest_score_for_submission(submission['uuid'])
 
             row = [
                 user.username,
@@ -0,0 +1,85 @@
+"""
+Add the staff step to assessment workflows created before it existed.
+"""
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from openassessment.workflow.models import AssessmentWorkflow, AssessmentWorkflowStep
+
+
+class Command(BaseCommand):
+    """
+    Add a staff step to every assessment workflow that doesn't have one,
+    so that staff can override the workflow's score.
+
+    The staff step becomes the first step of the workflow, and is marked
+    as assessed, since staff assessment is optional for these workflows.
+    Workflows are processed in batches, each in a single transaction.
+    """
+
+    help = 'Add the staff step to assessment workflows created before it existed'
+    args = '[<COURSE_ID> [<ITEM_ID>]]'
+
+    option_list = BaseCommand.option_list + (
+        make_option('-b', '--batch-size',
+                    action='store', dest='batch_size', type='int', default=500,
+                    help="Number of workflows to update per transaction"),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Execute the command.
+
+        Args:
+            course_id (unicode): Optionally restrict the update to a course.
+            item_id (unicode): Optionally restrict the update to an item in the course.
+        """
+        workflows = AssessmentWorkflow.objects.exclude(steps__name=AssessmentWorkflow.STATUS.staff)
+        if len(args) > 0:
+            workflows = workflows.filter(course_id=args[0])
+        if len(args) > 1:
+            workflows = workflows.filter(item_id=args[1])
+
+        batch_size = options.get('batch_size') or 500
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(
+                workflows.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            self._add_staff_steps(batch)
+            last_id = batch[-1]
+            total += len(batch)
+            self.stdout.write(u"Added the staff step to {} workflows".format(total))
+
+    @transaction.atomic
+    def _add_staff_steps(self, workflow_ids):
+        """
+        Add a staff step to the start of each workflow.
+
+        Args:
+            workflow_ids (list of int): The IDs of the workflows to update.
+
+        Returns:
+            None
+        """
+        AssessmentWorkflowStep.objects.filter(
+            workflow_id__in=workflow_ids
+        ).update(order_num=F('order_num') + 1)
+
+        timestamp = now()
+        AssessmentWorkflowStep.objects.bulk_create([
+            AssessmentWorkflowStep(
+                workflow_id=workflow_id,
+                name=AssessmentWorkflow.STATUS.staff,
+                order_num=0,
+                assessment_completed_at=timestamp,
+            )
+            for workflow_id in workflow_ids
+        ])
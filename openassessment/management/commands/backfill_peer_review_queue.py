@@ -0,0 +1,95 @@
+"""
+Load existing peer workflows into the peer review queue.
+"""
+from collections import defaultdict
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from openassessment.assessment.models import PeerWorkflow, PeerWorkflowItem, PeerReviewQueueEntry
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the peer review queue entries for every peer workflow that is
+    still waiting to receive assessments.  The queue is first loaded by a
+    migration; this rebuilds it, for example if it has drifted from the
+    workflow items.
+
+    Workflows are processed in batches; each batch is rebuilt in a single
+    transaction with one query for the workflows and one for their items.
+    """
+
+    help = 'Load existing peer workflows into the peer review queue'
+    args = '[<COURSE_ID> [<ITEM_ID>]]'
+
+    option_list = BaseCommand.option_list + (
+        make_option('-b', '--batch-size',
+                    action='store', dest='batch_size', type='int', default=500,
+                    help="Number of peer workflows to load per transaction"),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Execute the command.
+
+        Args:
+            course_id (unicode): Optionally restrict the backfill to a course.
+            item_id (unicode): Optionally restrict the backfill to an item in the course.
+        """
+        workflows = PeerWorkflow.objects.filter(grading_completed_at=None, cancelled_at=None)
+        if len(args) > 0:
+            workflows = workflows.filter(course_id=args[0])
+        if len(args) > 1:
+            workflows = workflows.filter(item_id=args[1])
+
+        batch_size = options.get('batch_size') or 500
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(workflows.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            self._load_batch(batch)
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write(u"Loaded {} peer workflows into the review queue".format(total))
+
+    @transaction.atomic
+    def _load_batch(self, workflows):
+        """
+        Replace the queue entries for a batch of workflows.
+
+        Args:
+            workflows (list of PeerWorkflow): The workflows to load.
+
+        Returns:
+            None
+        """
+        items_by_author = defaultdict(list)
+        items = PeerWorkflowItem.objects.filter(author__in=workflows).values_list(
+            'author_id', 'assessment_id', 'started_at'
+        )
+        for author_id, assessment_id, started_at in items:
+            items_by_author[author_id].append((assessment_id, started_at))
+
+        entries = []
+        for workflow in workflows:
+            completed_count, leased_count, lease_expires_at = PeerReviewQueueEntry.summarize_items(
+                items_by_author[workflow.id]
+            )
+            entries.append(PeerReviewQueueEntry(
+                author=workflow,
+                student_id=workflow.student_id,
+                item_id=workflow.item_id,
+                course_id=workflow.course_id,
+                submission_uuid=workflow.submission_uuid,
+                created_at=workflow.created_at,
+                completed_count=completed_count,
+                leased_count=leased_count,
+                lease_expires_at=lease_expires_at,
+            ))
+
+        PeerReviewQueueEntry.objects.filter(author__in=workflows).delete()
+        PeerReviewQueueEntry.objects.bulk_create(entries)
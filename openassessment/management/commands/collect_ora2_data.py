@@ -51,13 +51,17 @@ class Command(BaseCommand):
         else:
             csv_file = self.stdout
 
-        writer = csv.writer(csv_file, dialect='excel', quotechar='"', quoting=csv.QUOTE_ALL)
-
-        header, rows = OraAggregateData.collect_ora2_data(course_id)
-
-        writer.writerow(header)
-        for row in rows:
-            writer.writerow(_encode_row(row))
+        try:
+            writer = csv.writer(csv_file, dialect='excel', quotechar='"', quoting=csv.QUOTE_ALL)
+
+            # Write each row as soon as it is built, rather than holding
+            # every submission of the course in memory.
+            writer.writerow(OraAggregateData.HEADER)
+            for row in OraAggregateData.iter_ora2_data(course_id):
+                writer.writerow(_encode_row(row))
+        finally:
+            if options['output_dir']:
+                csv_file.close()
 
 
 def _encode_row(data_list):
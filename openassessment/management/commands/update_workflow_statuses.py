@@ -0,0 +1,66 @@
+"""
+Refresh the status of every assessment workflow for an item.
+"""
+from collections import Counter
+import json
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from openassessment.workflow import api as workflow_api
+from openassessment.workflow.errors import AssessmentWorkflowError
+
+
+class Command(BaseCommand):
+    """
+    Update the status of the assessment workflows for an item, for example
+    after its requirements have changed, or from a periodic job.
+
+    The requirements are those the item passes to the workflow API, as JSON
+    (for example, '{"peer": {"must_grade": 5, "must_be_graded_by": 3}}').
+    The workflows are updated in batches (see `update_from_assessments_batch`).
+    """
+
+    help = 'Refresh the status of the assessment workflows for an item'
+    args = '<COURSE_ID> <ITEM_ID> <REQUIREMENTS_JSON>'
+
+    option_list = BaseCommand.option_list + (
+        make_option('-s', '--submission-uuid',
+                    action='append', dest='submission_uuids', default=None,
+                    help="Only update the workflow for this submission (can be repeated)"),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Execute the command.
+
+        Args:
+            course_id (unicode): The ID of the course.
+            item_id (unicode): The ID of the item in the course.
+            requirements (unicode): The item's assessment requirements, as JSON.
+
+        Raises:
+            CommandError
+
+        """
+        if len(args) < 3:
+            raise CommandError(u'Usage: update_workflow_statuses {}'.format(self.args))
+
+        course_id, item_id = args[0].decode('utf-8'), args[1].decode('utf-8')
+        try:
+            requirements = json.loads(args[2])
+        except ValueError:
+            raise CommandError(u'The requirements must be a JSON object')
+        if not isinstance(requirements, dict):
+            raise CommandError(u'The requirements must be a JSON object')
+
+        try:
+            statuses = workflow_api.update_from_assessments_batch(
+                course_id, item_id, requirements, submission_uuids=options.get('submission_uuids')
+            )
+        except AssessmentWorkflowError as ex:
+            raise CommandError(u'Could not update the workflows: {}'.format(ex))
+
+        self.stdout.write(u"Updated {} workflows".format(len(statuses)))
+        for status, count in sorted(Counter(statuses.values()).iteritems()):
+            self.stdout.write(u"{}: {}".format(status, count))
@@ -5,29 +5,62 @@ import sys
 import os
 import os.path
 import datetime
+import glob
+import json
 import shutil
 import tempfile
 import tarfile
+import csv
+import multiprocessing
+from optparse import make_option
 import boto
 from boto.s3.key import Key
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.db import connections
 from openassessment.data import CsvWriter
 
 
 class Command(BaseCommand):
     """
     Create and upload CSV files for submission and assessment data.
+
+    If an output directory is given, the export records a checkpoint in it
+    after each chunk of submissions, and running the command again with the
+    same directory resumes the export from the last checkpoint.
+
+    With more than one process, the course's submissions are split into
+    shards which are exported in parallel and then merged in order.
     """
 
     help = 'Create and upload CSV files for submission and assessment data.'
     args = '<COURSE_ID> <S3_BUCKET_NAME>'
 
+    option_list = BaseCommand.option_list + (
+        make_option('-p', '--page-size',
+                    action='store', dest='page_size', type='int', default=None,
+                    help="Number of submissions to load from the database at a time"),
+        make_option('-o', '--output-dir',
+                    action='store', dest='output_dir', default=None,
+                    help="Directory to write the CSV files to, kept so that a failed export can be resumed"),
+        make_option('--part-files',
+                    action='store_true', dest='part_files', default=False,
+                    help="Write each chunk of submissions to separate files, concatenated at the end"),
+        make_option('-n', '--processes',
+                    action='store', dest='processes', type='int', default=None,
+                    help="Number of processes exporting shards of the course's submissions in parallel"),
+    )
+
     OUTPUT_CSV_PATHS = {
         output_name: "{}.csv".format(output_name)
         for output_name in CsvWriter.MODELS
     }
 
+    CHECKPOINT_PATH = "checkpoint.json"
+    SHARD_DIR = "shard{index:04d}"
+    PART_PATH = "{name}.part{index:06d}.csv"
+    PART_PATTERN = "{name}.part*.csv"
+
     URL_EXPIRATION_HOURS = 24
     PROGRESS_INTERVAL = 10
 
@@ -63,39 +96,387 @@ class Command(BaseCommand):
             raise CommandError(u'Usage: upload_oa_data {}'.format(self.args))
 
         course_id, s3_bucket = args[0].decode('utf-8'), args[1].decode('utf-8')
-        csv_dir = tempfile.mkdtemp()
+        processes = options.get('processes')
+        if processes is not None and processes < 1:
+            raise CommandError(u'The number of processes must be at least 1')
+        if processes is not None and options.get('part_files'):
+            raise CommandError(u'--processes cannot be used with --part-files')
+
+        output_dir = options.get('output_dir')
+        if output_dir:
+            csv_dir = output_dir
+            if not os.path.isdir(csv_dir):
+                os.makedirs(csv_dir)
+        else:
+            csv_dir = tempfile.mkdtemp()
 
         try:
             print u"Generating CSV files for course '{}'".format(course_id)
-            self._dump_to_csv(course_id, csv_dir)
+            self._dump_to_csv(
+                course_id, csv_dir, options.get('page_size'),
+                part_files=options.get('part_files', False), processes=processes
+            )
             print u"Creating archive of CSV files in {}".format(csv_dir)
             archive_path = self._create_archive(csv_dir)
             print u"Uploading {} to {}/{}".format(archive_path, s3_bucket, course_id)
             url = self._upload(course_id, archive_path, s3_bucket)
             print "== Upload successful =="
             print u"Download URL (expires in {} hours):\n{}".format(self.URL_EXPIRATION_HOURS, url)
+
+            # The export is finished, so running the command again starts a new one
+            os.remove(os.path.join(csv_dir, self.CHECKPOINT_PATH))
         finally:
             # Assume that the archive was created in the directory,
             # so to clean up we just need to delete the directory.
-            shutil.rmtree(csv_dir)
+            # An output directory is kept, so that the export can be resumed.
+            if not output_dir:
+                shutil.rmtree(csv_dir)
 
-    def _dump_to_csv(self, course_id, csv_dir):
+    def _dump_to_csv(self, course_id, csv_dir, page_size=None, part_files=False, processes=None):
         """
         Create CSV files for submission/assessment data in a directory.
 
+        A checkpoint is recorded in the directory after each chunk of submissions.
+        If the directory already contains a checkpoint, the export resumes from it:
+        any rows written after the checkpoint are discarded, and writing continues
+        with the next chunk.
+
         Args:
             course_id (unicode): The ID of the course to dump data from.
             csv_dir (unicode): The absolute path to the directory in which to create CSV files.
+            page_size (int): Number of submissions to load from the database at a time.
+            part_files (bool): If True, write each chunk to separate part files,
+                which are concatenated once every chunk has been written.
+            processes (int): If given, split the export into this many shards,
+                exported in parallel by this many processes.
 
         Returns:
             None
+
+        Raises:
+            CommandError
+
+        """
+        checkpoint = self._load_checkpoint(csv_dir, course_id)
+        if checkpoint is not None and checkpoint['complete']:
+            print u"CSV files were already generated, skipping to the upload"
+            return
+        elif checkpoint is not None:
+            print u"Resuming the export from the last checkpoint"
+        else:
+            checkpoint = {
+                'course_id': course_id,
+                'writer': None,
+                'part_files': part_files,
+                'offsets': None,
+                'parts': None,
+                'shards': None,
+                'complete': False,
+            }
+
+        if checkpoint.get('shards') is not None:
+            # A sharded export is resumed with its original shards
+            self._dump_to_shards(course_id, csv_dir, page_size, len(checkpoint['shards']), processes or 1, checkpoint)
+        elif processes is not None:
+            if checkpoint['writer'] is not None:
+                raise CommandError(
+                    u"The export in {} was started without --processes, so it can't be resumed in parallel".format(
+                        csv_dir
+                    )
+                )
+            self._dump_to_shards(course_id, csv_dir, page_size, processes, processes, checkpoint)
+        elif checkpoint['writer'] is not None and checkpoint.get('part_files', False) != part_files:
+            # The rows written so far are in the files of the mode the export was started in
+            raise CommandError(
+                u"The export in {dir} was started {mode} --part-files, so it must be resumed {mode} it".format(
+                    dir=csv_dir, mode=u"with" if checkpoint.get('part_files') else u"without"
+                )
+            )
+        elif part_files:
+            self._dump_to_part_files(course_id, csv_dir, page_size, checkpoint)
+        else:
+            self._dump_to_files(course_id, csv_dir, page_size, checkpoint)
+
+    def _dump_to_files(self, course_id, csv_dir, page_size, checkpoint):
         """
+        Write CSV files, recording the size of each file at every checkpoint.
+
+        Args:
+            course_id (unicode): The ID of the course to dump data from.
+            csv_dir (unicode): The absolute path to the directory in which to create CSV files.
+            page_size (int): Number of submissions to load from the database at a time.
+            checkpoint (dict): The checkpoint to resume from.
+
+        Returns:
+            None
+
+        """
+        if checkpoint['offsets'] is not None:
+            # Discard anything written after the checkpoint
+            for name, rel_path in self.OUTPUT_CSV_PATHS.iteritems():
+                with open(os.path.join(csv_dir, rel_path), 'r+b') as csv_file:
+                    csv_file.truncate(checkpoint['offsets'][name])
+            mode = 'ab'
+        else:
+            mode = 'wb'
+
         output_streams = {
-            name: open(os.path.join(csv_dir, rel_path), 'w')
+            name: open(os.path.join(csv_dir, rel_path), mode)
             for name, rel_path in self.OUTPUT_CSV_PATHS.iteritems()
         }
-        csv_writer = CsvWriter(output_streams, self._progress_callback)
-        csv_writer.write_to_csv(course_id)
+
+        def _checkpoint_callback(writer_checkpoint):  # pylint: disable=missing-docstring
+            for output_stream in output_streams.values():
+                output_stream.flush()
+            checkpoint['writer'] = writer_checkpoint
+            checkpoint['offsets'] = {
+                name: output_stream.tell()
+                for name, output_stream in output_streams.iteritems()
+            }
+            self._save_checkpoint(csv_dir, checkpoint)
+
+        try:
+            csv_writer = CsvWriter(output_streams, self._progress_callback, page_size=page_size)
+            csv_writer.write_to_csv(
+                course_id, checkpoint=checkpoint['writer'], checkpoint_callback=_checkpoint_callback
+            )
+        finally:
+            for output_stream in output_streams.values():
+                output_stream.close()
+
+        checkpoint['complete'] = True
+        self._save_checkpoint(csv_dir, checkpoint)
+
+    def _dump_to_part_files(self, course_id, csv_dir, page_size, checkpoint):
+        """
+        Write each chunk of submissions to separate part files, then concatenate them.
+
+        Args:
+            course_id (unicode): The ID of the course to dump data from.
+            csv_dir (unicode): The absolute path to the directory in which to create CSV files.
+            page_size (int): Number of submissions to load from the database at a time.
+            checkpoint (dict): The checkpoint to resume from.
+
+        Returns:
+            None
+
+        """
+        # Discard any part files written after the checkpoint
+        num_parts = checkpoint['parts'] or 0
+        for name in self.OUTPUT_CSV_PATHS:
+            for part_path in self._part_paths(csv_dir, name)[num_parts:]:
+                os.remove(part_path)
+
+        def _open_part(index):  # pylint: disable=missing-docstring
+            return {
+                name: open(os.path.join(csv_dir, self.PART_PATH.format(name=name, index=index)), 'wb')
+                for name in self.OUTPUT_CSV_PATHS
+            }
+
+        output_streams = _open_part(num_parts)
+
+        def _checkpoint_callback(writer_checkpoint):  # pylint: disable=missing-docstring
+            for output_stream in output_streams.values():
+                output_stream.close()
+            checkpoint['writer'] = writer_checkpoint
+            checkpoint['parts'] = (checkpoint['parts'] or 0) + 1
+            self._save_checkpoint(csv_dir, checkpoint)
+
+            output_streams.update(_open_part(checkpoint['parts']))
+            csv_writer.set_output_streams(output_streams)
+
+        try:
+            csv_writer = CsvWriter(output_streams, self._progress_callback, page_size=page_size)
+            csv_writer.write_to_csv(
+                course_id, checkpoint=checkpoint['writer'], checkpoint_callback=_checkpoint_callback
+            )
+        finally:
+            for output_stream in output_streams.values():
+                output_stream.close()
+
+        for name, rel_path in self.OUTPUT_CSV_PATHS.iteritems():
+            with open(os.path.join(csv_dir, rel_path), 'wb') as csv_file:
+                for part_path in self._part_paths(csv_dir, name):
+                    with open(part_path, 'rb') as part_file:
+                        shutil.copyfileobj(part_file, csv_file)
+
+        checkpoint['complete'] = True
+        self._save_checkpoint(csv_dir, checkpoint)
+
+        for name in self.OUTPUT_CSV_PATHS:
+            for part_path in self._part_paths(csv_dir, name):
+                os.remove(part_path)
+
+    def _dump_to_shards(self, course_id, csv_dir, page_size, num_shards, processes, checkpoint):
+        """
+        Export shards of the course's submissions in parallel, then merge them in order.
+
+        Each shard is written to its own subdirectory, with its own checkpoint,
+        so an interrupted export resumes every unfinished shard.
+
+        Args:
+            course_id (unicode): The ID of the course to dump data from.
+            csv_dir (unicode): The absolute path to the directory in which to create CSV files.
+            page_size (int): Number of submissions to load from the database at a time.
+            num_shards (int): The number of shards to split the export into.
+            processes (int): The number of processes exporting shards.
+            checkpoint (dict): The checkpoint to resume from.
+
+        Returns:
+            None
+
+        """
+        if checkpoint.get('shards') is None:
+            checkpoint['shards'] = CsvWriter({}).shard_checkpoints(course_id, num_shards)
+            self._save_checkpoint(csv_dir, checkpoint)
+
+        shard_dirs = []
+        for index in range(len(checkpoint['shards'])):
+            shard_dir = os.path.join(csv_dir, self.SHARD_DIR.format(index=index))
+            if not os.path.isdir(shard_dir):
+                os.mkdir(shard_dir)
+            shard_dirs.append(shard_dir)
+
+        tasks = [
+            (course_id, shard_dir, page_size, shard)
+            for shard_dir, shard in zip(shard_dirs, checkpoint['shards'])
+        ]
+        if processes > 1:
+            # Each worker process opens its own database connections,
+            # rather than sharing the connections of this process.
+            connections.close_all()
+            pool = multiprocessing.Pool(processes)
+            try:
+                pool.map(_dump_shard, tasks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for task in tasks:
+                _dump_shard(task, command=self)
+
+        self._merge_shards(csv_dir, shard_dirs)
+        checkpoint['complete'] = True
+        self._save_checkpoint(csv_dir, checkpoint)
+
+        for shard_dir in shard_dirs:
+            shutil.rmtree(shard_dir)
+
+    def _merge_shards(self, csv_dir, shard_dirs):
+        """
+        Concatenate the CSV files of each shard, in order.
+
+        Every shard lists the feedback options it has seen,
+        so each feedback option is written once, ordered by ID.
+
+        Args:
+            csv_dir (unicode): The absolute path to the directory in which to create CSV files.
+            shard_dirs (list of unicode): The absolute paths to the directories of the shards.
+
+        Returns:
+            None
+
+        """
+        for name, rel_path in self.OUTPUT_CSV_PATHS.iteritems():
+            with open(os.path.join(csv_dir, rel_path), 'wb') as csv_file:
+                if name == 'assessment_feedback_option':
+                    self._merge_feedback_options(csv_file, shard_dirs, rel_path)
+                    continue
+                for shard_dir in shard_dirs:
+                    with open(os.path.join(shard_dir, rel_path), 'rb') as shard_file:
+                        shutil.copyfileobj(shard_file, csv_file)
+
+    def _merge_feedback_options(self, csv_file, shard_dirs, rel_path):
+        """
+        Write the feedback options listed by every shard, without duplicates.
+
+        Args:
+            csv_file (file): The file to write to.
+            shard_dirs (list of unicode): The absolute paths to the directories of the shards.
+            rel_path (unicode): The path of the feedback option CSV file in each shard directory.
+
+        Returns:
+            None
+
+        """
+        header, rows = None, {}
+        for index, shard_dir in enumerate(shard_dirs):
+            with open(os.path.join(shard_dir, rel_path), 'rb') as shard_file:
+                reader = csv.reader(shard_file)
+                if index == 0:
+                    header = next(reader, None)
+                for row in reader:
+                    rows[int(row[0])] = row
+
+        writer = csv.writer(csv_file)
+        if header is not None:
+            writer.writerow(header)
+        for option_id in sorted(rows):
+            writer.writerow(rows[option_id])
+
+    def _part_paths(self, csv_dir, name):
+        """
+        Find the part files for an output, in order.
+
+        Args:
+            csv_dir (unicode): The absolute path to the directory containing the part files.
+            name (unicode): The name of the output.
+
+        Returns:
+            list of unicode: Absolute paths to the part files.
+
+        """
+        return sorted(glob.glob(os.path.join(csv_dir, self.PART_PATTERN.format(name=name))))
+
+    def _load_checkpoint(self, csv_dir, course_id):
+        """
+        Load the checkpoint recorded in a directory.
+
+        Args:
+            csv_dir (unicode): The absolute path to the directory containing the CSV files.
+            course_id (unicode): The ID of the course being exported.
+
+        Returns:
+            dict, or None if the directory doesn't contain a checkpoint.
+
+        Raises:
+            CommandError
+
+        """
+        checkpoint_path = os.path.join(csv_dir, self.CHECKPOINT_PATH)
+        if not os.path.exists(checkpoint_path):
+            return None
+
+        with open(checkpoint_path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+
+        if checkpoint['course_id'] != course_id:
+            raise CommandError(
+                u"{} contains an unfinished export for course '{}'".format(csv_dir, checkpoint['course_id'])
+            )
+        return checkpoint
+
+    def _save_checkpoint(self, csv_dir, checkpoint):
+        """
+        Record a checkpoint in a directory.
+
+        The checkpoint is written to a temporary file which then replaces
+        the previous checkpoint, so a crash never leaves a partial checkpoint.
+
+        Args:
+            csv_dir (unicode): The absolute path to the directory containing the CSV files.
+            checkpoint (dict): The checkpoint to record.
+
+        Returns:
+            None
+
+        """
+        checkpoint_path = os.path.join(csv_dir, self.CHECKPOINT_PATH)
+        with open(checkpoint_path + ".tmp", 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.rename(checkpoint_path + ".tmp", checkpoint_path)
 
     def _create_archive(self, dir_path):
         """
@@ -159,3 +540,40 @@ class Command(BaseCommand):
         if self._submission_counter > 0 and self._submission_counter % self.PROGRESS_INTERVAL == 0:
             sys.stdout.write('.')
             sys.stdout.flush()
+
+
+def _dump_shard(task, command=None):
+    """
+    Export a shard of a course's submissions, resuming from the shard's checkpoint.
+
+    This is a module-level function so that it can be run by a process pool.
+
+    Args:
+        task (tuple): The course ID, the absolute path to the shard's directory,
+            the page size, and the writer checkpoint of the shard
+            (see `CsvWriter.shard_checkpoints`).
+
+    Keyword Arguments:
+        command (Command): The command to report progress to.
+            If not given, a new command is created.
+
+    Returns:
+        None
+
+    """
+    course_id, shard_dir, page_size, shard = task
+    if command is None:
+        command = Command()
+
+    checkpoint = command._load_checkpoint(shard_dir, course_id)  # pylint: disable=protected-access
+    if checkpoint is None:
+        checkpoint = {
+            'course_id': course_id,
+            'writer': shard,
+            'offsets': None,
+            'parts': None,
+            'shards': None,
+            'complete': False,
+        }
+    if not checkpoint['complete']:
+        command._dump_to_files(course_id, shard_dir, page_size, checkpoint)  # pylint: disable=protected-access
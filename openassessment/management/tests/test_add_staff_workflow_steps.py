@@ -0,0 +1,46 @@
+"""
+Tests for the management command that adds the staff step to old workflows.
+"""
+from submissions import api as sub_api
+from openassessment.management.commands import add_staff_workflow_steps
+from openassessment.test_utils import CacheResetTest
+from openassessment.workflow import api as workflow_api
+from openassessment.workflow.models import AssessmentWorkflow
+
+
+class AddStaffWorkflowStepsTest(CacheResetTest):
+
+    STUDENT_ITEM = {
+        'student_id': 'test_student',
+        'course_id': 'test_course',
+        'item_type': 'openassessment',
+        'item_id': 'test_item'
+    }
+
+    def _create_workflow(self, student_id):
+        student_item = dict(self.STUDENT_ITEM, student_id=student_id)
+        submission = sub_api.create_submission(student_item, 'test answer')
+        workflow_api.create_workflow(submission['uuid'], ['self'])
+        return AssessmentWorkflow.objects.get(submission_uuid=submission['uuid'])
+
+    def _step_names(self, workflow):
+        return list(workflow.steps.order_by('order_num').values_list('name', flat=True))
+
+    def test_add_staff_steps(self):
+        old_workflow = self._create_workflow('Tim')
+        new_workflow = self._create_workflow('Bob')
+
+        # Simulate a workflow created before the staff step existed
+        old_workflow.steps.filter(name='staff').delete()
+        old_workflow.steps.update(order_num=0)
+
+        cmd = add_staff_workflow_steps.Command()
+        cmd.handle(batch_size=1)
+
+        self.assertEqual(self._step_names(old_workflow), ['staff', 'self'])
+        self.assertIsNotNone(old_workflow.steps.get(name='staff').assessment_completed_at)
+        self.assertEqual(self._step_names(new_workflow), ['staff', 'self'])
+
+        # Running the command again does nothing
+        cmd.handle()
+        self.assertEqual(self._step_names(old_workflow), ['staff', 'self'])
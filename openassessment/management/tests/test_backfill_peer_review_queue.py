@@ -0,0 +1,56 @@
+"""
+Tests for the management command that loads peer workflows into the review queue.
+"""
+from submissions import api as sub_api
+from openassessment.assessment.api import peer as peer_api
+from openassessment.assessment.models import PeerWorkflow, PeerReviewQueueEntry
+from openassessment.management.commands import backfill_peer_review_queue
+from openassessment.test_utils import CacheResetTest
+
+
+class BackfillPeerReviewQueueTest(CacheResetTest):
+
+    STUDENT_ITEM = {
+        'student_id': 'test_student',
+        'course_id': 'test_course',
+        'item_type': 'openassessment',
+        'item_id': 'test_item'
+    }
+
+    def _create_submission(self, student_id, item_id='test_item'):
+        student_item = dict(self.STUDENT_ITEM, student_id=student_id, item_id=item_id)
+        submission = sub_api.create_submission(student_item, 'test answer')
+        peer_api.on_start(submission['uuid'])
+        return submission
+
+    def test_backfill(self):
+        tim_sub = self._create_submission('Tim')
+        bob_sub = self._create_submission('Bob')
+        sue_sub = self._create_submission('Sue')
+        peer_api.on_cancel(sue_sub['uuid'])
+        peer_api.get_submission_to_assess(tim_sub['uuid'], 3)
+
+        # Simulate workflows created before the queue existed
+        PeerReviewQueueEntry.objects.all().delete()
+
+        cmd = backfill_peer_review_queue.Command()
+        cmd.handle(batch_size=1)
+
+        entries = {entry.student_id: entry for entry in PeerReviewQueueEntry.objects.all()}
+        self.assertItemsEqual(entries.keys(), ['Tim', 'Bob'])
+        self.assertEqual(entries['Bob'].submission_uuid, bob_sub['uuid'])
+        self.assertEqual(entries['Bob'].leased_count, 1)
+        self.assertIsNotNone(entries['Bob'].lease_expires_at)
+        self.assertEqual(entries['Tim'].leased_count, 0)
+
+    def test_backfill_item(self):
+        self._create_submission('Tim')
+        self._create_submission('Bob', item_id='other_item')
+        PeerReviewQueueEntry.objects.all().delete()
+
+        cmd = backfill_peer_review_queue.Command()
+        cmd.handle('test_course', 'other_item')
+
+        entries = PeerReviewQueueEntry.objects.all()
+        self.assertEqual([entry.student_id for entry in entries], ['Bob'])
+        self.assertEqual(entries[0].author, PeerWorkflow.objects.get(student_id='Bob'))
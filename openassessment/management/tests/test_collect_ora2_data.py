@@ -77,13 +77,16 @@ class CollectOra2DataTest(CacheResetTest):
             "\xf0\x9d\x93\xa8\xf0\x9d\x93\xb8\xf0\x9d\x93\xbe",
         ]
 
-    @patch('openassessment.management.commands.collect_ora2_data.OraAggregateData.collect_ora2_data')
+    @patch('openassessment.management.commands.collect_ora2_data.OraAggregateData.iter_ora2_data')
     def test_valid_data_output_to_file(self, mock_data):
         """ Verify that management command writes valid ORA2 data to file. """
 
-        mock_data.return_value = (self.test_header, self.test_rows)
+        mock_data.return_value = iter(self.test_rows)
 
-        with patch('openassessment.management.commands.collect_ora2_data.csv') as mock_write:
+        header_patch = patch(
+            'openassessment.management.commands.collect_ora2_data.OraAggregateData.HEADER', self.test_header
+        )
+        with header_patch, patch('openassessment.management.commands.collect_ora2_data.csv') as mock_write:
             call_command('collect_ora2_data', self.COURSE_ID)
 
             mock_writerow = mock_write.writer.return_value.writerow
@@ -91,3 +94,25 @@ class CollectOra2DataTest(CacheResetTest):
             mock_writerow.assert_any_call(self.test_header)
             mock_writerow.assert_any_call(self.test_rows[0])
             mock_writerow.assert_any_call(self.unicode_encoded_row)
+
+    def test_rows_written_incrementally(self):
+        """ Verify that each row is written before the next one is built. """
+
+        with patch('openassessment.management.commands.collect_ora2_data.csv') as mock_write:
+            mock_writerow = mock_write.writer.return_value.writerow
+            rows_written = []
+
+            def _iter_rows(course_id):  # pylint: disable=missing-docstring,unused-argument
+                for row in self.test_rows:
+                    rows_written.append(mock_writerow.call_count)
+                    yield row
+
+            with patch(
+                'openassessment.management.commands.collect_ora2_data.OraAggregateData.iter_ora2_data',
+                side_effect=_iter_rows
+            ):
+                call_command('collect_ora2_data', self.COURSE_ID)
+
+            # The header, then one row at a time
+            self.assertEqual(rows_written, [1, 2])
+            self.assertEqual(mock_writerow.call_count, 3)
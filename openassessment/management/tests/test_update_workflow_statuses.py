@@ -0,0 +1,66 @@
+"""
+Tests for the management command that refreshes the status of workflows for an item.
+"""
+import json
+from StringIO import StringIO
+
+from django.core.management.base import CommandError
+from django.db import DatabaseError
+import mock
+from submissions import api as sub_api
+from openassessment.management.commands import update_workflow_statuses
+from openassessment.test_utils import CacheResetTest
+from openassessment.workflow import api as workflow_api
+from openassessment.workflow.models import AssessmentWorkflow
+
+
+class UpdateWorkflowStatusesTest(CacheResetTest):
+
+    STUDENT_ITEM = {
+        'student_id': 'test_student',
+        'course_id': 'test_course',
+        'item_type': 'openassessment',
+        'item_id': 'test_item'
+    }
+
+    def _create_workflow(self, student_id, steps):
+        student_item = dict(self.STUDENT_ITEM, student_id=student_id)
+        submission = sub_api.create_submission(student_item, 'test answer')
+        workflow_api.create_workflow(submission['uuid'], steps)
+        return AssessmentWorkflow.objects.get(submission_uuid=submission['uuid'])
+
+    def _call(self, *args, **options):
+        cmd = update_workflow_statuses.Command()
+        cmd.stdout = StringIO()
+        cmd.handle(*args, **options)
+        return cmd.stdout.getvalue()
+
+    def test_update_statuses(self):
+        tim = self._create_workflow('Tim', ['peer', 'self'])
+        bob = self._create_workflow('Bob', ['peer', 'self'])
+
+        # Once the item no longer requires peer assessments, both students move on
+        requirements = json.dumps({'peer': {'must_grade': 0, 'must_be_graded_by': 0}})
+        output = self._call('test_course', 'test_item', requirements, submission_uuids=[tim.submission_uuid])
+        self.assertEqual(AssessmentWorkflow.objects.get(id=tim.id).status, 'self')
+        self.assertEqual(AssessmentWorkflow.objects.get(id=bob.id).status, 'peer')
+        self.assertIn(u"Updated 1 workflows", output)
+
+        output = self._call('test_course', 'test_item', requirements)
+        self.assertEqual(AssessmentWorkflow.objects.get(id=bob.id).status, 'self')
+        self.assertIn(u"self: 2", output)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(CommandError):
+            self._call('test_course', 'test_item')
+        with self.assertRaises(CommandError):
+            self._call('test_course', 'test_item', 'not json')
+        with self.assertRaises(CommandError):
+            self._call('test_course', 'test_item', '[]')
+
+    @mock.patch.object(AssessmentWorkflow, 'update_from_assessments_batch')
+    def test_database_error(self, mock_update):
+        self._create_workflow('Tim', ['staff'])
+        mock_update.side_effect = DatabaseError("Oh no!")
+        with self.assertRaises(CommandError):
+            self._call('test_course', 'test_item', '{}')
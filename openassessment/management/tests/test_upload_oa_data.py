@@ -2,11 +2,17 @@
 """
 Tests for management command that uploads submission/assessment data.
 """
+import os.path
+import shutil
 from StringIO import StringIO
 import tarfile
+import tempfile
 import boto
+import ddt
+import mock
 import moto
-from openassessment.test_utils import CacheResetTest
+from openassessment.assessment.models import AssessmentFeedback, AssessmentFeedbackOption
+from openassessment.test_utils import CacheResetTest, TransactionCacheResetTest
 from openassessment.management.commands import upload_oa_data
 from openassessment.workflow import api as workflow_api
 from submissions import api as sub_api
@@ -70,3 +76,168 @@ class UploadDataTest(CacheResetTest):
         # Expect that we generated a URL for the bucket
         url = cmd.history[0]['url']
         self.assertIn("https://{}".format(self.BUCKET_NAME), url)
+
+
+@ddt.ddt
+class DumpToCsvTest(TransactionCacheResetTest):
+    """
+    Test resuming the generation of CSV files.
+    """
+
+    COURSE_ID = UploadDataTest.COURSE_ID
+    CSV_NAMES = UploadDataTest.CSV_NAMES
+
+    @ddt.data(False, True)
+    def test_resume_dump(self, part_files):
+        for index in range(25):
+            student_item = {
+                'student_id': "test_user_{}".format(index),
+                'course_id': self.COURSE_ID,
+                'item_id': 'test_item',
+                'item_type': 'openassessment',
+            }
+            submission = sub_api.create_submission(student_item, "test submission {}".format(index))
+            workflow_api.create_workflow(submission['uuid'], ['peer', 'self'])
+            sub_api.set_score(submission['uuid'], index, 25)
+
+        # Export the data in one go
+        expected_dir = self._make_dir()
+        upload_oa_data.Command()._dump_to_csv(  # pylint: disable=protected-access
+            self.COURSE_ID, expected_dir, page_size=10, part_files=part_files
+        )
+
+        # Fail part way through the second chunk of submissions
+        csv_dir = self._make_dir()
+        cmd = upload_oa_data.Command()
+        with mock.patch.object(cmd, '_progress_callback') as mock_progress:
+            mock_progress.side_effect = [None] * 15 + [IOError("Disk full")]
+            with self.assertRaises(IOError):
+                cmd._dump_to_csv(  # pylint: disable=protected-access
+                    self.COURSE_ID, csv_dir, page_size=10, part_files=part_files
+                )
+        self.assertTrue(os.path.exists(os.path.join(csv_dir, cmd.CHECKPOINT_PATH)))
+
+        # Running the export again resumes after the first chunk
+        cmd = upload_oa_data.Command()
+        with mock.patch.object(cmd, '_progress_callback') as mock_progress:
+            cmd._dump_to_csv(  # pylint: disable=protected-access
+                self.COURSE_ID, csv_dir, page_size=10, part_files=part_files
+            )
+            self.assertEqual(mock_progress.call_count, 15)
+
+        for csv_name in self.CSV_NAMES:
+            with open(os.path.join(expected_dir, csv_name)) as expected_file:
+                with open(os.path.join(csv_dir, csv_name)) as csv_file:
+                    self.assertEqual(csv_file.read(), expected_file.read(), msg=csv_name)
+        self.assertEqual(sorted(os.listdir(csv_dir)), sorted(self.CSV_NAMES + [cmd.CHECKPOINT_PATH]))
+
+    @ddt.data(False, True)
+    def test_resume_dump_other_mode(self, part_files):
+        for index in range(15):
+            student_item = {
+                'student_id': "test_user_{}".format(index),
+                'course_id': self.COURSE_ID,
+                'item_id': 'test_item',
+                'item_type': 'openassessment',
+            }
+            submission = sub_api.create_submission(student_item, "test submission {}".format(index))
+            workflow_api.create_workflow(submission['uuid'], ['peer', 'self'])
+
+        # Fail part way through the second chunk of submissions
+        csv_dir = self._make_dir()
+        cmd = upload_oa_data.Command()
+        with mock.patch.object(cmd, '_progress_callback') as mock_progress:
+            mock_progress.side_effect = [None] * 12 + [IOError("Disk full")]
+            with self.assertRaises(IOError):
+                cmd._dump_to_csv(  # pylint: disable=protected-access
+                    self.COURSE_ID, csv_dir, page_size=10, part_files=part_files
+                )
+        files_before = {
+            file_name: open(os.path.join(csv_dir, file_name), 'rb').read()
+            for file_name in os.listdir(csv_dir)
+        }
+
+        # The export can't be resumed with the other mode, which would lose the rows written so far
+        with self.assertRaises(upload_oa_data.CommandError):
+            upload_oa_data.Command()._dump_to_csv(  # pylint: disable=protected-access
+                self.COURSE_ID, csv_dir, page_size=10, part_files=not part_files
+            )
+        files_after = {
+            file_name: open(os.path.join(csv_dir, file_name), 'rb').read()
+            for file_name in os.listdir(csv_dir)
+        }
+        self.assertEqual(files_after, files_before)
+
+    def test_resume_sharded_dump(self):
+        options = [AssessmentFeedbackOption.objects.create(text=u"option {}".format(index)) for index in range(3)]
+        for index in range(25):
+            student_item = {
+                'student_id': "test_user_{}".format(index),
+                'course_id': self.COURSE_ID,
+                'item_id': 'test_item',
+                'item_type': 'openassessment',
+            }
+            submission = sub_api.create_submission(student_item, "test submission {}".format(index))
+            workflow_api.create_workflow(submission['uuid'], ['peer', 'self'])
+            sub_api.set_score(submission['uuid'], index, 25)
+
+            # Every shard sees the same feedback options
+            feedback = AssessmentFeedback.objects.create(submission_uuid=submission['uuid'])
+            feedback.options.add(options[index % 2], options[2])
+
+        # Export the data in one go
+        expected_dir = self._make_dir()
+        upload_oa_data.Command()._dump_to_csv(  # pylint: disable=protected-access
+            self.COURSE_ID, expected_dir, page_size=4
+        )
+
+        # Fail part way through the second shard
+        csv_dir = self._make_dir()
+        cmd = upload_oa_data.Command()
+        with mock.patch.object(cmd, '_progress_callback') as mock_progress:
+            mock_progress.side_effect = [None] * 10 + [IOError("Disk full")]
+            with self.assertRaises(IOError):
+                cmd._dump_to_shards(  # pylint: disable=protected-access
+                    self.COURSE_ID, csv_dir, 4, 3, 1, {
+                        'course_id': self.COURSE_ID,
+                        'writer': None,
+                        'offsets': None,
+                        'parts': None,
+                        'shards': None,
+                        'complete': False,
+                    }
+                )
+
+        # Running the export again resumes the unfinished shards, with the original shards
+        cmd = upload_oa_data.Command()
+        with mock.patch.object(cmd, '_progress_callback') as mock_progress:
+            cmd._dump_to_csv(self.COURSE_ID, csv_dir, page_size=4, processes=1)  # pylint: disable=protected-access
+            self.assertEqual(mock_progress.call_count, 17)
+
+        for csv_name in self.CSV_NAMES:
+            with open(os.path.join(expected_dir, csv_name)) as expected_file:
+                with open(os.path.join(csv_dir, csv_name)) as csv_file:
+                    self.assertEqual(csv_file.read(), expected_file.read(), msg=csv_name)
+        self.assertEqual(sorted(os.listdir(csv_dir)), sorted(self.CSV_NAMES + [cmd.CHECKPOINT_PATH]))
+
+    def test_sharded_dump_empty_course(self):
+        csv_dir = self._make_dir()
+        upload_oa_data.Command()._dump_to_csv(self.COURSE_ID, csv_dir, processes=2)  # pylint: disable=protected-access
+        with open(os.path.join(csv_dir, "submission.csv")) as csv_file:
+            self.assertEqual(len(csv_file.readlines()), 1)
+
+    def test_resume_other_course(self):
+        csv_dir = self._make_dir()
+        upload_oa_data.Command()._save_checkpoint(  # pylint: disable=protected-access
+            csv_dir, {'course_id': u"other course"}
+        )
+        with self.assertRaises(upload_oa_data.CommandError):
+            upload_oa_data.Command()._dump_to_csv(self.COURSE_ID, csv_dir)  # pylint: disable=protected-access
+
+    def _make_dir(self):
+        """
+        Create a temporary directory, deleted at the end of the test.
+        """
+        dir_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dir_path)
+        return dir_path
@@ -0,0 +1,50 @@
+"""
+Caches that only live for the duration of a single request.
+
+Each request gets its own set of caches, which are discarded when the
+request finishes.  Outside of a request (for example, in management
+commands or Celery tasks), there is no request cache, so callers
+always fall through to the shared cache or the database.
+"""
+import threading
+
+from django.core.signals import request_started, request_finished
+
+
+_REQUEST = threading.local()
+
+
+def get_cache(name):
+    """
+    Retrieve a cache for the current request.
+
+    Args:
+        name (str): The name of the cache, so that different kinds
+            of data are stored separately.
+
+    Returns:
+        dict, or None if we are not handling a request.
+
+    """
+    caches = getattr(_REQUEST, 'caches', None)
+    if caches is None:
+        return None
+    return caches.setdefault(name, {})
+
+
+def start_request(**kwargs):  # pylint: disable=unused-argument
+    """
+    Start a new set of request caches.
+    """
+    _REQUEST.caches = {}
+
+
+def finish_request(**kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the request caches.
+    """
+    _REQUEST.caches = None
+
+
+request_started.connect(start_request, dispatch_uid="openassessment.request_cache.start_request")
+request_finished.connect(finish_request, dispatch_uid="openassessment.request_cache.finish_request")
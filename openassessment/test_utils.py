@@ -6,6 +6,7 @@ from django.test import TestCase, TransactionTestCase
 from openassessment.assessment.models.ai import (
     CLASSIFIERS_CACHE_IN_MEM, CLASSIFIERS_CACHE_IN_FILE
 )
+from openassessment.assessment.models.base import RUBRIC_REGISTRY
 
 
 def _clear_all_caches():
@@ -13,6 +14,7 @@ def _clear_all_caches():
     cache.clear()
     CLASSIFIERS_CACHE_IN_MEM.clear()
     CLASSIFIERS_CACHE_IN_FILE.clear()
+    RUBRIC_REGISTRY.clear()
 
 
 class CacheResetTest(TestCase):
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the request-scoped submissions API memoization.
+"""
+from submissions import api as sub_api
+
+from openassessment import cached_sub_api, request_cache
+from openassessment.test_utils import CacheResetTest
+
+
+STUDENT_ITEM = {
+    'student_id': 'test_student',
+    'course_id': 'test_course',
+    'item_type': 'openassessment',
+    'item_id': 'test_item',
+}
+
+
+class CachedSubmissionsApiTest(CacheResetTest):
+    """
+    Tests for the request-scoped submissions API memoization.
+    """
+
+    def setUp(self):
+        super(CachedSubmissionsApiTest, self).setUp()
+        self.submission = sub_api.create_submission(STUDENT_ITEM, 'test answer')
+        request_cache.start_request()
+        self.addCleanup(request_cache.finish_request)
+
+    def test_get_submission_and_student(self):
+        submission = cached_sub_api.get_submission_and_student(self.submission['uuid'])
+        self.assertEqual(submission['student_item']['student_id'], 'test_student')
+
+        # Within the request, the submission is only retrieved once
+        with self.assertNumQueries(0):
+            cached = cached_sub_api.get_submission_and_student(self.submission['uuid'])
+        self.assertEqual(cached, submission)
+
+        # Each caller gets its own copy
+        cached['answer'] = 'modified'
+        self.assertEqual(cached_sub_api.get_submission(self.submission['uuid'])['answer'], 'test answer')
+        self.assertEqual(cached_sub_api.get_submission_and_student(self.submission['uuid'])['answer'], 'test answer')
+
+    def test_set_score(self):
+        self.assertIs(cached_sub_api.get_latest_score_for_submission(self.submission['uuid']), None)
+        with self.assertNumQueries(0):
+            self.assertIs(cached_sub_api.get_latest_score_for_submission(self.submission['uuid']), None)
+
+        cached_sub_api.set_score(self.submission['uuid'], 3, 4)
+        score = cached_sub_api.get_latest_score_for_submission(self.submission['uuid'])
+        self.assertEqual(score['points_earned'], 3)
+
+        cached_sub_api.reset_score('test_student', 'test_course', 'test_item')
+        cached_sub_api.set_score(self.submission['uuid'], 4, 4)
+        score = cached_sub_api.get_latest_score_for_submission(self.submission['uuid'])
+        self.assertEqual(score['points_earned'], 4)
+
+    def test_outside_request(self):
+        request_cache.finish_request()
+
+        # Without a request cache, every call goes to the submissions API
+        with self.assertNumQueries(2):
+            cached_sub_api.get_latest_score_for_submission(self.submission['uuid'])
+        with self.assertNumQueries(2):
+            cached_sub_api.get_latest_score_for_submission(self.submission['uuid'])
@@ -9,11 +9,15 @@ from unittest import skip
 from StringIO import StringIO
 import csv
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
 import ddt
 from submissions import api as sub_api
 from openassessment.test_utils import TransactionCacheResetTest
 from openassessment.tests.factories import *  # pylint: disable=wildcard-import
 from openassessment.workflow import api as workflow_api
+from openassessment.workflow.models import AssessmentWorkflow
 from openassessment.data import CsvWriter, OraAggregateData
 import openassessment.assessment.api.peer as peer_api
 
@@ -165,6 +169,64 @@ class CsvWriterTest(TransactionCacheResetTest):
         # Check that we have the right number of rows
         self.assertEqual(len(rows), num_submissions)
 
+    def test_queries_per_chunk(self):
+        def _create_submissions(start, stop):
+            for index in range(start, stop):
+                student_item = {
+                    'student_id': "test_user_{}".format(index),
+                    'course_id': 'test_course',
+                    'item_id': 'test_item',
+                    'item_type': 'openassessment',
+                }
+                submission = sub_api.create_submission(student_item, "test submission {}".format(index))
+                workflow_api.create_workflow(submission['uuid'], ['peer', 'self'])
+                sub_api.set_score(submission['uuid'], index, 10)
+
+        def _write_to_csv():
+            output_streams = self._output_streams(CsvWriter.MODELS)
+            writer = CsvWriter(output_streams, page_size=10)
+            with CaptureQueriesContext(connection) as queries:
+                writer.write_to_csv('test_course')
+            return output_streams, len(queries)
+
+        # The number of queries doesn't depend on the number of submissions in a chunk
+        _create_submissions(0, 3)
+        __, few_submissions = _write_to_csv()
+        _create_submissions(3, 10)
+        output_streams, many_submissions = _write_to_csv()
+        self.assertEqual(many_submissions, few_submissions)
+
+        # Every submission and score is written
+        for output_name in ['submission', 'score']:
+            rows = output_streams[output_name].getvalue().split('\n')[1:-1]
+            self.assertEqual(len(rows), 10)
+
+    def test_submission_uuids_keyset_pagination(self):
+        def _create_submission(index):
+            student_item = {
+                'student_id': "test_user_{}".format(index),
+                'course_id': 'test_course',
+                'item_id': 'test_item',
+                'item_type': 'openassessment',
+            }
+            submission = sub_api.create_submission(student_item, "test submission {}".format(index))
+            workflow_api.create_workflow(submission['uuid'], ['peer', 'self'])
+            return submission['uuid']
+
+        # Pages break between workflows created at the same time
+        expected_uuids = [_create_submission(index) for index in range(5)]
+        AssessmentWorkflow.objects.update(created=now())
+
+        # Workflows created during the export are not included
+        writer = CsvWriter({}, page_size=2)
+        submission_uuids = []
+        for submission_uuid in writer._submission_uuids('test_course'):  # pylint: disable=protected-access
+            submission_uuids.append(submission_uuid)
+            if len(submission_uuids) == 1:
+                _create_submission(5)
+
+        self.assertEqual(submission_uuids, expected_uuids)
+
     def test_other_course_id(self):
         # Try a course ID with no submissions
         self._load_fixture('db_fixtures/scored.json')
@@ -4,7 +4,10 @@ Public interface for the Assessment Workflow.
 """
 import logging
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import DatabaseError
+from django.db.models import Count
 
 from openassessment.assessment.errors import PeerAssessmentError, PeerAssessmentInternalError
 from submissions import api as sub_api
@@ -17,6 +20,9 @@ from .errors import (
 
 logger = logging.getLogger(__name__)
 
+# Number of workflows updated together by `update_from_assessments_batch`.
+UPDATE_BATCH_SIZE = 500
+
 
 def create_workflow(submission_uuid, steps, on_init_params=None):
     """Begins a new assessment workflow.
@@ -271,10 +277,80 @@ def update_from_assessments(submission_uuid, assessment_requirements):
         raise AssessmentWorkflowInternalError(err_msg)
 
 
+def update_from_assessments_batch(course_id, item_id, assessment_requirements, submission_uuids=None):
+    """
+    Update the status of many workflows for an item in a course.
+
+    This has the same effect as calling `update_from_assessments()` for each
+    submission, but the state of every step is resolved with a fixed number
+    of set-based queries per batch of workflows, so it can be used to refresh
+    a whole item (for example, after its requirements have changed).
+    The `update_workflow_statuses` management command runs it, for example
+    from a periodic job.
+
+    Args:
+        course_id (unicode): The ID of the course.
+        item_id (unicode): The ID of the item in the course.
+        assessment_requirements (dict): The requirements for the item, as for
+            `update_from_assessments()`.
+
+    Keyword Arguments:
+        submission_uuids (list): Only update the workflows for these submissions.
+            By default, every workflow for the item is updated.
+
+    Returns:
+        dict mapping submission UUIDs to the updated workflow status.
+
+    Raises:
+        AssessmentWorkflowInternalError: Unexpected internal error, such as the
+            submissions app not being available or a database configuation
+            problem.
+
+    Examples:
+        >>> update_from_assessments_batch(
+        ...     "ora2/1/1", "peer-assessment-problem",
+        ...     {"peer": {"must_grade":5, "must_be_graded_by":3}}
+        ... )
+        {
+            u'222bdf3d-a88e-11e3-859e-040ccee02800': u'self',
+            u'8c7a8eb0-a88e-11e3-8c43-040ccee02800': u'waiting',
+        }
+
+    """
+    workflows = AssessmentWorkflow.objects.filter(course_id=course_id, item_id=item_id)
+    if submission_uuids is not None:
+        workflows = workflows.filter(submission_uuid__in=submission_uuids)
+
+    statuses = {}
+    try:
+        all_uuids = list(workflows.order_by('id').values_list('submission_uuid', flat=True))
+        for start in range(0, len(all_uuids), UPDATE_BATCH_SIZE):
+            batch = all_uuids[start:start + UPDATE_BATCH_SIZE]
+            for workflow in AssessmentWorkflow.update_from_assessments_batch(batch, assessment_requirements):
+                statuses[workflow.submission_uuid] = workflow.status
+    except (DatabaseError, PeerAssessmentError) as err:
+        err_msg = u"Could not update assessment workflows for item {} in course {}: {}".format(
+            item_id, course_id, err
+        )
+        logger.exception(err_msg)
+        raise AssessmentWorkflowInternalError(err_msg)
+
+    logger.info((
+        u"Updated {count} workflows for item {item_id} in course {course_id} "
+        u"with requirements {reqs}"
+    ).format(count=len(statuses), item_id=item_id, course_id=course_id, reqs=assessment_requirements))
+    return statuses
+
+
 def get_status_counts(course_id, item_id, steps):
     """
     Count how many workflows have each status, for a given item in a course.
 
+    The counts are computed with a single aggregate query.  If the
+    `ORA2_STATUS_COUNTS_CACHE_TIMEOUT` setting is set, they are cached for
+    that many seconds; the cache is invalidated whenever a workflow for the
+    item changes status.
+
     Keyword Arguments:
         course_id (unicode): The ID of the course.
         item_id (unicode): The ID of the item in the course.
@@ -292,20 +368,111 @@ def get_status_counts(course_id, item_id, steps):
             {"status": "done", "count": 12},
         ]
 
+    """
+    counts_by_item = _get_status_counts_by_item(course_id, [item_id])
+    return _status_count_list(counts_by_item[item_id], steps)
+
+
+def get_status_counts_for_items(course_id, steps_by_item):
+    """
+    Count how many workflows have each status, for several items in a course,
+    with a single aggregate query.
+
+    Keyword Arguments:
+        course_id (unicode): The ID of the course.
+        steps_by_item (dict): Maps the IDs of the items in the course to
+            the list of assessment steps for each problem.
+
+    Returns:
+        dict mapping item IDs to lists of dictionaries with keys
+        "status" (str) and "count" (int), as returned by `get_status_counts`.
+
+    Example usage:
+        >>> get_status_counts_for_items("ora2/1/1", {"problem-1": ["peer"], "problem-2": ["self"]})
+        {
+            "problem-1": [
+                {"status": "peer", "count": 5},
+                {"status": "waiting", "count": 43},
+                {"status": "done", "count": 12},
+            ],
+            "problem-2": [
+                {"status": "self", "count": 3},
+                {"status": "waiting", "count": 0},
+                {"status": "done", "count": 20},
+            ],
+        }
+
+    """
+    counts_by_item = _get_status_counts_by_item(course_id, steps_by_item.keys())
+    return {
+        item_id: _status_count_list(counts_by_item[item_id], steps)
+        for item_id, steps in steps_by_item.iteritems()
+    }
+
+
+def _get_status_counts_by_item(course_id, item_ids):
+    """
+    Count how many workflows have each status, for each of the items.
+
+    Args:
+        course_id (unicode): The ID of the course.
+        item_ids (list): The IDs of the items in the course.
+
+    Returns:
+        dict mapping each item ID to a dict of status counts.
+
+    """
+    # We retrieve the settings in-line here (rather than using a
+    # top-level constant), so that @override_settings will work
+    # in the test suite.
+    cache_timeout = getattr(settings, 'ORA2_STATUS_COUNTS_CACHE_TIMEOUT', 0)
+
+    counts_by_item = {}
+    if cache_timeout:
+        cache_keys = {
+            AssessmentWorkflow.status_counts_cache_key(course_id, item_id): item_id
+            for item_id in item_ids
+        }
+        for cache_key, counts in cache.get_many(cache_keys.keys()).iteritems():
+            counts_by_item[cache_keys[cache_key]] = counts
+
+    missing_item_ids = [item_id for item_id in item_ids if item_id not in counts_by_item]
+    if missing_item_ids:
+        missing_counts = {item_id: {} for item_id in missing_item_ids}
+        rows = AssessmentWorkflow.objects.filter(
+            course_id=course_id, item_id__in=missing_item_ids
+        ).order_by().values_list('item_id', 'status').annotate(Count('id'))
+        for item_id, status, count in rows:
+            missing_counts[item_id][status] = count
+
+        if cache_timeout:
+            cache.set_many({
+                AssessmentWorkflow.status_counts_cache_key(course_id, item_id): counts
+                for item_id, counts in missing_counts.iteritems()
+            }, cache_timeout)
+        counts_by_item.update(missing_counts)
+
+    return counts_by_item
+
+
+def _status_count_list(counts, steps):
+    """
+    Format the status counts for an item.
+
+    Args:
+        counts (dict): Maps statuses to the number of workflows with that status.
+        steps (list): A list of assessment steps for the problem.
+
+    Returns:
+        list of dictionaries with keys "status" (str) and "count" (int)
+
     """
     # The AI status exists for workflow logic, but no student will ever be in
     # the AI status, so we should never return it.
     statuses = steps + AssessmentWorkflow.STATUSES
     if 'ai' in statuses: statuses.remove('ai')
     return [
-        {
-            "status": status,
-            "count": AssessmentWorkflow.objects.filter(
-                status=status,
-                course_id=course_id,
-                item_id=item_id,
-            ).count()
-        }
+        {"status": status, "count": counts.get(status, 0)}
         for status in statuses
     ]
 
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentworkflow',
+            name='change_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assessmentworkflow',
+            name='synced_requirements_hash',
+            field=models.CharField(default=b'', max_length=40, blank=True),
+        ),
+        migrations.AddField(
+            model_name='assessmentworkflow',
+            name='synced_version',
+            field=models.PositiveIntegerField(default=None, null=True),
+        ),
+    ]
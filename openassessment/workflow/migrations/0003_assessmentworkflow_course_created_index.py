@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflow', '0002_assessmentworkflow_change_version'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='assessmentworkflow',
+            index_together=set([('course_id', 'created', 'id')]),
+        ),
+    ]
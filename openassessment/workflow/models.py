@@ -9,17 +9,22 @@ need to then generate a matching migration for it using:
     ./manage.py schemamigration openassessment.workflow --auto
 
 """
+import hashlib
+import json
 import logging
 import importlib
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models, transaction, DatabaseError
+from django.db.models import F
+from django.db.models.query import prefetch_related_objects
 from django.dispatch import receiver
 from django_extensions.db.fields import UUIDField
 from django.utils.timezone import now
 from model_utils import Choices
 from model_utils.models import StatusModel, TimeStampedModel
-from submissions import api as sub_api
-from openassessment.assessment.signals import assessment_complete_signal
+from openassessment import cached_sub_api
+from openassessment.assessment.signals import assessment_changed_signal, assessment_complete_signal
 from .errors import AssessmentApiLoadError, AssessmentWorkflowError, AssessmentWorkflowInternalError
 
 
@@ -92,9 +97,21 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
     course_id = models.CharField(max_length=255, blank=False, db_index=True)
     item_id = models.CharField(max_length=255, blank=False, db_index=True)
 
+    # Incremented whenever an assessment API records something that may
+    # change this workflow's status (see `assessment_changed_signal`).
+    # It is only ever changed with atomic increments, never by `save()`.
+    change_version = models.PositiveIntegerField(default=0)
+
+    # The change version and requirements that the status was last
+    # computed from, so `update_from_assessments` can skip workflows
+    # that haven't changed since.
+    synced_version = models.PositiveIntegerField(null=True, default=None)
+    synced_requirements_hash = models.CharField(max_length=40, blank=True, default="")
+
     class Meta:
         ordering = ["-created"]
         # TODO: In migration, need a non-unique index on (course_id, item_id, status)
+        index_together = [["course_id", "created", "id"]]
 
     def __init__(self, *args, **kwargs):
         super(AssessmentWorkflow, self).__init__(*args, **kwargs)
@@ -110,6 +127,61 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
             new_list.extend(AssessmentWorkflow.ASSESSMENT_SCORE_PRIORITY)
             AssessmentWorkflow.ASSESSMENT_SCORE_PRIORITY = new_list
 
+        # The status as last loaded or saved, so we know when it changes
+        self._saved_status = self.__dict__.get('status') if self.pk is not None else None
+
+        # The workflow's steps, once they have been loaded (see `_get_steps`)
+        self._steps = None
+
+    def save(self, *args, **kwargs):
+        """
+        Save the workflow, leaving `change_version` as it is in the database.
+
+        The change version is bumped concurrently by the assessment APIs,
+        so saving a copy of the workflow loaded before a bump must not undo it.
+
+        If the status has changed, the cached status counts for the item
+        are invalidated.
+        """
+        if self.pk is not None and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'change_version'
+            ]
+        super(AssessmentWorkflow, self).save(*args, **kwargs)
+
+        if self.status != self._saved_status:
+            self.invalidate_status_counts(self.course_id, self.item_id)
+            self._saved_status = self.status
+
+    @staticmethod
+    def status_counts_cache_key(course_id, item_id):
+        """
+        Return the cache key for the status counts of an item in a course.
+
+        Args:
+            course_id (unicode): The ID of the course.
+            item_id (unicode): The ID of the item in the course.
+
+        Returns:
+            str
+
+        """
+        item_hash = hashlib.sha1(u"{}|{}".format(course_id, item_id).encode('utf-8')).hexdigest()
+        return "workflow.status_counts.{}".format(item_hash)
+
+    @classmethod
+    def invalidate_status_counts(cls, course_id, item_id):
+        """
+        Remove the cached status counts for an item in a course.
+
+        Args:
+            course_id (unicode): The ID of the course.
+            item_id (unicode): The ID of the item in the course.
+
+        """
+        cache.delete(cls.status_counts_cache_key(course_id, item_id))
+
     @classmethod
     @transaction.atomic
     def start_workflow(cls, submission_uuid, step_names, on_init_params):
@@ -132,7 +204,7 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
             DatabaseError
             Assessment-module specific errors
         """
-        submission_dict = sub_api.get_submission_and_student(submission_uuid)
+        submission_dict = cached_sub_api.get_submission_and_student(submission_uuid)
 
         staff_auto_added = False
         if 'staff' not in step_names:
@@ -157,6 +229,7 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
             for i, step in enumerate(step_names)
         ]
         workflow.steps.add(*workflow_steps)
+        workflow._steps = workflow_steps
 
         # Initialize the assessment APIs
         has_started_first_step = False
@@ -205,7 +278,7 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
         """
         score = None
         if self.status == self.STATUS.done:
-            score = sub_api.get_latest_score_for_submission(self.submission_uuid)
+            score = cached_sub_api.get_latest_score_for_submission(self.submission_uuid)
         return score
 
     def status_details(self):
@@ -292,6 +365,30 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
                 met.  Note that the requirements could change if the author
                 updates the problem definition.
 
+        If nothing has changed since the status was last computed (the change
+        version hasn't moved and the requirements are the same), the assessment
+        APIs are not queried again.
+
+        """
+        requirements_hash = self._requirements_hash(assessment_requirements)
+        if self.synced_version == self.change_version and self.synced_requirements_hash == requirements_hash:
+            return
+
+        # Record the version we started from, not the one we finish at:
+        # anything bumped while we're updating must trigger another update.
+        change_version = self.change_version
+        self._update_from_assessments(assessment_requirements)
+        self.synced_version = change_version
+        self.synced_requirements_hash = requirements_hash
+        AssessmentWorkflow.objects.filter(pk=self.pk).update(
+            synced_version=change_version,
+            synced_requirements_hash=requirements_hash,
+        )
+
+    def _update_from_assessments(self, assessment_requirements):
+        """
+        Query assessment APIs and change our status if appropriate.
+        See `update_from_assessments` for details.
         """
         if self.status == self.STATUS.cancelled:
             return
@@ -304,7 +401,7 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
         new_staff_score = self.get_score(assessment_requirements, {'staff': step_for_name.get('staff', None)})
         if new_staff_score:
             # new_staff_score is just the most recent staff score, it may already be recorded in sub_api
-            old_score = sub_api.get_latest_score_for_submission(self.submission_uuid)
+            old_score = cached_sub_api.get_latest_score_for_submission(self.submission_uuid)
             if (
                     not old_score or # There is no recorded score
                     not old_score.get('staff_id') or # The recorded score is not a staff score
@@ -365,27 +462,180 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
                 u"Workflow for submission UUID {uuid} has updated status to {status}"
             ).format(uuid=self.submission_uuid, status=new_status))
 
+    @classmethod
+    def update_from_assessments_batch(cls, submission_uuids, assessment_requirements):
+        """Update the status of many workflows for the same item at once.
+
+        This has the same effect as calling `update_from_assessments` on each
+        workflow, but resolves the state of every step with a fixed number of
+        set-based queries: each assessment API is asked once which of the
+        submissions have finished the step (using the API's
+        `submitters_are_finished` and `assessments_are_finished` functions
+        where it defines them), and step completions and status changes are
+        written with bulk updates.
+
+        Workflows that need per-submission work fall back to
+        `update_from_assessments`: those with a staff assessment (which may
+        need to override the score), those missing their steps, and those
+        that are ready to receive a score.
+
+        Args:
+            submission_uuids (list): The submission UUIDs of the workflows to update.
+                All of the workflows must belong to the same item, since they
+                share `assessment_requirements`.
+            assessment_requirements (dict): Dictionary passed to the assessment APIs,
+                as for `update_from_assessments`.
+
+        Returns:
+            list of `AssessmentWorkflow`, with their updated statuses.
+
+        """
+        workflows = list(
+            cls.objects.filter(
+                submission_uuid__in=submission_uuids
+            ).exclude(
+                status=cls.STATUS.cancelled
+            ).prefetch_related('steps')
+        )
+        if not workflows:
+            return workflows
+
+        # The staff API reports whether a staff assessment
+        # exists when told that one is required.
+        staff_api = AssessmentWorkflowStep(name=cls.STATUS.staff).api()
+        staff_graded = _finished_submission_uuids(
+            staff_api, 'assessment_is_finished', 'assessments_are_finished',
+            [workflow.submission_uuid for workflow in workflows], {'required': True}
+        )
+
+        individual_workflows = []
+        steps_by_workflow = {}
+        for workflow in workflows:
+            steps = [step for step in workflow.steps.all() if step.name in cls.STEPS]
+            if steps:
+                workflow._steps = steps
+            if workflow.submission_uuid in staff_graded or not steps:
+                individual_workflows.append(workflow)
+            elif workflow.status != cls.STATUS.done:
+                steps_by_workflow[workflow] = steps
+
+        # Update each kind of step for every workflow that has it
+        timestamp = now()
+        submitter_completed_ids = []
+        assessment_completed_ids = []
+        steps_by_name = {}
+        for workflow, steps in steps_by_workflow.iteritems():
+            for step in steps:
+                steps_by_name.setdefault(step.name, []).append((workflow, step))
+
+        for step_name, workflow_steps in steps_by_name.iteritems():
+            api = workflow_steps[0][1].api()
+            if assessment_requirements is None:
+                step_reqs = None
+            else:
+                step_reqs = assessment_requirements.get(step_name, {})
+
+            submitter_finished = _finished_submission_uuids(
+                api, 'submitter_is_finished', 'submitters_are_finished',
+                [workflow.submission_uuid for workflow, step in workflow_steps
+                 if not step.is_submitter_complete()],
+                step_reqs
+            )
+            assessment_finished = _finished_submission_uuids(
+                api, 'assessment_is_finished', 'assessments_are_finished',
+                [workflow.submission_uuid for workflow, step in workflow_steps
+                 if not step.is_assessment_complete()],
+                step_reqs
+            )
+
+            for workflow, step in workflow_steps:
+                if not step.is_submitter_complete() and workflow.submission_uuid in submitter_finished:
+                    step.submitter_completed_at = timestamp
+                    submitter_completed_ids.append(step.id)
+                if not step.is_assessment_complete() and workflow.submission_uuid in assessment_finished:
+                    step.assessment_completed_at = timestamp
+                    assessment_completed_ids.append(step.id)
+
+        if submitter_completed_ids:
+            AssessmentWorkflowStep.objects.filter(
+                id__in=submitter_completed_ids
+            ).update(submitter_completed_at=timestamp)
+        if assessment_completed_ids:
+            AssessmentWorkflowStep.objects.filter(
+                id__in=assessment_completed_ids
+            ).update(assessment_completed_at=timestamp)
+
+        # Move each workflow to the first step its submitter hasn't completed
+        workflows_by_status = {}
+        for workflow, steps in steps_by_workflow.iteritems():
+            new_status = next(
+                (step.name for step in steps if step.submitter_completed_at is None),
+                cls.STATUS.waiting
+            )
+
+            # Scoring is done one submission at a time
+            if (new_status == cls.STATUS.waiting and
+                    all(step.assessment_completed_at for step in steps)):
+                individual_workflows.append(workflow)
+                continue
+
+            if workflow.status != new_status:
+                new_step = next((step for step in steps if step.name == new_status), None)
+                if new_step is not None:
+                    on_start_func = getattr(new_step.api(), 'on_start', None)
+                    if on_start_func is not None:
+                        on_start_func(workflow.submission_uuid)
+                workflow.status = new_status
+                workflow.status_changed = timestamp
+                workflow.modified = timestamp
+                workflows_by_status.setdefault(new_status, []).append(workflow)
+
+        for new_status, status_workflows in workflows_by_status.iteritems():
+            cls.objects.filter(
+                id__in=[workflow.id for workflow in status_workflows]
+            ).update(status=new_status, status_changed=timestamp, modified=timestamp)
+            for workflow in status_workflows:
+                workflow._saved_status = new_status
+                logger.info((
+                    u"Workflow for submission UUID {uuid} has updated status to {status}"
+                ).format(uuid=workflow.submission_uuid, status=new_status))
+
+        invalidated_items = set(
+            (workflow.course_id, workflow.item_id)
+            for status_workflows in workflows_by_status.itervalues()
+            for workflow in status_workflows
+        )
+        for course_id, item_id in invalidated_items:
+            cls.invalidate_status_counts(course_id, item_id)
+
+        for workflow in individual_workflows:
+            workflow.update_from_assessments(assessment_requirements)
+
+        return workflows
+
+    @staticmethod
+    def _requirements_hash(assessment_requirements):
+        """
+        Return a hash identifying a set of assessment requirements.
+        """
+        return hashlib.sha1(json.dumps(assessment_requirements, sort_keys=True)).hexdigest()
+
     def _get_steps(self):
         """
         Simple helper function for retrieving all the steps in the given
         Workflow.
+
+        The steps are loaded once per workflow instance, using the steps
+        prefetched with the workflow if there are any (see
+        `get_by_submission_uuid`).  Workflows created before the staff step
+        was introduced can be given one with the `add_staff_workflow_steps`
+        management command.
         """
-        # A staff step must always be available, to allow for staff overrides
-        try:
-            self.steps.get(name=self.STATUS.staff)
-        except AssessmentWorkflowStep.DoesNotExist:
-            for step in list(self.steps.all()):
-                step.order_num += 1
-            self.steps.add(
-                AssessmentWorkflowStep(
-                    name=self.STATUS.staff,
-                    order_num=0,
-                    assessment_completed_at=now(),
-                )
-            )
+        if self._steps is not None:
+            return self._steps
 
         # Do not return steps that are not recognized in the AssessmentWorkflow.
-        steps = list(self.steps.filter(name__in=AssessmentWorkflow.STEPS))
+        steps = [step for step in self.steps.all() if step.name in AssessmentWorkflow.STEPS]
         if not steps:
             # If no steps exist for this AssessmentWorkflow, assume
             # peer -> self for backwards compatibility, with an optional staff override
@@ -394,8 +644,9 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
                 AssessmentWorkflowStep(name=self.STATUS.peer, order_num=1),
                 AssessmentWorkflowStep(name=self.STATUS.self, order_num=2)
             )
-            steps = list(self.steps.all())
+            steps = list(AssessmentWorkflowStep.objects.filter(workflow=self))
 
+        self._steps = steps
         return steps
 
     def set_staff_score(self, score, is_override=False, reason=None):
@@ -415,13 +666,13 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
         annotation_type = "staff_defined"
         if reason is None:
             reason = "A staff member has defined the score for this submission"
-        sub_dict = sub_api.get_submission_and_student(self.submission_uuid)
-        sub_api.reset_score(
+        sub_dict = cached_sub_api.get_submission_and_student(self.submission_uuid)
+        cached_sub_api.reset_score(
             sub_dict['student_item']['student_id'],
             self.course_id,
             self.item_id
         )
-        sub_api.set_score(
+        cached_sub_api.set_score(
             self.submission_uuid,
             score["points_earned"],
             score["points_possible"],
@@ -443,7 +694,7 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
 
         """
         if not self.staff_score_exists():
-            sub_api.set_score(
+            cached_sub_api.set_score(
                 self.submission_uuid,
                 score["points_earned"],
                 score["points_possible"]
@@ -562,7 +813,12 @@ class AssessmentWorkflow(TimeStampedModel, StatusModel):
 
         """
         try:
-            return cls.objects.get(submission_uuid=submission_uuid)
+            workflow = cls.objects.get(submission_uuid=submission_uuid)
+
+            # Load the steps along with the workflow, since nearly
+            # every use of the workflow needs them.
+            prefetch_related_objects([workflow], ['steps'])
+            return workflow
         except cls.DoesNotExist:
             return None
         except DatabaseError as exc:
@@ -673,6 +929,70 @@ class AssessmentWorkflowStep(models.Model):
             self.save()
 
 
+def _finished_submission_uuids(api, func_name, batch_func_name, submission_uuids, step_reqs):
+    """
+    Ask an assessment API which of the submissions have finished a step.
+
+    Uses the API's batch function if it defines one, and otherwise
+    checks each submission with the single-submission function.  Steps
+    without an API (or without either function) are always finished.
+
+    Args:
+        api (module): The assessment API for the step, or None.
+        func_name (str): The name of the single-submission function,
+            e.g. "submitter_is_finished".
+        batch_func_name (str): The name of the batch function,
+            e.g. "submitters_are_finished".
+        submission_uuids (list): The submissions to check.
+        step_reqs (dict): The requirements for the step.
+
+    Returns:
+        set of submission UUIDs
+
+    """
+    if not submission_uuids:
+        return set()
+
+    batch_func = getattr(api, batch_func_name, None)
+    if batch_func is not None:
+        return batch_func(submission_uuids, step_reqs)
+
+    func = getattr(api, func_name, None)
+    if func is None:
+        return set(submission_uuids)
+    return set(
+        submission_uuid for submission_uuid in submission_uuids
+        if func(submission_uuid, step_reqs)
+    )
+
+
+@receiver(assessment_changed_signal)
+def bump_workflow_change_version(sender, **kwargs):
+    """
+    Register a receiver for the assessment changed signal, which marks the
+    workflows for the given submissions as needing an update.
+
+    Args:
+        sender (object): Not used
+
+    Keyword Arguments:
+        submission_uuids (list): The UUIDs of the submissions associated
+            with the workflows that have changed.
+
+    Returns:
+        None
+
+    """
+    submission_uuids = kwargs.get('submission_uuids')
+    if not submission_uuids:
+        logger.error("Assessment changed signal called without submission UUIDs")
+        return
+
+    AssessmentWorkflow.objects.filter(
+        submission_uuid__in=submission_uuids
+    ).update(change_version=F('change_version') + 1)
+
+
 @receiver(assessment_complete_signal)
 def update_workflow_async(sender, **kwargs):
     """
@@ -1,5 +1,5 @@
-from django.db import DatabaseError
-from django.test.utils import override_settings
+from django.db import connection, DatabaseError
+from django.test.utils import CaptureQueriesContext, override_settings
 import ddt
 from mock import patch
 from nose.tools import raises
@@ -11,6 +11,7 @@ from submissions.models import Submission
 import openassessment.workflow.api as workflow_api
 from openassessment.assessment.api import ai as ai_api
 from openassessment.assessment.errors import AIError
+from openassessment.assessment.signals import assessment_changed_signal
 from openassessment.assessment.models import StudentTrainingWorkflow
 import submissions.api as sub_api
 from openassessment.assessment.api import peer as peer_api
@@ -133,9 +134,11 @@ class TestAssessmentWorkflowApi(CacheResetTest):
         peer_workflows = list(PeerWorkflow.objects.filter(submission_uuid=submission["uuid"]))
         self.assertTrue(peer_workflows)
 
-
+        # The mocked assessment APIs don't record anything,
+        # so mark the workflow as changed ourselves.
         with patch.object(peer_api, 'submitter_is_finished') as mock_peer_submit:
             mock_peer_submit.return_value = True
+            assessment_changed_signal.send(sender=None, submission_uuids=[submission["uuid"]])
             workflow = workflow_api.get_workflow_for_submission(
                 submission["uuid"], requirements
             )
@@ -143,6 +146,7 @@ class TestAssessmentWorkflowApi(CacheResetTest):
 
         with patch.object(self_api, 'submitter_is_finished') as mock_self_submit:
             mock_self_submit.return_value = True
+            assessment_changed_signal.send(sender=None, submission_uuids=[submission["uuid"]])
             workflow = workflow_api.get_workflow_for_submission(
                 submission["uuid"], requirements
             )
@@ -281,8 +285,8 @@ class TestAssessmentWorkflowApi(CacheResetTest):
     def test_preexisting_workflow(self):
         """
         Verifies that even if a workflow does not go through start_workflow, it won't blow up.
-        update_from_assessments() will go through _get_steps(), and add a staff step to the workflow
-        even if it was created without one initially.
+        update_from_assessments() will go through _get_steps(), and add the default steps to the workflow
+        even if it was created without any initially.
         """
         submission = sub_api.create_submission({
             "student_id": "test student",
@@ -373,6 +377,189 @@ class TestAssessmentWorkflowApi(CacheResetTest):
         )
         self.assertEqual(counts, updated_counts)
 
+    def test_update_from_assessments_batch(self):
+        requirements = {
+            "peer": {
+                "must_grade": 1,
+                "must_be_graded_by": 1
+            }
+        }
+        item = dict(ITEM_1)
+        item["student_id"] = "Bumblebee"
+        bumblebee_sub = sub_api.create_submission(item, ANSWER_1)
+        workflow_api.create_workflow(bumblebee_sub["uuid"], ["peer", "self"])
+        item["student_id"] = "Jazz"
+        jazz_sub = sub_api.create_submission(item, ANSWER_2)
+        workflow_api.create_workflow(jazz_sub["uuid"], ["peer", "self"])
+
+        # Nobody has assessed anything yet
+        statuses = workflow_api.update_from_assessments_batch(ITEM_1["course_id"], ITEM_1["item_id"], requirements)
+        self.assertEqual(statuses, {bumblebee_sub["uuid"]: "peer", jazz_sub["uuid"]: "peer"})
+
+        # Bumblebee and Jazz assess each other, so both move on to self-assessment
+        for scorer_sub, scorer_id in [(bumblebee_sub, "Bumblebee"), (jazz_sub, "Jazz")]:
+            peer_api.get_submission_to_assess(scorer_sub["uuid"], 1)
+            peer_api.create_assessment(
+                scorer_sub["uuid"], scorer_id, {"secret": "yes"}, {}, "", RUBRIC_DICT, 1
+            )
+        statuses = workflow_api.update_from_assessments_batch(ITEM_1["course_id"], ITEM_1["item_id"], requirements)
+        self.assertEqual(statuses, {bumblebee_sub["uuid"]: "self", jazz_sub["uuid"]: "self"})
+        self.assertIsNotNone(PeerWorkflow.objects.get(submission_uuid=jazz_sub["uuid"]).completed_at)
+
+        # Once Bumblebee has self-assessed, the submission gets a score
+        self_api.create_assessment(bumblebee_sub["uuid"], "Bumblebee", {"secret": "yes"}, {}, "", RUBRIC_DICT)
+        statuses = workflow_api.update_from_assessments_batch(
+            ITEM_1["course_id"], ITEM_1["item_id"], requirements, submission_uuids=[bumblebee_sub["uuid"]]
+        )
+        self.assertEqual(statuses, {bumblebee_sub["uuid"]: "done"})
+        self.assertEqual(sub_api.get_latest_score_for_submission(bumblebee_sub["uuid"])["points_earned"], 1)
+
+        # The batch update agrees with updating each workflow separately
+        for submission in [bumblebee_sub, jazz_sub]:
+            workflow = workflow_api.update_from_assessments(submission["uuid"], requirements)
+            self.assertEqual(workflow["status"], statuses.get(submission["uuid"], "self"))
+
+    def test_update_from_assessments_batch_num_queries(self):
+        requirements = {
+            "peer": {
+                "must_grade": 5,
+                "must_be_graded_by": 3
+            }
+        }
+
+        def _num_queries():
+            with CaptureQueriesContext(connection) as queries:
+                workflow_api.update_from_assessments_batch(ITEM_1["course_id"], ITEM_1["item_id"], requirements)
+            return len(queries)
+
+        for student_id in ["Bumblebee", "Jazz"]:
+            self._create_workflow_with_status(student_id, ITEM_1["course_id"], ITEM_1["item_id"], "peer")
+        num_queries = _num_queries()
+
+        # The number of queries doesn't depend on the number of workflows
+        for student_id in ["Ironhide", "Ratchet", "Wheeljack"]:
+            self._create_workflow_with_status(student_id, ITEM_1["course_id"], ITEM_1["item_id"], "peer")
+        self.assertEqual(_num_queries(), num_queries)
+
+    @patch.object(AssessmentWorkflow, 'update_from_assessments_batch')
+    def test_update_from_assessments_batch_database_error(self, mock_update):
+        self._create_workflow_with_status("Bumblebee", ITEM_1["course_id"], ITEM_1["item_id"], "peer")
+        mock_update.side_effect = DatabaseError("Oh no!")
+        with self.assertRaises(AssessmentWorkflowInternalError):
+            workflow_api.update_from_assessments_batch(ITEM_1["course_id"], ITEM_1["item_id"], {})
+
+    def test_update_skipped_when_unchanged(self):
+        requirements = {"peer": {"must_grade": 1, "must_be_graded_by": 1}}
+        submission = sub_api.create_submission(ITEM_1, ANSWER_1)
+        workflow_api.create_workflow(submission["uuid"], ["peer", "self"])
+        workflow_api.update_from_assessments(submission["uuid"], requirements)
+
+        # Nothing has changed, so the assessment APIs aren't asked again
+        with patch.object(peer_api, 'submitter_is_finished') as mock_peer_submit:
+            workflow_api.update_from_assessments(submission["uuid"], requirements)
+            self.assertFalse(mock_peer_submit.called)
+
+            # ...unless the requirements have changed
+            mock_peer_submit.return_value = False
+            workflow_api.update_from_assessments(
+                submission["uuid"], {"peer": {"must_grade": 2, "must_be_graded_by": 1}}
+            )
+            self.assertTrue(mock_peer_submit.called)
+
+    def test_assessment_bumps_change_version(self):
+        requirements = {"peer": {"must_grade": 1, "must_be_graded_by": 1}}
+        scorer_sub = sub_api.create_submission(ITEM_1, ANSWER_1)
+        workflow_api.create_workflow(scorer_sub["uuid"], ["peer", "self"])
+        item = dict(ITEM_1)
+        item["student_id"] = "Bumblebee"
+        author_sub = sub_api.create_submission(item, ANSWER_2)
+        workflow_api.create_workflow(author_sub["uuid"], ["peer", "self"])
+        workflow = workflow_api.update_from_assessments(scorer_sub["uuid"], requirements)
+        self.assertEqual(workflow["status"], "peer")
+
+        # A stale copy of the workflow, loaded before the assessment
+        stale_workflow = AssessmentWorkflow.objects.get(submission_uuid=author_sub["uuid"])
+
+        peer_api.get_submission_to_assess(scorer_sub["uuid"], 1)
+        peer_api.create_assessment(
+            scorer_sub["uuid"], ITEM_1["student_id"], {"secret": "yes"}, {}, "", RUBRIC_DICT, 1
+        )
+        for submission_uuid in [scorer_sub["uuid"], author_sub["uuid"]]:
+            self.assertEqual(AssessmentWorkflow.objects.get(submission_uuid=submission_uuid).change_version, 1)
+
+        # Saving the stale copy doesn't undo the bump
+        stale_workflow.save()
+        self.assertEqual(AssessmentWorkflow.objects.get(submission_uuid=author_sub["uuid"]).change_version, 1)
+
+        # The scorer's workflow is updated, even though the requirements are the same
+        workflow = workflow_api.update_from_assessments(scorer_sub["uuid"], requirements)
+        self.assertEqual(workflow["status"], "self")
+
+    def test_steps_loaded_once(self):
+        submission = sub_api.create_submission(ITEM_1, ANSWER_1)
+        workflow_api.create_workflow(submission["uuid"], ["peer", "self"])
+        requirements = {"peer": {"must_grade": 1, "must_be_graded_by": 1}}
+
+        workflow = AssessmentWorkflow.get_by_submission_uuid(submission["uuid"])
+        with self.assertNumQueries(0):
+            steps = workflow._get_steps()
+            workflow.status_details()
+        self.assertEqual([step.name for step in steps], ["staff", "peer", "self"])
+
+        # Changes made while updating are seen by later reads
+        workflow.update_from_assessments(requirements)
+        self.assertIs(workflow._get_steps(), steps)
+
+    def test_get_status_counts_num_queries(self):
+        self._create_workflow_with_status("user 1", "test/1/1", "peer-problem", "peer")
+        self._create_workflow_with_status("user 2", "test/1/1", "peer-problem", "done")
+        with self.assertNumQueries(1):
+            counts = workflow_api.get_status_counts("test/1/1", "peer-problem", ["peer", "self"])
+        self.assertEqual(counts, [
+            {"status": "peer", "count": 1},
+            {"status": "self", "count": 0},
+            {"status": "waiting", "count": 0},
+            {"status": "done", "count": 1},
+            {"status": "cancelled", "count": 0},
+        ])
+
+    def test_get_status_counts_for_items(self):
+        self._create_workflow_with_status("user 1", "test/1/1", "peer-problem", "peer")
+        self._create_workflow_with_status("user 2", "test/1/1", "peer-problem", "waiting")
+        self._create_workflow_with_status("user 1", "test/1/1", "self-problem", "self", steps=["self"])
+        self._create_workflow_with_status("user 1", "other_course", "self-problem", "self", steps=["self"])
+
+        with self.assertNumQueries(1):
+            counts = workflow_api.get_status_counts_for_items(
+                "test/1/1", {"peer-problem": ["peer"], "self-problem": ["self"], "empty-problem": ["self"]}
+            )
+        self.assertEqual(counts, {
+            "peer-problem": workflow_api.get_status_counts("test/1/1", "peer-problem", ["peer"]),
+            "self-problem": workflow_api.get_status_counts("test/1/1", "self-problem", ["self"]),
+            "empty-problem": workflow_api.get_status_counts("test/1/1", "empty-problem", ["self"]),
+        })
+        self.assertEqual(counts["self-problem"], [
+            {"status": "self", "count": 1},
+            {"status": "waiting", "count": 0},
+            {"status": "done", "count": 0},
+            {"status": "cancelled", "count": 0},
+        ])
+
+    @override_settings(ORA2_STATUS_COUNTS_CACHE_TIMEOUT=60)
+    def test_get_status_counts_cached(self):
+        workflow, __ = self._create_workflow_with_status("user 1", "test/1/1", "peer-problem", "peer")
+        counts = workflow_api.get_status_counts("test/1/1", "peer-problem", ["peer"])
+        with self.assertNumQueries(0):
+            self.assertEqual(workflow_api.get_status_counts("test/1/1", "peer-problem", ["peer"]), counts)
+
+        # A status change invalidates the cached counts
+        workflow_model = AssessmentWorkflow.objects.get(uuid=workflow['uuid'])
+        workflow_model.status = "waiting"
+        workflow_model.save()
+        counts = workflow_api.get_status_counts("test/1/1", "peer-problem", ["peer"])
+        self.assertEqual(counts[0], {"status": "peer", "count": 0})
+        self.assertEqual(counts[1], {"status": "waiting", "count": 1})
+
     @override_settings(ORA2_ASSESSMENTS={'self': 'not.a.module'})
     def test_unable_to_load_api(self):
         submission = sub_api.create_submission({
@@ -8,6 +8,7 @@ from django.utils.translation import ugettext as _
 
 from xblock.core import XBlock
 
+from openassessment import cached_sub_api
 from openassessment.assessment.api import ai as ai_api
 from openassessment.assessment.api import peer as peer_api
 from openassessment.assessment.api import self as self_api
@@ -114,7 +115,7 @@ class GradeMixin(object):
             staff_assessment = self._assessment_grade_context(raw_staff_assessment)
 
         feedback_text = feedback.get('feedback', '') if feedback else ''
-        student_submission = sub_api.get_submission(submission_uuid)
+        student_submission = cached_sub_api.get_submission(submission_uuid)
 
         # We retrieve the score from the workflow, which in turn retrieves
         # the score for our current submission UUID.
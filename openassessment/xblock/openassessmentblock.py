@@ -19,6 +19,7 @@ from xblock.core import XBlock
 from xblock.fields import List, Scope, String, Boolean, Integer
 from xblock.fragment import Fragment
 
+from openassessment.assessment.models import Rubric
 from openassessment.xblock.grade_mixin import GradeMixin
 from openassessment.xblock.leaderboard_mixin import LeaderboardMixin
 from openassessment.xblock.defaults import *  # pylint: disable=wildcard-import, unused-wildcard-import
@@ -660,6 +661,22 @@ class OpenAssessmentBlock(
                     option['label'] = option['name']
         return criteria
 
+    @lazy
+    def rubric_hashes(self):
+        """
+        The content hash and structure hash of the rubric definition,
+        calculated once for the block and passed to the assessment APIs
+        so that they don't hash the rubric for every assessment.
+
+        The result of this call is cached, so it should NOT be used in a runtime
+        that can modify the XBlock settings (in the LMS, settings are read-only).
+
+        Returns:
+            tuple of (content_hash, structure_hash)
+
+        """
+        return Rubric.hashes_from_dict(create_rubric_dict(self.prompts, self.rubric_criteria_with_labels))
+
     def render_assessment(self, path, context_dict=None):
         """Render an Assessment Module's HTML
 
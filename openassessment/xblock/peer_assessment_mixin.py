@@ -80,7 +80,8 @@ class PeerAssessmentMixin(object):
                     clean_criterion_feedback(self.rubric_criteria_with_labels, data['criterion_feedback']),
                     data['overall_feedback'],
                     create_rubric_dict(self.prompts, self.rubric_criteria_with_labels),
-                    assessment_ui_model['must_be_graded_by']
+                    assessment_ui_model['must_be_graded_by'],
+                    rubric_hashes=self.rubric_hashes
                 )
 
                 # Emit analytics event...
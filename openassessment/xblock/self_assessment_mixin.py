@@ -3,9 +3,9 @@ import logging
 from xblock.core import XBlock
 from webob import Response
 
+from openassessment import cached_sub_api
 from openassessment.assessment.api import self as self_api
 from openassessment.workflow import api as workflow_api
-from submissions import api as submission_api
 from .resolve_dates import DISTANT_FUTURE, get_current_time_zone
 from .data_conversion import (clean_criterion_feedback, create_submission_dict,
                               create_rubric_dict, verify_assessment_parameters)
@@ -90,7 +90,7 @@ class SelfAssessmentMixin(object):
                 elif reason == 'due':
                     path = 'openassessmentblock/self/oa_self_closed.html'
             else:
-                submission = submission_api.get_submission(self.submission_uuid)
+                submission = cached_sub_api.get_submission(self.submission_uuid)
                 context["rubric_criteria"] = self.rubric_criteria_with_labels
                 context["self_submission"] = create_submission_dict(submission, self.prompts)
                 if self.rubric_feedback_prompt is not None:
@@ -138,7 +138,8 @@ class SelfAssessmentMixin(object):
                 data['options_selected'],
                 clean_criterion_feedback(self.rubric_criteria, data['criterion_feedback']),
                 data['overall_feedback'],
-                create_rubric_dict(self.prompts, self.rubric_criteria_with_labels)
+                create_rubric_dict(self.prompts, self.rubric_criteria_with_labels),
+                rubric_hashes=self.rubric_hashes
             )
             self.publish_assessment_event("openassessmentblock.self_assess", assessment)
 
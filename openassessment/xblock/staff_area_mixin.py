@@ -7,6 +7,7 @@ from functools import wraps
 import logging
 
 from xblock.core import XBlock
+from openassessment import cached_sub_api
 from openassessment.assessment.errors import (
     PeerAssessmentInternalError,
 )
@@ -173,16 +174,23 @@ class StaffAreaMixin(object):
 
         return path, context
 
-    @staticmethod
-    def get_staff_assessment_statistics_context(course_id, item_id):
+    def get_staff_assessment_statistics_context(self, course_id, item_id):
         """
-        Returns a context with staff assessment "ungraded" and "in-progress" counts.
+        Returns a context with staff assessment "ungraded" and "in-progress" counts,
+        the number of submissions graded by staff within the last hour, and for each
+        staff member, how many they graded and how long they took on average.
         """
         grading_stats = staff_api.get_staff_grading_statistics(course_id, item_id)
+        grader_stats = staff_api.get_staff_grader_statistics(course_id, item_id)
 
         return {
             'staff_assessment_ungraded': grading_stats['ungraded'],
-            'staff_assessment_in_progress': grading_stats['in-progress']
+            'staff_assessment_in_progress': grading_stats['in-progress'],
+            'staff_assessment_graded_recently': sum(grader['graded'] for grader in grader_stats),
+            'staff_assessment_graders': [
+                dict(grader, username=self.get_username(grader['scorer_id']) or grader['scorer_id'])
+                for grader in grader_stats
+            ],
         }
 
     @XBlock.json_handler
@@ -267,7 +275,7 @@ class StaffAreaMixin(object):
                     'item_id': item_id,
                     'submission_returned_uuid': submission_to_assess['uuid']
                 })
-                submission = submission_api.get_submission_and_student(submission_to_assess['uuid'])
+                submission = cached_sub_api.get_submission_and_student(submission_to_assess['uuid'])
                 if submission:
                     anonymous_student_id = submission['student_item']['student_id']
                     submission_context = self.get_student_submission_context(
@@ -390,6 +398,7 @@ class StaffAreaMixin(object):
 
         peer_assessments = None
         peer_assessments_grade_context = []
+        peer_summary = None
 
         staff_assessment = staff_api.get_latest_staff_assessment(submission_uuid)
         staff_assessment_grade_context = None
@@ -402,10 +411,12 @@ class StaffAreaMixin(object):
         grade_exists = workflow.get('status') == "done"
 
         if "peer-assessment" in assessment_steps:
-            peer_assessments = peer_api.get_assessments(submission_uuid)
-            submitted_assessments = peer_api.get_submitted_assessments(submission_uuid)
+            peer_summary = peer_api.get_submission_summary(
+                submission_uuid, self.workflow_requirements()["peer"] if grade_exists else None
+            )
+            peer_assessments = peer_summary["assessments"]
+            submitted_assessments = peer_summary["submitted_assessments"]
             if grade_exists:
-                peer_api.get_score(submission_uuid, self.workflow_requirements()["peer"])
                 peer_assessments_grade_context = [
                     self._assessment_grade_context(peer_assessment)
                     for peer_assessment in peer_assessments
@@ -449,7 +460,10 @@ class StaffAreaMixin(object):
         })
 
         if peer_assessments or self_assessment or example_based_assessment or staff_assessment:
-            max_scores = peer_api.get_rubric_max_scores(submission_uuid)
+            if peer_summary is not None:
+                max_scores = peer_summary["max_scores"]
+            else:
+                max_scores = peer_api.get_rubric_max_scores(submission_uuid)
             for criterion in context["rubric_criteria"]:
                 criterion["total_value"] = max_scores[criterion["name"]]
 
@@ -512,7 +526,7 @@ class StaffAreaMixin(object):
             self._cancel_workflow(sub['uuid'], "Student state cleared", requesting_user_id=requesting_user_id)
 
             # Tell the submissions API to orphan the submission to prevent it from being accessed
-            submission_api.reset_score(
+            cached_sub_api.reset_score(
                 user_id,
                 course_id,
                 item_id,
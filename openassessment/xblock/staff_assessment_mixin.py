@@ -49,7 +49,8 @@ class StaffAssessmentMixin(object):
                 data['options_selected'],
                 clean_criterion_feedback(self.rubric_criteria, data['criterion_feedback']),
                 data['overall_feedback'],
-                create_rubric_dict(self.prompts, self.rubric_criteria_with_labels)
+                create_rubric_dict(self.prompts, self.rubric_criteria_with_labels),
+                rubric_hashes=self.rubric_hashes
             )
             assess_type = data.get('assess_type', 'regrade')
             self.publish_assessment_event("openassessmentblock.staff_assess", assessment, type=assess_type)
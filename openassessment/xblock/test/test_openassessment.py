@@ -9,7 +9,9 @@ from freezegun import freeze_time
 import pytz
 from mock import Mock, patch, MagicMock, PropertyMock
 
+from openassessment.assessment.models import Rubric
 from openassessment.xblock import openassessmentblock
+from openassessment.xblock.data_conversion import create_rubric_dict
 from openassessment.xblock.resolve_dates import DISTANT_PAST, DISTANT_FUTURE
 from openassessment.workflow.errors import AssessmentWorkflowError
 from .base import XBlockHandlerTestCase, scenario
@@ -398,6 +400,17 @@ class TestOpenAssessment(XBlockHandlerTestCase):
         xblock.prompts = [{'description': 'Prompt 4.'}, {'description': 'Prompt 5.'}]
         self.assertEqual(xblock.prompt, '[{"description": "Prompt 4."}, {"description": "Prompt 5."}]')
 
+    @scenario('data/basic_scenario.xml', user_id='Bob')
+    def test_rubric_hashes(self, xblock):
+        rubric_dict = create_rubric_dict(xblock.prompts, xblock.rubric_criteria_with_labels)
+        expected_hashes = Rubric.hashes_from_dict(rubric_dict)
+        self.assertEqual(xblock.rubric_hashes, expected_hashes)
+
+        # The rubric is hashed once for the block
+        with patch.object(Rubric, 'hashes_from_dict') as mock_hashes:
+            self.assertEqual(xblock.rubric_hashes, expected_hashes)
+            self.assertFalse(mock_hashes.called)
+
 
 class TestDates(XBlockHandlerTestCase):
 
@@ -723,6 +723,29 @@ class TestCourseStaff(XBlockHandlerTestCase):
         _, context = xblock.get_staff_path_and_context()
         self._verify_staff_assessment_context(context, True, 0, 1)
 
+    @scenario('data/staff_grade_scenario.xml', user_id='Bob')
+    def test_staff_grader_statistics(self, xblock):
+        """
+        Verify that the staff grading tool shows how many responses
+        each staff member graded recently, and how long they took.
+        """
+        # Simulate that we are course staff
+        xblock.xmodule_runtime = self._create_mock_runtime(
+            xblock.scope_ids.usage_id, True, False, "Bob"
+        )
+        xblock.xmodule_runtime.get_real_user = lambda anonymous_user_id: Mock(username=u"staff_" + anonymous_user_id)
+
+        with patch.object(staff_api, 'get_staff_grader_statistics') as mock_stats:
+            mock_stats.return_value = [
+                {'scorer_id': 'Bob', 'graded': 3, 'average_grading_time': 42.4},
+                {'scorer_id': 'Sue', 'graded': 1, 'average_grading_time': None},
+            ]
+            resp = self.request(xblock, 'render_staff_grade_counts', json.dumps({})).decode('utf-8')
+
+        self.assertIn(u"4 Graded in the Last Hour", resp)
+        self.assertIn(u"staff_Bob: 3 Graded, 42 Seconds on Average", resp)
+        self.assertIn(u"staff_Sue: 1 Graded", resp)
+
     @scenario('data/example_based_assessment.xml', user_id='Bob')
     def test_staff_assessment_counts_not_required(self, xblock):
         """